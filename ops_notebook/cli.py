@@ -3,7 +3,25 @@ import os
 from pathlib import Path
 
 from ops_notebook.core.config import load_config
+from ops_notebook.core.hashing import (
+    APPENDABLE_FINGERPRINTS,
+    DEFAULT_FINGERPRINT,
+    FINGERPRINT_ALGORITHMS,
+)
+from ops_notebook.core.notebooks import (
+    Notebook,
+    SharedResources,
+    format_summary,
+    load_notebooks,
+    run_notebooks,
+    select_notebooks,
+)
+from ops_notebook.core.rag_phase import RAG_PROVIDERS
 from ops_notebook.core.report import generate_weekly_report
+from ops_notebook.core.rollup import ROLLUP_KINDS
+from ops_notebook.core.run_lock import RunLockTimeout
+from ops_notebook.core.scanner import ScanScope
+from ops_notebook.core.throttle import NICE_IO_LIMIT, lower_priority, parse_rate
 
 
 def _env_bool(name: str, default: bool = False) -> bool:
@@ -44,9 +62,98 @@ def main() -> int:
     parser.add_argument("--rag-url", default=None, help="RAG server URL override")
     parser.add_argument("--rag-top-k", type=int, default=None, help="RAG top-k override")
     parser.add_argument("--rag-query", default=None, help="Custom query override (optional)")
+    parser.add_argument(
+        "--rag-budget-s",
+        type=float,
+        default=None,
+        help="Total time budget for RAG calls in one run (0 = no budget)",
+    )
+    parser.add_argument(
+        "--rag-provider",
+        choices=RAG_PROVIDERS,
+        default=None,
+        help="RAG evidence provider override (local: offline index, auto: server + local fallback)",
+    )
     parser.add_argument("--verbose", action="store_true", help="Verbose logging")
+    parser.add_argument(
+        "--scan-backend",
+        choices=("files", "git"),
+        default=None,
+        help="Change detection backend override (git: notes_dir is a git working tree)",
+    )
+    parser.add_argument(
+        "--fingerprint",
+        choices=FINGERPRINT_ALGORITHMS,
+        default=None,
+        help="Fingerprint algorithm override for the file backend",
+    )
+    parser.add_argument(
+        "--render-workers",
+        type=int,
+        default=None,
+        help="Processes for diff/digest rendering (0=auto, 1=in-process)",
+    )
+    parser.add_argument(
+        "--pipeline",
+        choices=("sequential", "async"),
+        default=None,
+        help="Run mode override: sequential phases or overlapping async stages",
+    )
     
     parser.add_argument("--doctor", action="store_true", help="Run health check and exit")
+    parser.add_argument(
+        "--notebook",
+        action="append",
+        default=None,
+        metavar="NAME",
+        help="Only run this notebook from config `notebooks:` (repeatable)",
+    )
+    parser.add_argument(
+        "--paths",
+        nargs="+",
+        default=None,
+        metavar="SUBDIR",
+        help="Partial run: only scan these subtrees of notes_dir (other notes are left untouched)",
+    )
+    parser.add_argument(
+        "--include",
+        action="append",
+        default=None,
+        metavar="GLOB",
+        help="Partial run: only scan notes whose relative path matches GLOB (repeatable)",
+    )
+    parser.add_argument(
+        "--json-only",
+        action="store_true",
+        help="Write only the JSON sidecar (skip Markdown rendering)",
+    )
+    parser.add_argument(
+        "--warm-rag",
+        action="store_true",
+        help="Pre-fill the RAG cache for notes changed since the last warm-up (daily schedule) and exit",
+    )
+    parser.add_argument(
+        "--nice",
+        action="store_true",
+        help="Low-priority run for busy hosts: lower CPU/IO priority and cap scan I/O (scan.io_limit)",
+    )
+    parser.add_argument(
+        "--rollup",
+        choices=ROLLUP_KINDS,
+        default=None,
+        help="Write a monthly/quarterly rollup from the stored weekly summaries (no scan) and exit",
+    )
+    parser.add_argument(
+        "--rollup-period",
+        default=None,
+        metavar="PERIOD",
+        help="Rollup period: YYYY-MM (month) or YYYY-Qn (quarter); default: the current one",
+    )
+    parser.add_argument(
+        "--metrics-summary",
+        action="store_true",
+        help="Summarize recorded run metrics (flags runs slower than the rolling baseline) and exit",
+    )
 
     args = parser.parse_args()
 
@@ -86,43 +193,261 @@ def main() -> int:
         else (os.getenv("RAG_QUERY") or str(rag_cfg.get("query") or ""))
     ).strip()
 
-    reports_dir.mkdir(parents=True, exist_ok=True)
-    state_path.parent.mkdir(parents=True, exist_ok=True)
+    scan_cfg = cfg.get("scan") or {}
+    scan_backend = args.scan_backend or str(scan_cfg.get("backend") or "files").strip().lower()
+    fingerprint = args.fingerprint or str(scan_cfg.get("fingerprint") or DEFAULT_FINGERPRINT).strip().lower()
+    if fingerprint not in FINGERPRINT_ALGORITHMS:
+        print(f"[WARN] unknown scan.fingerprint={fingerprint!r}; using {DEFAULT_FINGERPRINT}")
+        fingerprint = DEFAULT_FINGERPRINT
+    append_only = bool(scan_cfg.get("append_only", False))
+    if append_only and scan_backend == "git":
+        print("[WARN] scan.append_only has no effect with scan.backend=git; ignored")
+    elif append_only and fingerprint not in APPENDABLE_FINGERPRINTS:
+        print(f"[WARN] scan.append_only needs scan.fingerprint sha256 or blake2b; ignored with {fingerprint}")
+    nice = args.nice or bool(scan_cfg.get("nice", False))
+    try:
+        io_limit = parse_rate(scan_cfg.get("io_limit"))
+    except ValueError as e:
+        print(f"[WARN] {e}; scan.io_limit ignored")
+        io_limit = 0
+    if nice and io_limit == 0:
+        io_limit = NICE_IO_LIMIT
+    render_cfg = cfg.get("render") or {}
+    render_workers = (
+        args.render_workers
+        if args.render_workers is not None
+        else int(render_cfg.get("workers") or 0)
+    )
+    budget_lines = int(render_cfg.get("budget_lines") or 0)
+    budget_bytes = int(render_cfg.get("budget_bytes") or 0)
+    pipeline_cfg = cfg.get("pipeline") or {}
+    pipeline = args.pipeline or str(pipeline_cfg.get("mode") or "sequential").strip().lower()
+    queue_size = int(pipeline_cfg.get("queue_size") or 32)
+    rag_concurrency = int(rag_cfg.get("concurrency") or 4)
+    rag_warm_concurrency = int(rag_cfg.get("warm_concurrency") or 1)
+    rag_timeout_s = float(rag_cfg.get("timeout_s") or 12)
+    rag_budget_s = (
+        args.rag_budget_s
+        if args.rag_budget_s is not None
+        else float(rag_cfg.get("budget_s", 60) or 0)
+    )
+    rag_max_failures = int(rag_cfg.get("max_failures") or 3)
+    rag_ingest_url = (os.getenv("RAG_INGEST_URL") or str(rag_cfg.get("ingest_url") or "")).strip()
+    rag_ingest_batch_size = int(rag_cfg.get("ingest_batch_size") or 50)
+    near_dup_cfg = cfg.get("near_dup") or {}
+    near_dup = bool(near_dup_cfg.get("enabled", False))
+    near_dup_max_distance = int(near_dup_cfg.get("max_distance", 7))
+    scope = ScanScope.from_args(args.paths or (), args.include or ())
+    output_cfg = cfg.get("output") or {}
+    markdown = bool(output_cfg.get("markdown", True)) and not args.json_only
+    json_output = bool(output_cfg.get("json", True)) or args.json_only
+    metrics_cfg = cfg.get("metrics") or {}
+    metrics_enabled = bool(metrics_cfg.get("enabled", True))
+    prom_textfile = str(metrics_cfg.get("prometheus_textfile") or "").strip()
+    lock_timeout_s = float((cfg.get("lock") or {}).get("timeout_s", 900))
+    rag_provider = args.rag_provider or str(rag_cfg.get("provider") or "http").strip().lower()
+    if rag_provider not in RAG_PROVIDERS:
+        print(f"[WARN] unknown rag.provider={rag_provider!r}; using http")
+        rag_provider = "http"
 
-    if args.verbose:
-        print(f"[INFO] config={args.config}")
-        print(f"[INFO] notes_dir={notes_dir}")
-        print(f"[INFO] reports_dir={reports_dir}")
-        print(f"[INFO] template_path={template_path}")
-        print(f"[INFO] state_path={state_path}")
-        print(f"[INFO] report_path={report_path}")
-        print(f"[INFO] use_rag={use_rag} rag_url={rag_url} top_k={rag_top_k}")
-    
-    if args.doctor:
-        from ops_notebook.core.doctor import run_doctor
-        
-        res = run_doctor(
-            notes_dir=notes_dir,
-            reports_dir=reports_dir,
-            template_path=template_path,
-            state_path=state_path,
-            use_rag=use_rag,
-            rag_url=rag_url,
-        )
-        print(res.summary)
-        print(res.details)
-        return 0 if res.ok else 2
-
-    generate_weekly_report(
+    default_notebook = Notebook(
+        name="",
         notes_dir=notes_dir,
+        template_path=template_path,
         reports_dir=reports_dir,
         report_path=report_path,
-        template_path=template_path,
         state_path=state_path,
-        use_rag=use_rag,
-        rag_url=rag_url,
-        rag_top_k=rag_top_k,
-        rag_query=rag_query,
-        verbose=args.verbose,
     )
-    return 0
+    # explicit path overrides mean "this one notebook", even if config lists several
+    path_override = any(
+        v is not None for v in (args.notes, args.template, args.reports_dir, args.report, args.state)
+    )
+    notebooks = [default_notebook] if path_override else load_notebooks(cfg, default_notebook)
+    notebooks = select_notebooks(notebooks, args.notebook or ())
+    if not notebooks:
+        print("[FAIL] no notebooks to run")
+        return 2
+    multi = notebooks != [default_notebook]
+    
+    if not multi:
+        reports_dir.mkdir(parents=True, exist_ok=True)
+        state_path.parent.mkdir(parents=True, exist_ok=True)
+    
+    if args.verbose:
+        print(f"[INFO] config={args.config}")
+        for nb in notebooks:
+            prefix = f"[INFO] {nb.name}: " if multi else "[INFO] "
+            print(f"{prefix}notes_dir={nb.notes_dir}")
+            print(f"{prefix}reports_dir={nb.reports_dir}")
+            print(f"{prefix}template_path={nb.template_path}")
+            print(f"{prefix}state_path={nb.state_path}")
+            print(f"{prefix}report_path={nb.report_path}")
+        print(f"[INFO] use_rag={use_rag} rag_url={rag_url} top_k={rag_top_k}")
+        print(f"[INFO] rag_budget_s={rag_budget_s} rag_max_failures={rag_max_failures}")
+        print(f"[INFO] rag_provider={rag_provider} rag_ingest_url={rag_ingest_url or '-'}")
+        print(f"[INFO] scan_backend={scan_backend} fingerprint={fingerprint}")
+        print(f"[INFO] render_workers={render_workers} pipeline={pipeline}")
+        print(f"[INFO] nice={nice} io_limit={io_limit}")
+    
+    if args.metrics_summary:
+        from ops_notebook.core.metrics import METRICS_FILENAME, load_history, summarize_history
+        
+        for nb in notebooks:
+            if multi:
+                print(f"[INFO] notebook {nb.name}")
+            rows = load_history(nb.state_path.parent / METRICS_FILENAME)
+            print(
+                summarize_history(
+                    rows,
+                    baseline_runs=int(metrics_cfg.get("baseline_runs") or 10),
+                    slow_factor=float(metrics_cfg.get("slow_factor") or 1.5),
+                )
+            )
+        return 0
+    
+    if args.rollup:
+        from ops_notebook.core.rollup import write_rollup
+        
+        for nb in notebooks:
+            try:
+                written = write_rollup(
+                    nb.state_path.parent,
+                    nb.reports_dir,
+                    args.rollup,
+                    args.rollup_period,
+                    markdown=markdown,
+                    json_output=json_output,
+                )
+            except ValueError as e:
+                print(f"[FAIL] {e}")
+                return 2
+            print(f"[OK] {args.rollup} rollup generated: {written}" + (f" ({nb.name})" if multi else ""))
+        return 0
+    
+    if nice and not args.doctor:
+        applied = lower_priority()
+        print(f"[INFO] low priority: {', '.join(applied) or 'not supported here'}")
+    
+    rag_cached = use_rag and rag_provider != "local"
+    shared = SharedResources.create(state_path.parent, render_workers, rag_cached) if multi else None
+    try:
+        if args.warm_rag:
+            from ops_notebook.core.warm import warm_rag_cache
+            
+            if not rag_cached:
+                print("[INFO] warm-rag: nothing to warm (RAG disabled or rag.provider=local)")
+                return 0
+            
+            def _warm(nb: Notebook) -> None:
+                warm_rag_cache(
+                    notes_dir=nb.notes_dir,
+                    state_path=nb.state_path,
+                    rag_url=rag_url,
+                    rag_top_k=rag_top_k,
+                    rag_timeout_s=rag_timeout_s,
+                    concurrency=rag_warm_concurrency,
+                    rag_budget_s=rag_budget_s,
+                    rag_max_failures=rag_max_failures,
+                    lock_timeout_s=lock_timeout_s,
+                    verbose=args.verbose,
+                    rag_session=shared.rag_session if shared else None,
+                    rag_cache=shared.rag_cache if shared else None,
+                    rag_namespace=nb.name,
+                    ingest_url=rag_ingest_url,
+                    ingest_batch_size=rag_ingest_batch_size,
+                )
+            
+            if multi:
+                results = run_notebooks(notebooks, _warm)
+                print(format_summary(results))
+                return 0 if all(r.ok for r in results) else 1
+            try:
+                _warm(default_notebook)
+            except RunLockTimeout as e:
+                print(f"[FAIL] {e}")
+                return 3
+            return 0
+        
+        if args.doctor:
+            from ops_notebook.core.doctor import run_doctor
+            
+            all_ok = True
+            for nb in notebooks:
+                res = run_doctor(
+                    notes_dir=nb.notes_dir,
+                    reports_dir=nb.reports_dir,
+                    template_path=nb.template_path,
+                    state_path=nb.state_path,
+                    use_rag=use_rag,
+                    rag_url=rag_url,
+                    rag_timeout_s=rag_timeout_s,
+                    rag_budget_s=rag_budget_s,
+                    rag_max_failures=rag_max_failures,
+                    rag_provider=rag_provider,
+                    fingerprint=fingerprint,
+                    rag_cache_path=shared.rag_cache.path if shared and shared.rag_cache else None,
+                )
+                print(f"{res.summary} ({nb.name})" if multi else res.summary)
+                print(res.details)
+                all_ok = all_ok and res.ok
+            return 0 if all_ok else 2
+        
+        def _report(nb: Notebook) -> Path:
+            prom = Path(prom_textfile) if prom_textfile else None
+            if prom is not None and multi:
+                # one textfile per notebook (node_exporter reads every *.prom in the dir)
+                prom = prom.with_name(f"{prom.stem}.{nb.name}{prom.suffix}")
+            return generate_weekly_report(
+                notes_dir=nb.notes_dir,
+                reports_dir=nb.reports_dir,
+                report_path=nb.report_path,
+                template_path=nb.template_path,
+                state_path=nb.state_path,
+                use_rag=use_rag,
+                rag_url=rag_url,
+                rag_top_k=rag_top_k,
+                rag_query=rag_query,
+                verbose=args.verbose,
+                render_workers=render_workers,
+                pipeline=pipeline,
+                queue_size=queue_size,
+                rag_concurrency=rag_concurrency,
+                rag_timeout_s=rag_timeout_s,
+                rag_budget_s=rag_budget_s,
+                rag_max_failures=rag_max_failures,
+                scan_backend=scan_backend,
+                fingerprint=fingerprint,
+                append_only=append_only,
+                rag_provider=rag_provider,
+                near_dup=near_dup,
+                near_dup_max_distance=near_dup_max_distance,
+                metrics=metrics_enabled,
+                prometheus_textfile=prom,
+                markdown=markdown,
+                json_output=json_output,
+                scope=scope,
+                lock_timeout_s=lock_timeout_s,
+                budget_lines=budget_lines,
+                budget_bytes=budget_bytes,
+                render_executor=shared.render_executor if shared else None,
+                rag_session=shared.rag_session if shared else None,
+                rag_cache=shared.rag_cache if shared else None,
+                rag_namespace=nb.name,
+                io_limit=io_limit,
+                ingest_url=rag_ingest_url,
+                ingest_batch_size=rag_ingest_batch_size,
+            )
+        
+        if multi:
+            results = run_notebooks(notebooks, _report)
+            print(format_summary(results))
+            return 0 if all(r.ok for r in results) else 1
+        try:
+            _report(default_notebook)
+        except RunLockTimeout as e:
+            print(f"[FAIL] {e}")
+            return 3
+        return 0
+    finally:
+        if shared is not None:
+            shared.close()
@@ -17,6 +17,72 @@ DEFAULT_CONFIG: Dict[str, Any] = {
         "url": "http://127.0.0.1:8000/query",
         "top_k": 3,
         "query": "",
+        # parallel RAG lookups in the async pipeline
+        "concurrency": 4,
+        # parallel RAG lookups for --warm-rag (keep low; it runs on a daily schedule)
+        "warm_concurrency": 1,
+        # per-call timeout, total deadline for the RAG phase (0 = none),
+        # and consecutive failures before the circuit breaker stops querying
+        "timeout_s": 12,
+        "budget_s": 60,
+        "max_failures": 3,
+        # "http" (local-rag-kit server) | "local" (offline BM25 index in .ops_state)
+        # | "auto" (server; local index for files it can't answer)
+        "provider": "http",
+        # incremental push of changed/new/deleted notes to the server's index ("" = off)
+        "ingest_url": "",
+        "ingest_batch_size": 50,
+    },
+    "scan": {
+        # "files" (hash every note, keep snapshots) | "git" (notes_dir is a git working tree)
+        "backend": "files",
+        # file backend fingerprint: "sha256" | "blake2b" (faster); switching migrates the state
+        "fingerprint": "sha256",
+        # journal-style notes that only grow: diff / snapshot just the appended bytes
+        "append_only": False,
+        # cap on bytes/s read for fingerprints + written to snapshots ("20M"; 0 = unlimited)
+        "io_limit": 0,
+        # low CPU/IO priority (same as --nice); implies io_limit 20M when unset
+        "nice": False,
+    },
+    "render": {
+        # per-file diff/digest rendering: 0 = auto (cpu count), 1 = in-process only
+        "workers": 0,
+        # total size budget for the diff sections (0 = unlimited): biggest changes get
+        # full diffs first, the rest stat-only lines once it's spent
+        "budget_lines": 0,
+        "budget_bytes": 0,
+    },
+    "pipeline": {
+        # "sequential" (default) | "async" (overlap scan / diff / RAG / snapshot writes)
+        "mode": "sequential",
+        # bounded queue size between async stages
+        "queue_size": 32,
+    },
+    "near_dup": {
+        # report changed notes that have near-identical copies (SimHash signatures);
+        # opt-in: the first run reads every note to build the signatures
+        "enabled": False,
+        # max differing signature bits (of 64) to count as near-duplicate
+        "max_distance": 7,
+    },
+    "lock": {
+        # how long a run waits for another run holding .ops_state/run.lock
+        "timeout_s": 900,
+    },
+    "output": {
+        # Markdown report (reports/YYYY-Www.md) and/or JSON sidecar (reports/YYYY-Www.json)
+        "markdown": True,
+        "json": True,
+    },
+    "metrics": {
+        # append one row per run to .ops_state/metrics.ndjson
+        "enabled": True,
+        # optional node_exporter textfile collector output (e.g. /var/lib/node_exporter/ops_notebook.prom)
+        "prometheus_textfile": "",
+        # --metrics-summary flags runs slower than slow_factor x median of the previous baseline_runs
+        "baseline_runs": 10,
+        "slow_factor": 1.5,
     },
 }
 
@@ -52,4 +118,7 @@ def load_config(path: Path) -> Dict[str, Any]:
     # basic normalization
     if "rag" not in merged or not isinstance(merged["rag"], dict):
         merged["rag"] = dict(DEFAULT_CONFIG["rag"])
+    for section in ("scan", "render", "pipeline", "near_dup", "lock", "output", "metrics"):
+        if section not in merged or not isinstance(merged[section], dict):
+            merged[section] = dict(DEFAULT_CONFIG[section])
     return merged
\ No newline at end of file
@@ -2,7 +2,8 @@ from pathlib import Path
 
 SUPPORTED_SUFFIXES = {".md", ".txt"}
 
-DEFAULT_STATE_VERSION = 1
+# v2: records the fingerprint algorithm ("fingerprint"); v1 states are implicitly sha256
+DEFAULT_STATE_VERSION = 2
 
 # Safety limits (so your report doesn't become a novel)
 MAX_PREVIEW_CHARS = 220
@@ -0,0 +1,122 @@
+from __future__ import annotations
+
+import json
+import threading
+from pathlib import Path
+from typing import Any, Collection, Dict, Mapping, Optional, Tuple
+
+from .render import NoteMeta
+
+DERIVED_FILENAME = "derived.json"
+
+
+def _empty() -> Dict[str, Any]:
+    return {"version": 1, "items": {}}
+
+
+class DerivedCache:
+    """
+    Derived metadata per content fingerprint, stored at
+      .ops_state/derived.json
+
+    Title, previews and line/word counts only depend on the content, so a note whose
+    fingerprint was seen before (renamed, reverted, already warmed, near-dup title
+    lookups) is served from here without reading the file. Entries for fingerprints no
+    longer in the state are dropped by `prune()`. Thread-safe (async pipeline loaders).
+    """
+
+    def __init__(self, path: Path):
+        self.path = path
+        self.data: Dict[str, Any] = _empty()
+        self.hits = 0
+        self.misses = 0
+        self._dirty = False
+        self._lock = threading.Lock()
+
+    def load(self) -> None:
+        if not self.path.exists():
+            return
+        try:
+            loaded = json.loads(self.path.read_text(encoding="utf-8"))
+            if isinstance(loaded, dict) and isinstance(loaded.get("items"), dict):
+                self.data = loaded
+        except Exception:
+            # rebuilt as notes are read
+            self.data = _empty()
+
+    def save(self) -> None:
+        if not self._dirty:
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_suffix(self.path.suffix + ".tmp")
+        with self._lock:
+            text = json.dumps(self.data, ensure_ascii=False)
+            self._dirty = False
+        tmp.write_text(text, encoding="utf-8")
+        tmp.replace(self.path)
+
+    def __len__(self) -> int:
+        return len(self.data.get("items", {}))
+
+    def get(self, sha: Optional[str]) -> Optional[NoteMeta]:
+        item = self.data["items"].get(sha) if sha else None
+        if not isinstance(item, dict):
+            with self._lock:
+                self.misses += 1
+            return None
+        try:
+            meta = NoteMeta(
+                heading=item.get("heading"),
+                preview=str(item["preview"]),
+                query_preview=str(item["query_preview"]),
+                lines=int(item["lines"]),
+                words=int(item["words"]),
+            )
+        except (KeyError, TypeError, ValueError):
+            with self._lock:
+                self.misses += 1
+            return None
+        with self._lock:
+            self.hits += 1
+        return meta
+
+    def put(self, sha: Optional[str], meta: NoteMeta) -> None:
+        # head-only metadata (append-only path) is not complete enough to cache
+        if not sha or meta.lines is None or meta.words is None:
+            return
+        with self._lock:
+            self.data["items"][sha] = {
+                "heading": meta.heading,
+                "preview": meta.preview,
+                "query_preview": meta.query_preview,
+                "lines": meta.lines,
+                "words": meta.words,
+            }
+            self._dirty = True
+
+    def migrate(self, migrations: Mapping[str, Tuple[str, str]]) -> int:
+        """
+        Re-key entries after a fingerprint algorithm change (relpath -> (old, new)).
+        """
+        items = self.data["items"]
+        moved = 0
+        with self._lock:
+            for _rel, (old_sha, new_sha) in migrations.items():
+                item = items.pop(old_sha, None)
+                if item is not None:
+                    items[new_sha] = item
+                    moved += 1
+            self._dirty = self._dirty or moved > 0
+        return moved
+
+    def prune(self, live: Collection[str]) -> int:
+        """
+        Drops entries for fingerprints not in `live` (the state's). Returns how many.
+        """
+        items = self.data["items"]
+        with self._lock:
+            stale = [sha for sha in items if sha not in live]
+            for sha in stale:
+                del items[sha]
+            self._dirty = self._dirty or bool(stale)
+        return len(stale)
@@ -1,9 +1,18 @@
 from __future__ import annotations
 
+import time
 from dataclasses import dataclass
 from pathlib import Path
+from typing import Optional
 
-from .rag_client import RagClient
+from .hashing import DEFAULT_FINGERPRINT
+from .local_index import LocalIndex
+from .perf_profile import collect_perf_profile
+from .rag_client import CircuitBreaker, RagClient
+from .rag_phase import DEFAULT_RAG_BUDGET_S, DEFAULT_RAG_MAX_FAILURES
+from .run_lock import RunLock
+
+RAG_LATENCY_PINGS = 5
 
 
 @dataclass
@@ -39,9 +48,16 @@ def run_doctor(
     state_path: Path,
     use_rag: bool,
     rag_url: str,
+    rag_timeout_s: float = 12,
+    rag_budget_s: float = DEFAULT_RAG_BUDGET_S,
+    rag_max_failures: int = DEFAULT_RAG_MAX_FAILURES,
+    rag_provider: str = "http",
+    fingerprint: str = DEFAULT_FINGERPRINT,
+    rag_cache_path: Optional[Path] = None,
 ) -> DoctorResult:
     lines = []
     ok = True
+    rag_latency_s: list[float] = []
     
     #notes dir
     if _exists_dir(notes_dir):
@@ -71,22 +87,79 @@ def run_doctor(
         ok = False
         lines.append(f"[FAIL] state_dir not writable: {state_path.parent}")
     
+    # concurrent run (doctor itself doesn't take the lock; it only reads)
+    lock = RunLock(state_path.parent / "run.lock")
+    if lock.is_held():
+        h = lock.holder()
+        lines.append(
+            f"[WARN] a report run is in progress (pid {h.get('pid', '?')}, since {h.get('started_at', '?')}); "
+            "a new run would wait for it"
+        )
+    else:
+        lines.append("[OK] no report run in progress")
+    
     # rag (optional)
-    if use_rag:
-        try:
-            clinet = RagClient(rag_url=rag_url, timeout_s=5)
-            evs = clinet.query_topk(query="doctor ping", top_k=1, max_chars=80)
-            if evs is not None:
-                lines.append(f"[OK] RAG reachable: {rag_url}")
-            else:
-                ok = False
-                lines.append(f"[FAIL] RAG returned no response: {rag_url}")
-        except Exception as e:
+    if use_rag and rag_provider in ("local", "auto"):
+        index = LocalIndex(state_path.parent / "local_index.json")
+        index.load()
+        if len(index):
+            lines.append(f"[OK] local index: {len(index)} notes ({index.path})")
+        else:
+            lines.append(f"[OK] local index empty; built on the next report run ({index.path})")
+
+    if use_rag and rag_provider == "local":
+        lines.append("[OK] RAG provider: local (no server needed)")
+    elif use_rag:
+        # same breaker the report uses: ping until success or until it would trip
+        breaker = CircuitBreaker(rag_max_failures)
+        client = RagClient(rag_url=rag_url, timeout_s=5)
+        last_error = ""
+        while not breaker.is_open:
+            try:
+                client.query_topk(query="doctor ping", top_k=1, max_chars=80)
+                breaker.record_success()
+                break
+            except Exception as e:
+                breaker.record_failure()
+                last_error = str(e)
+        
+        if breaker.is_open and rag_provider == "auto":
+            lines.append(f"[WARN] RAG unreachable: {rag_url} ({last_error})")
+            lines.append("[WARN] report would use local index evidence (rag.provider=auto)")
+        elif breaker.is_open:
             ok = False
-            lines.append(f"[FAIL] RAG unreachable: {rag_url} ({e})")
+            worst_case_s = breaker.max_failures * rag_timeout_s
+            if rag_budget_s > 0:
+                worst_case_s = min(worst_case_s, rag_budget_s)
+            lines.append(f"[FAIL] RAG unreachable: {rag_url} ({last_error})")
+            lines.append(
+                f"[FAIL] RAG circuit breaker would trip ({breaker.max_failures} consecutive failures); "
+                f"report would give up on RAG after <= {worst_case_s:g}s"
+            )
+        else:
+            lines.append(f"[OK] RAG reachable: {rag_url}")
+            lines.append(
+                f"[OK] RAG circuit breaker would not trip (budget {rag_budget_s:g}s, "
+                f"max {breaker.max_failures} consecutive failures)"
+            )
+            for _ in range(RAG_LATENCY_PINGS):
+                t = time.perf_counter()
+                try:
+                    client.query_topk(query="doctor ping", top_k=1, max_chars=80)
+                except Exception:
+                    continue
+                rag_latency_s.append(time.perf_counter() - t)
     else:
         lines.append("[OK] RAG disabled")
     
+    # performance profile (warnings only; never fails the doctor)
+    profile = collect_perf_profile(notes_dir, state_path, fingerprint, rag_cache_path)
+    profile.rag_latency_s = rag_latency_s
+    lines.append("[INFO] performance profile:")
+    lines += profile.lines()
+    warnings = profile.warnings(rag_budget_s)
+    lines += warnings or ["[OK] no performance warnings"]
+    
     summary = "DOCTOR OK" if ok else "DOCTOR FAIL"
     details = "\n".join(lines)
     return DoctorResult(ok=ok, summary=summary, details=details)
\ No newline at end of file
@@ -0,0 +1,287 @@
+from __future__ import annotations
+
+import os
+import subprocess
+from pathlib import Path
+from typing import Collection, Dict, Iterator, List, Optional, Sequence
+
+from .constants import SUPPORTED_SUFFIXES
+from .hashing import FINGERPRINT_ALGORITHMS, fingerprint_file
+from .scanner import ScanItem, ScanScope, ScanStats, is_wanted, scan_order_key
+from .state import FileState, StateStore, _now_iso_local
+from .weekly import WeekWindow
+
+# the state's fingerprint algorithm when this backend is used
+GIT_FINGERPRINT = "git-blob"
+
+
+class GitBackendError(RuntimeError):
+    pass
+
+
+def _git(notes_dir: Path, *args: str, stdin: Optional[bytes] = None) -> bytes:
+    # never take the index lock / refresh the index of the user's repository
+    env = dict(os.environ, GIT_OPTIONAL_LOCKS="0")
+    try:
+        r = subprocess.run(
+            ["git", *args],
+            cwd=notes_dir,
+            input=stdin,
+            capture_output=True,
+            env=env,
+            check=False,
+        )
+    except OSError as e:
+        raise GitBackendError(f"git not available: {e}") from e
+    if r.returncode != 0:
+        err = r.stderr.decode("utf-8", errors="replace").strip()
+        raise GitBackendError(f"git {' '.join(args)} failed: {err}")
+    return r.stdout
+
+
+def _split_z(out: bytes) -> List[str]:
+    return [p.decode("utf-8", errors="surrogateescape") for p in out.split(b"\0") if p]
+
+
+def _is_note(relpath: str) -> bool:
+    return Path(relpath).suffix.lower() in SUPPORTED_SUFFIXES
+
+
+def is_git_worktree(notes_dir: Path) -> bool:
+    try:
+        return _git(notes_dir, "rev-parse", "--is-inside-work-tree").strip() == b"true"
+    except GitBackendError:
+        return False
+
+
+class GitSnapshots:
+    """
+    Read-only stand-in for SnapshotStore: previous note text comes from git's object
+    database (the blob id recorded in the state at the last run), falling back to
+    HEAD. Nothing is ever written, so no snapshot copies are kept.
+    """
+
+    writes_snapshots = False
+
+    def __init__(self, notes_dir: Path):
+        self.notes_dir = notes_dir
+        self.old_blobs: Dict[str, str] = {}  # relpath -> blob id at the last run
+        self.content_unchanged: set[str] = set()  # exact renames: old text == current text
+
+    def exists(self, relpath: str) -> bool:
+        return True
+
+    def load_text(self, relpath: str) -> str | None:
+        if relpath in self.content_unchanged:
+            try:
+                return (self.notes_dir / relpath).read_text(encoding="utf-8", errors="replace")
+            except OSError:
+                return None
+        # every blob recorded in the state was written by the scan (hash-object -w);
+        # HEAD is the fallback if it was garbage-collected since
+        blob = self.old_blobs.get(relpath)
+        attempts = [("cat-file", "blob", blob)] if blob else []
+        attempts.append(("show", f"HEAD:./{relpath}"))
+        for args in attempts:
+            try:
+                return _git(self.notes_dir, *args).decode("utf-8", errors="replace")
+            except GitBackendError:
+                continue
+        return None
+
+    def save_text(self, relpath: str, text: str) -> None:
+        return None
+
+    def delete(self, relpath: str) -> None:
+        return None
+
+
+def _working_tree_blobs(
+    notes_dir: Path,
+    hashed: Optional[List[str]] = None,
+    pathspecs: Sequence[str] = (".",),
+) -> Dict[str, str]:
+    """
+    relpath -> blob id of the current working tree content, for notes under notes_dir.
+    Clean tracked files come straight from the index; only files git reports as
+    modified (stat cache mismatch) or untracked are hashed. Hashed blobs are written to
+    the object database (not the index), so the next run can diff against them.
+    """
+    blobs: Dict[str, str] = {}
+    for entry in _split_z(_git(notes_dir, "ls-files", "-s", "-z", "--", *pathspecs)):
+        meta, _, rel = entry.partition("\t")
+        parts = meta.split()
+        # skip gitlinks (submodules) and unmerged higher stages
+        if len(parts) == 3 and parts[0] != "160000" and parts[2] == "0" and _is_note(rel):
+            blobs[rel] = parts[1]
+
+    to_hash: List[str] = []
+    dirty = _split_z(_git(notes_dir, "diff-files", "-z", "--name-status", "--relative", "--", *pathspecs))
+    for status, rel in zip(dirty[0::2], dirty[1::2]):
+        if rel not in blobs:
+            continue
+        if status.startswith("D"):
+            blobs.pop(rel, None)
+        else:
+            to_hash.append(rel)
+
+    untracked = _split_z(_git(notes_dir, "ls-files", "--others", "--exclude-standard", "-z", "--", *pathspecs))
+    to_hash.extend(rel for rel in untracked if _is_note(rel))
+
+    if to_hash:
+        base = notes_dir.resolve()
+        # --stdin-paths resolves relative paths against the repo root, so pass absolute ones
+        stdin = "\n".join(str(base / rel) for rel in to_hash).encode("utf-8", errors="surrogateescape")
+        shas = _git(notes_dir, "hash-object", "-w", "--stdin-paths", stdin=stdin).decode().split()
+        blobs.update(zip(to_hash, shas))
+        if hashed is not None:
+            hashed.extend(to_hash)
+    return blobs
+
+
+def iter_git_scan(
+    notes_dir: Path,
+    store: StateStore,
+    snapshots: GitSnapshots,
+    statuses: Collection[str] | None = None,
+    window: WeekWindow | None = None,
+    stats: ScanStats | None = None,
+    scope: ScanScope | None = None,
+) -> Iterator[ScanItem]:
+    """
+    iter_scan() equivalent for notes_dir inside a git working tree. Fingerprints are
+    git blob ids; exact renames (a deleted note's blob reappearing under a new path)
+    are reported once as "renamed". Fills `snapshots.old_blobs` for diffs.
+    A `scope` limits git's work to those pathspecs and leaves other entries untouched
+    (renames are only detected within the scope).
+    Updates store entries (but does NOT save to disk; caller saves).
+    """
+    now = _now_iso_local()
+    if scope is not None and store.algorithm != GIT_FINGERPRINT:
+        raise GitBackendError("scoped git scans need a state already migrated to git blob ids")
+
+    def _in_scope(rel: str) -> bool:
+        return scope is None or scope.contains(rel)
+
+    pathspecs: Sequence[str] = (".",)
+    if scope is not None and scope.paths and not scope.globs:
+        pathspecs = scope.paths
+    hashed: List[str] = []
+    blobs = _working_tree_blobs(notes_dir, hashed, pathspecs)
+    if scope is not None:
+        blobs = {rel: blob for rel, blob in blobs.items() if scope.contains(rel)}
+    if stats is not None:
+        for rel in hashed:
+            try:
+                stats.bytes_hashed += (notes_dir / rel).stat().st_size
+            except OSError:
+                continue
+
+    # state written with another algorithm (file backend): compare the old digest of the
+    # current content once, then store blob ids (same migration as iter_scan)
+    old_algorithm = store.algorithm
+    migrating = old_algorithm != GIT_FINGERPRINT and old_algorithm in FINGERPRINT_ALGORITHMS
+
+    # previous blob -> relpath, for notes that disappeared this run
+    vanished: Dict[str, str] = {}
+    for rel in store.all_relpaths():
+        prev = store.get(rel)
+        if rel not in blobs and _in_scope(rel) and prev is not None and prev.sha256 is not None:
+            vanished.setdefault(prev.sha256, rel)
+
+    renamed_away: set[str] = set()
+    for rel in sorted(blobs):
+        blob = blobs[rel]
+        prev = store.get(rel)
+        renamed_from: Optional[str] = None
+
+        if prev is None or prev.sha256 is None:
+            renamed_from = vanished.pop(blob, None) if not migrating else None
+            status = "renamed" if renamed_from else "new"
+        elif prev.sha256 == blob:
+            status = "unchanged"
+        elif migrating and fingerprint_file(notes_dir / rel, old_algorithm) == prev.sha256:
+            store.migrations[rel] = (prev.sha256, blob)
+            status = "unchanged"
+            if stats is not None:
+                stats.bytes_hashed += prev.size or 0
+        else:
+            status = "changed"
+
+        if status == "unchanged" and prev is not None:
+            size, mtime_epoch = prev.size, prev.mtime_epoch
+            last_changed_at = prev.last_changed_at
+        else:
+            st = (notes_dir / rel).stat()
+            size, mtime_epoch = int(st.st_size), float(st.st_mtime)
+            last_changed_at = now
+
+        if status == "changed" and prev is not None and not migrating:
+            snapshots.old_blobs[rel] = prev.sha256 or ""
+        elif renamed_from:
+            snapshots.content_unchanged.add(rel)
+
+        store.set(
+            rel,
+            FileState(
+                sha256=blob,
+                size=size,
+                mtime_epoch=mtime_epoch,
+                last_changed_at=last_changed_at,
+                last_scanned_at=now,
+            ),
+        )
+        if renamed_from:
+            renamed_away.add(renamed_from)
+        if stats is not None:
+            stats.files += 1
+            stats.count(status)
+        item = ScanItem(
+            relpath=rel,
+            abspath=notes_dir / rel,
+            status=status,
+            sha256=blob,
+            size=size,
+            mtime_epoch=mtime_epoch,
+            last_changed_at=last_changed_at,
+            renamed_from=renamed_from,
+            prev_sha256=prev.sha256 if status == "changed" and prev is not None else None,
+        )
+        if is_wanted(item, statuses, window):
+            yield item
+
+    for rel in store.all_relpaths():
+        if rel in blobs or not _in_scope(rel):
+            continue
+        prev = store.get(rel)
+        if prev is None:
+            continue
+        if rel in renamed_away:
+            # reported as part of the rename; drop the vacated path so it doesn't
+            # resurface as a deletion in later runs
+            store.remove(rel)
+            continue
+        if prev.sha256 is not None:
+            store.mark_deleted(rel)
+            if stats is not None:
+                stats.count("deleted")
+            prev = store.get(rel)
+        item = ScanItem(
+            relpath=rel,
+            abspath=None,
+            status="deleted",
+            sha256=None,
+            size=None,
+            mtime_epoch=None,
+            last_changed_at=prev.last_changed_at if prev else now,
+        )
+        if is_wanted(item, statuses, window):
+            yield item
+
+    store.set_algorithm(GIT_FINGERPRINT)
+
+
+def git_scan(notes_dir: Path, store: StateStore, snapshots: GitSnapshots) -> List[ScanItem]:
+    results = list(iter_git_scan(notes_dir, store, snapshots))
+    results.sort(key=scan_order_key)
+    return results
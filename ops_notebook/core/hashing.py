@@ -1,10 +1,112 @@
 import hashlib
+import os
+from dataclasses import dataclass
 from pathlib import Path
+from typing import Dict, Iterable, Optional
+
+# Fingerprints only detect change, they don't need cryptographic strength.
+#   sha256   - default, what older states contain
+#   blake2b  - faster on most hosts (256-bit digest, same hex length as sha256)
+#   git-blob - git's blob id (sha1 of "blob <size>\0" + content), used by the git backend
+FINGERPRINT_ALGORITHMS = ("sha256", "blake2b", "git-blob")
+# plain content digests: the hash of an old prefix can be continued over appended bytes
+# (scan.append_only); git-blob hashes the size first
+APPENDABLE_FINGERPRINTS = ("sha256", "blake2b")
+DEFAULT_FINGERPRINT = "sha256"
+
+CHUNK_SIZE = 1024 * 1024
+
+
+def _new_hasher(algorithm: str, size: int):
+    if algorithm == "sha256":
+        return hashlib.sha256()
+    if algorithm == "blake2b":
+        return hashlib.blake2b(digest_size=32)
+    if algorithm == "git-blob":
+        h = hashlib.sha1()
+        h.update(b"blob %d\0" % size)
+        return h
+    raise ValueError(f"unknown fingerprint algorithm: {algorithm}")
+
+
+def fingerprint_file(path: Path, algorithm: str = DEFAULT_FINGERPRINT) -> str:
+    with path.open("rb") as f:
+        if algorithm == "git-blob":
+            h = _new_hasher(algorithm, os.fstat(f.fileno()).st_size)
+            buf = bytearray(CHUNK_SIZE)
+            view = memoryview(buf)
+            while n := f.readinto(buf):
+                h.update(view[:n])
+            return h.hexdigest()
+        # file_digest reads into a reusable buffer (no per-chunk bytes objects)
+        return hashlib.file_digest(f, lambda: _new_hasher(algorithm, 0)).hexdigest()
+
+
+def fingerprint_file_multi(path: Path, algorithms: Iterable[str]) -> Dict[str, str]:
+    """
+    Several fingerprints from a single read pass (used when migrating the state
+    from one algorithm to another).
+    """
+    with path.open("rb") as f:
+        size = os.fstat(f.fileno()).st_size
+        hashers = {a: _new_hasher(a, size) for a in dict.fromkeys(algorithms)}
+        buf = bytearray(CHUNK_SIZE)
+        view = memoryview(buf)
+        while n := f.readinto(buf):
+            chunk = view[:n]
+            for h in hashers.values():
+                h.update(chunk)
+    return {a: h.hexdigest() for a, h in hashers.items()}
 
 
 def sha256_file(path: Path) -> str:
-    h = hashlib.sha256()
+    return fingerprint_file(path, "sha256")
+
+
+@dataclass(frozen=True)
+class AppendFingerprint:
+    digest: str
+    bytes_read: int
+    # set when the note was verified as an append: old size and old line count
+    appended_from: Optional[int] = None
+    old_lines: Optional[int] = None
+
+
+def append_fingerprint_file(
+    path: Path, algorithm: str, prev_size: int, prev_digest: str
+) -> Optional[AppendFingerprint]:
+    """
+    Fingerprint a note that (presumably) only grew since the last scan, in one read
+    pass: the old prefix (first `prev_size` bytes) is hashed and must give
+    `prev_digest`, so an edit anywhere in it is caught; the same hasher then continues
+    over the appended bytes (hashlib's hexdigest() doesn't finalize it).
+    None if the note didn't grow or `algorithm` can't be continued: the caller does a
+    full pass. If the prefix differs (or didn't end with a newline) the digest is still
+    completed from this pass, without `appended_from`.
+    """
+    if algorithm not in APPENDABLE_FINGERPRINTS:
+        return None
+    h = _new_hasher(algorithm, 0)
+    old_lines = 0
+    last = b""
     with path.open("rb") as f:
-        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+        size = os.fstat(f.fileno()).st_size
+        if prev_size <= 0 or size <= prev_size:
+            return None
+        left = prev_size
+        while left and (chunk := f.read(min(CHUNK_SIZE, left))):
             h.update(chunk)
-    return h.hexdigest()
\ No newline at end of file
+            old_lines += chunk.count(b"\n")
+            last = chunk[-1:]
+            left -= len(chunk)
+        clean = not left and last == b"\n" and h.hexdigest() == prev_digest
+        buf = bytearray(CHUNK_SIZE)
+        view = memoryview(buf)
+        read = prev_size - left
+        while n := f.readinto(buf):
+            h.update(view[:n])
+            read += n
+
+    if not clean:
+        return AppendFingerprint(h.hexdigest(), read)
+    return AppendFingerprint(h.hexdigest(), read, appended_from=prev_size, old_lines=old_lines)
@@ -0,0 +1,157 @@
+from __future__ import annotations
+
+import math
+import re
+import threading
+from collections import Counter
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from .rag_client import RagEvidence
+from .sidecar import NoteSidecar
+from .state import StateStore
+
+# retrieval unit: paragraphs merged up to this size
+CHUNK_CHARS = 800
+# stored per chunk for snippets (queries never ask for more than a few hundred chars)
+STORED_SNIPPET_CHARS = 1000
+
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+_HANGUL_RE = re.compile(r"[가-힣]")
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    Lowercased word tokens. Hangul words also contribute character bigrams, so
+    "노트를" still matches "노트" without a morphological analyzer.
+    """
+    out: List[str] = []
+    for tok in _TOKEN_RE.findall(text.lower()):
+        out.append(tok)
+        if len(tok) > 2 and _HANGUL_RE.search(tok):
+            out.extend(tok[i : i + 2] for i in range(len(tok) - 1))
+    return out
+
+
+def _chunks(text: str) -> List[str]:
+    chunks: List[str] = []
+    buf = ""
+    for para in re.split(r"\n\s*\n", text):
+        para = para.strip()
+        if not para:
+            continue
+        if buf and len(buf) + len(para) + 2 > CHUNK_CHARS:
+            chunks.append(buf)
+            buf = ""
+        buf = f"{buf}\n\n{para}" if buf else para
+    if buf:
+        chunks.append(buf)
+    return chunks
+
+
+class LocalIndex(NoteSidecar):
+    """
+    Offline lexical evidence provider: a BM25 inverted index over notes_dir stored at
+      .ops_state/local_index.json
+
+    Chunks (paragraph groups) are indexed per note and re-indexed only when the
+    note's fingerprint in the state differs from the one the index saw, so each run
+    only reads changed/new notes (and drops deleted ones).
+
+    `query_topk` has the same shape as RagClient.query_topk and returns RagEvidence,
+    so it can stand in for the server (rag.provider: local) or back it up (auto).
+    """
+
+    def __init__(self, path: Path):
+        super().__init__(path)
+        self._lock = threading.Lock()
+
+    @classmethod
+    def _empty(cls) -> Dict[str, Any]:
+        return {"version": 1, "docs": {}, "postings": {}, "total_len": 0, "n_chunks": 0}
+
+    def remove(self, relpath: str) -> None:
+        doc = self.data["docs"].pop(relpath, None)
+        if not isinstance(doc, dict):
+            return
+        postings = self.data["postings"]
+        n = len(doc.get("chunks", []))
+        cids = {f"{relpath}#{i}" for i in range(n)}
+        for term in doc.get("terms", []):
+            plist = postings.get(term)
+            if not plist:
+                continue
+            for cid in cids:
+                plist.pop(cid, None)
+            if not plist:
+                del postings[term]
+        self.data["total_len"] -= sum(int(c.get("len", 0)) for c in doc.get("chunks", []))
+        self.data["n_chunks"] -= n
+        self._dirty = True
+
+    def update(self, relpath: str, sha: str, text: str) -> None:
+        self.remove(relpath)
+        postings = self.data["postings"]
+        chunks: List[Dict[str, Any]] = []
+        terms: set[str] = set()
+        for chunk in _chunks(text):
+            toks = tokenize(chunk)
+            if not toks:
+                continue
+            cid = f"{relpath}#{len(chunks)}"
+            for term, tf in Counter(toks).items():
+                postings.setdefault(term, {})[cid] = tf
+                terms.add(term)
+            chunks.append({"text": chunk[:STORED_SNIPPET_CHARS], "len": len(toks)})
+        self.data["docs"][relpath] = {"sha": sha, "terms": sorted(terms), "chunks": chunks}
+        self.data["total_len"] += sum(c["len"] for c in chunks)
+        self.data["n_chunks"] += len(chunks)
+        self._dirty = True
+
+    def sync(self, notes_dir: Path, store: StateStore) -> int:
+        with self._lock:
+            return super().sync(notes_dir, store)
+
+    def query_topk(
+        self,
+        query: str,
+        top_k: int = 3,
+        max_chars: int = 260,
+        timeout_s: Optional[float] = None,
+    ) -> List[RagEvidence]:
+        with self._lock:
+            n_chunks = int(self.data.get("n_chunks") or 0)
+            if n_chunks <= 0:
+                return []
+            avgdl = max(1.0, float(self.data.get("total_len") or 0) / n_chunks)
+            postings = self.data["postings"]
+
+            scores: Dict[str, float] = {}
+            lens: Dict[str, int] = {}
+            for term in set(tokenize(query)):
+                plist = postings.get(term)
+                if not plist:
+                    continue
+                df = len(plist)
+                idf = math.log(1.0 + (n_chunks - df + 0.5) / (df + 0.5))
+                for cid, tf in plist.items():
+                    dl = lens.get(cid)
+                    if dl is None:
+                        dl = lens[cid] = self._chunk(cid)["len"]
+                    denom = tf + BM25_K1 * (1 - BM25_B + BM25_B * dl / avgdl)
+                    scores[cid] = scores.get(cid, 0.0) + idf * tf * (BM25_K1 + 1) / denom
+
+            best = sorted(scores.items(), key=lambda kv: (-kv[1], kv[0]))[: max(0, int(top_k))]
+            evs: List[RagEvidence] = []
+            for cid, score in best:
+                rel = cid.rsplit("#", 1)[0]
+                snippet = self._chunk(cid)["text"][: int(max_chars)]
+                evs.append(RagEvidence(snippet=snippet, source=rel, score=round(score, 4)))
+            return evs
+
+    def _chunk(self, cid: str) -> Dict[str, Any]:
+        rel, _, idx = cid.rpartition("#")
+        return self.data["docs"][rel]["chunks"][int(idx)]
@@ -0,0 +1,212 @@
+from __future__ import annotations
+
+import json
+import os
+import statistics
+import time
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from .state import _now_iso_local
+
+METRICS_FILENAME = "metrics.ndjson"
+
+# a run is flagged when it took longer than SLOW_FACTOR x the median of the
+# previous BASELINE_RUNS runs (needs at least MIN_BASELINE_RUNS of history)
+DEFAULT_BASELINE_RUNS = 10
+DEFAULT_SLOW_FACTOR = 1.5
+MIN_BASELINE_RUNS = 3
+
+
+@dataclass
+class RunMetrics:
+    """
+    One row of .ops_state/metrics.ndjson (append-only, one JSON object per run).
+    """
+
+    started_at: str = field(default_factory=_now_iso_local)
+    duration_s: float = 0.0
+    pipeline: str = "sequential"
+    scan_backend: str = "files"
+    partial: bool = False  # scoped run (--paths/--include); not comparable with full runs
+    phases: Dict[str, float] = field(default_factory=dict)  # seconds per phase
+    counts: Dict[str, int] = field(default_factory=dict)  # notes by status
+    bytes_hashed: int = 0
+    snapshot_bytes_written: int = 0  # snapshot rewrites/appends of this run
+    throttle_s: float = 0.0  # time added by scan.io_limit / --nice pacing
+    rag: Dict[str, int] = field(default_factory=dict)  # calls / hits / errors / skipped / fallback
+    ingest: Dict[str, int] = field(default_factory=dict)  # rag.ingest_url: upserted / deleted / pending / ...
+    sizes: Dict[str, int] = field(default_factory=dict)  # bytes on disk: state and caches
+    _t0: float = field(default_factory=time.perf_counter, repr=False)
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        t = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases[name] = round(self.phases.get(name, 0.0) + time.perf_counter() - t, 4)
+
+    def finish(self) -> None:
+        self.duration_s = round(time.perf_counter() - self._t0, 4)
+
+    def to_row(self) -> Dict[str, Any]:
+        row = asdict(self)
+        row.pop("_t0", None)
+        return row
+
+
+def dir_size(path: Path) -> Tuple[int, int]:
+    """
+    (bytes, files) below `path`.
+    """
+    total = files = 0
+    try:
+        with os.scandir(path) as it:
+            for e in it:
+                try:
+                    if e.is_dir(follow_symlinks=False):
+                        b, n = dir_size(Path(e.path))
+                        total += b
+                        files += n
+                    else:
+                        total += e.stat(follow_symlinks=False).st_size
+                        files += 1
+                except OSError:
+                    continue
+    except OSError:
+        return 0, 0
+    return total, files
+
+
+def file_size(path: Path) -> int:
+    try:
+        return path.stat().st_size
+    except OSError:
+        return 0
+
+
+def append_metrics(path: Path, m: RunMetrics) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with path.open("a", encoding="utf-8") as f:
+        f.write(json.dumps(m.to_row(), ensure_ascii=False, separators=(",", ":")) + "\n")
+
+
+def load_history(path: Path) -> List[Dict[str, Any]]:
+    rows: List[Dict[str, Any]] = []
+    if not path.exists():
+        return rows
+    with path.open("r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                row = json.loads(line)
+            except Exception:
+                # a torn last line (crash mid-append) shouldn't hide the rest
+                continue
+            if isinstance(row, dict):
+                rows.append(row)
+    return rows
+
+
+def slow_runs(
+    rows: List[Dict[str, Any]],
+    baseline_runs: int = DEFAULT_BASELINE_RUNS,
+    slow_factor: float = DEFAULT_SLOW_FACTOR,
+) -> Dict[int, float]:
+    """
+    index -> rolling baseline (median duration of the previous runs of the same kind,
+    full or partial) for runs slower than slow_factor x baseline.
+    """
+    flagged: Dict[int, float] = {}
+    for i, row in enumerate(rows):
+        same_kind = [r for r in rows[:i] if bool(r.get("partial")) == bool(row.get("partial"))]
+        prev = [float(r.get("duration_s") or 0) for r in same_kind[-baseline_runs:]]
+        if len(prev) < MIN_BASELINE_RUNS:
+            continue
+        baseline = statistics.median(prev)
+        if baseline > 0 and float(row.get("duration_s") or 0) > slow_factor * baseline:
+            flagged[i] = baseline
+    return flagged
+
+
+def summarize_history(
+    rows: List[Dict[str, Any]],
+    last: int = 20,
+    baseline_runs: int = DEFAULT_BASELINE_RUNS,
+    slow_factor: float = DEFAULT_SLOW_FACTOR,
+) -> str:
+    if not rows:
+        return "[INFO] no runs recorded yet"
+    flagged = slow_runs(rows, baseline_runs, slow_factor)
+    lines = [
+        f"[INFO] {len(rows)} run(s) recorded; showing last {min(last, len(rows))}",
+        f"{'started_at':<26}{'dur_s':>7}{'notes':>7}{'changed':>9}{'hashed_MB':>11}"
+        f"{'rag_hit%':>10}{'rag_err':>9}{'state_KB':>10}{'snap_w_MB':>11}",
+    ]
+    start = max(0, len(rows) - last)
+    for i in range(start, len(rows)):
+        r = rows[i]
+        counts = r.get("counts") or {}
+        rag = r.get("rag") or {}
+        sizes = r.get("sizes") or {}
+        lookups = int(rag.get("hits", 0)) + int(rag.get("calls", 0))
+        hit_pct = f"{100.0 * int(rag.get('hits', 0)) / lookups:.1f}%" if lookups else "-"
+        changed = sum(int(counts.get(s, 0)) for s in ("changed", "new", "deleted", "renamed"))
+        lines.append(
+            f"{str(r.get('started_at', '?')):<26}"
+            f"{float(r.get('duration_s') or 0):7.2f}"
+            f"{int(counts.get('total', 0)):7d}"
+            f"{changed:9d}"
+            f"{int(r.get('bytes_hashed') or 0) / 1e6:11.1f}"
+            f"{hit_pct:>10}"
+            f"{int(rag.get('errors', 0)):9d}"
+            f"{int(sizes.get('state', 0)) / 1e3:10.1f}"
+            f"{int(r.get('snapshot_bytes_written') or 0) / 1e6:11.1f}"
+            + ("  SLOW" if i in flagged else "")
+        )
+    for i in sorted(flagged):
+        if i >= start:
+            r = rows[i]
+            lines.append(
+                f"[WARN] run {r.get('started_at', '?')} took {float(r.get('duration_s') or 0):.2f}s, "
+                f"> {slow_factor:g}x the median of the previous {baseline_runs} runs ({flagged[i]:.2f}s)"
+            )
+    return "\n".join(lines)
+
+
+def write_prometheus_textfile(path: Path, m: RunMetrics) -> None:
+    """
+    node_exporter textfile collector format (written atomically; the collector
+    may read the file at any time).
+    """
+    out: List[str] = []
+
+    def _metric(name: str, help_text: str, samples: Dict[Optional[str], float], label: str = "") -> None:
+        out.append(f"# HELP ops_notebook_{name} {help_text}")
+        out.append(f"# TYPE ops_notebook_{name} gauge")
+        for key, value in samples.items():
+            labels = f'{{{label}="{key}"}}' if key is not None else ""
+            out.append(f"ops_notebook_{name}{labels} {value}")
+
+    _metric("last_run_duration_seconds", "Duration of the last report run.", {None: m.duration_s})
+    _metric("last_run_phase_seconds", "Duration per phase of the last run.", dict(m.phases), "phase")
+    _metric("last_run_notes", "Notes by status in the last run.", dict(m.counts), "status")
+    _metric("last_run_bytes_hashed", "Bytes fingerprinted in the last run.", {None: m.bytes_hashed})
+    _metric(
+        "last_run_snapshot_bytes_written", "Snapshot bytes written in the last run.", {None: m.snapshot_bytes_written}
+    )
+    _metric("last_run_throttle_seconds", "Time added by I/O throttling in the last run.", {None: m.throttle_s})
+    _metric("last_run_rag_lookups", "RAG lookups by outcome in the last run.", dict(m.rag), "outcome")
+    _metric("last_run_rag_ingest", "RAG index ingest results of the last run.", dict(m.ingest), "result")
+    _metric("state_size_bytes", "Size on disk of .ops_state parts.", dict(m.sizes), "part")
+    _metric("last_run_timestamp_seconds", "Unix time the last run finished.", {None: round(time.time())})
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(path.suffix + ".tmp")
+    tmp.write_text("\n".join(out) + "\n", encoding="utf-8")
+    tmp.replace(path)
@@ -0,0 +1,138 @@
+from __future__ import annotations
+
+import hashlib
+import re
+from itertools import combinations
+from typing import Any, Dict, List, Tuple
+
+from .sidecar import NoteSidecar
+
+SIMHASH_BITS = 64
+# Multi-index lookup: the signature is split into bands of 16 bits, each indexed
+# exactly. Two signatures within Hamming distance d differ in at most d // LSH_BANDS
+# bits in some band (pigeonhole), so a lookup probes every band value within that many
+# bits of the note's (1 + 16 probes per band for d = 4..7) and misses nothing. A random
+# note lands in a probed bucket with ~0.1% odds (8-bit bands: ~3%, i.e. a linear scan).
+# A few edits in a copied runbook typically flip 4-8 bits; unrelated notes differ in ~32.
+LSH_BANDS = 4
+_BAND_BITS = SIMHASH_BITS // LSH_BANDS
+_BAND_MASK = (1 << _BAND_BITS) - 1
+
+DEFAULT_MAX_DISTANCE = 7
+# shingles of this many words; notes with fewer shingles get no signature
+# (a few words don't say anything about copy-paste)
+SHINGLE_WORDS = 3
+MIN_SHINGLES = 8
+
+_WORD_RE = re.compile(r"\w+", re.UNICODE)
+
+
+def simhash(text: str) -> int | None:
+    words = _WORD_RE.findall(text.lower())
+    n = len(words) - SHINGLE_WORDS + 1
+    if n < MIN_SHINGLES:
+        return None
+    counts = [0] * SIMHASH_BITS
+    for i in range(n):
+        shingle = " ".join(words[i : i + SHINGLE_WORDS]).encode("utf-8")
+        h = int.from_bytes(hashlib.blake2b(shingle, digest_size=8).digest(), "big")
+        for bit in range(SIMHASH_BITS):
+            counts[bit] += 1 if (h >> bit) & 1 else -1
+    sig = 0
+    for bit, c in enumerate(counts):
+        if c > 0:
+            sig |= 1 << bit
+    return sig
+
+
+def _band_key(band: int, value: int) -> str:
+    return f"{band}:{value:04x}"
+
+
+def _band_keys(sig: int) -> List[str]:
+    return [_band_key(b, (sig >> (b * _BAND_BITS)) & _BAND_MASK) for b in range(LSH_BANDS)]
+
+
+def _probe_keys(sig: int, max_distance: int) -> List[str]:
+    # every band value within max_distance // LSH_BANDS bits of the signature's
+    radius = min(max(0, max_distance) // LSH_BANDS, _BAND_BITS)
+    flips = [0]
+    for k in range(1, radius + 1):
+        flips += [sum(1 << bit for bit in bits) for bits in combinations(range(_BAND_BITS), k)]
+    keys: List[str] = []
+    for b in range(LSH_BANDS):
+        value = (sig >> (b * _BAND_BITS)) & _BAND_MASK
+        keys += [_band_key(b, value ^ flip) for flip in flips]
+    return keys
+
+
+class SignatureIndex(NoteSidecar):
+    """
+    SimHash signatures of all notes, stored at
+      .ops_state/signatures.json
+
+    Entries are keyed by relpath and remember the fingerprint they were computed from,
+    so a sync only reads notes that changed since the last run. Near-duplicate lookup
+    goes through the band buckets (multi-index, see LSH_BANDS) and only compares the
+    notes found there, instead of comparing every pair.
+    """
+
+    # 2: 4 bands of 16 bits (1 had 8 of 8 bits; such files are rebuilt)
+    version = 2
+
+    @classmethod
+    def _empty(cls) -> Dict[str, Any]:
+        return {"version": cls.version, "docs": {}, "bands": {}}
+
+    def _signature(self, relpath: str) -> int | None:
+        doc = self.data["docs"].get(relpath)
+        sig = doc.get("sig") if isinstance(doc, dict) else None
+        return int(sig, 16) if sig else None
+
+    def remove(self, relpath: str) -> None:
+        sig = self._signature(relpath)
+        if self.data["docs"].pop(relpath, None) is None:
+            return
+        if sig is not None:
+            bands = self.data["bands"]
+            for key in _band_keys(sig):
+                bucket = bands.get(key)
+                if bucket and relpath in bucket:
+                    bucket.remove(relpath)
+                    if not bucket:
+                        del bands[key]
+        self._dirty = True
+
+    def update(self, relpath: str, sha: str, text: str) -> None:
+        self._insert(relpath, sha, simhash(text))
+
+    def _insert(self, relpath: str, sha: str, sig: int | None) -> None:
+        self.remove(relpath)
+        self.data["docs"][relpath] = {"sha": sha, "sig": f"{sig:016x}" if sig is not None else None}
+        if sig is not None:
+            for key in _band_keys(sig):
+                self.data["bands"].setdefault(key, []).append(relpath)
+        self._dirty = True
+
+    def near_duplicates(self, relpath: str, max_distance: int = DEFAULT_MAX_DISTANCE) -> List[Tuple[str, int]]:
+        """
+        Other notes whose signature is within `max_distance` bits of `relpath`'s,
+        closest first.
+        """
+        sig = self._signature(relpath)
+        if sig is None:
+            return []
+        out: List[Tuple[str, int]] = []
+        for rel in self._candidates(sig, max_distance) - {relpath}:
+            other = self._signature(rel)
+            if other is None:
+                continue
+            dist = (sig ^ other).bit_count()
+            if dist <= max_distance:
+                out.append((rel, dist))
+        out.sort(key=lambda x: (x[1], x[0]))
+        return out
+
+    def _candidates(self, sig: int, max_distance: int) -> set[str]:
+        bands = self.data["bands"]
+        return {rel for key in _probe_keys(sig, max_distance) for rel in bands.get(key, ())}
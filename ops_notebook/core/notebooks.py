@@ -0,0 +1,146 @@
+from __future__ import annotations
+
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+import requests
+
+from .rag_cache import RagCache
+from .render import resolve_workers
+
+# one RAG cache for all notebooks of a config, next to the top-level state
+SHARED_RAG_CACHE_FILENAME = "rag_cache.shared.json"
+
+
+@dataclass(frozen=True)
+class Notebook:
+    name: str  # "" = the single notebook of a config without `notebooks:`
+    notes_dir: Path
+    template_path: Path
+    reports_dir: Path
+    report_path: Optional[Path]
+    state_path: Path
+
+
+@dataclass
+class NotebookResult:
+    name: str
+    ok: bool
+    written: Optional[Path] = None
+    error: Optional[str] = None
+    duration_s: float = 0.0
+
+
+def load_notebooks(cfg: Dict[str, Any], default: Notebook) -> List[Notebook]:
+    """
+    `notebooks:` entries of config.yaml. Each needs a unique `name` and a `notes_dir`;
+    template_path defaults to the top-level one, reports_dir / state_path to a
+    per-notebook subfolder of the top-level ones. Without entries: [default].
+    """
+    entries = cfg.get("notebooks") or []
+    if not isinstance(entries, list) or not entries:
+        return [default]
+
+    out: List[Notebook] = []
+    seen = set()
+    for i, e in enumerate(entries):
+        if not isinstance(e, dict):
+            print(f"[WARN] notebooks[{i}] is not a mapping; skipped")
+            continue
+        name = str(e.get("name") or "").strip()
+        notes_dir = str(e.get("notes_dir") or "").strip()
+        if not name or name in seen or not notes_dir:
+            print(f"[WARN] notebooks[{i}] needs a unique name and a notes_dir; skipped")
+            continue
+        seen.add(name)
+        report_path = str(e.get("report_path") or "").strip()
+        out.append(
+            Notebook(
+                name=name,
+                notes_dir=Path(notes_dir),
+                template_path=Path(e.get("template_path") or default.template_path),
+                reports_dir=Path(e.get("reports_dir") or default.reports_dir / name),
+                report_path=Path(report_path) if report_path else None,
+                state_path=Path(e.get("state_path") or default.state_path.parent / name / default.state_path.name),
+            )
+        )
+    return out
+
+
+def select_notebooks(notebooks: List[Notebook], names: Sequence[str]) -> List[Notebook]:
+    if not names:
+        return notebooks
+    known = {nb.name for nb in notebooks}
+    for n in names:
+        if n not in known:
+            print(f"[WARN] unknown notebook: {n!r}")
+    return [nb for nb in notebooks if nb.name in names]
+
+
+@dataclass
+class SharedResources:
+    """
+    Shared by all notebooks of one invocation: render process pool, HTTP session
+    (keep-alive to the RAG server) and one RAG cache (keys namespaced per notebook,
+    saves merged under a file lock since other invocations may run other notebooks).
+    """
+
+    render_executor: Optional[Executor] = None
+    rag_session: Optional[requests.Session] = None
+    rag_cache: Optional[RagCache] = None
+
+    @classmethod
+    def create(cls, state_dir: Path, render_workers: int, rag_cache: bool) -> "SharedResources":
+        n = resolve_workers(render_workers)
+        shared = cls(
+            # worker processes start on first use; small weeks never submit
+            render_executor=ProcessPoolExecutor(max_workers=n) if n > 1 else None,
+            rag_session=requests.Session(),
+        )
+        if rag_cache:
+            shared.rag_cache = RagCache(state_dir / SHARED_RAG_CACHE_FILENAME, shared=True)
+            shared.rag_cache.load()
+        return shared
+
+    def close(self) -> None:
+        if self.render_executor is not None:
+            self.render_executor.shutdown(wait=True, cancel_futures=True)
+        if self.rag_session is not None:
+            self.rag_session.close()
+
+
+def run_notebooks(
+    notebooks: Sequence[Notebook], run: Callable[[Notebook], Optional[Path]]
+) -> List[NotebookResult]:
+    """
+    Runs `run` per notebook, in order. A failure is recorded and the next notebook
+    still runs.
+    """
+    results: List[NotebookResult] = []
+    for nb in notebooks:
+        print(f"[INFO] notebook {nb.name}: {nb.notes_dir}")
+        t = time.perf_counter()
+        try:
+            written = run(nb)
+        except Exception as e:
+            print(f"[FAIL] notebook {nb.name}: {e}")
+            results.append(
+                NotebookResult(nb.name, ok=False, error=str(e) or type(e).__name__, duration_s=time.perf_counter() - t)
+            )
+            continue
+        results.append(NotebookResult(nb.name, ok=True, written=written, duration_s=time.perf_counter() - t))
+    return results
+
+
+def format_summary(results: Sequence[NotebookResult]) -> str:
+    failed = sum(1 for r in results if not r.ok)
+    lines = [f"[INFO] notebooks: {len(results)} run, {len(results) - failed} ok, {failed} failed"]
+    for r in results:
+        if r.ok:
+            lines.append(f"[OK] {r.name}: {r.written} ({r.duration_s:.1f}s)")
+        else:
+            lines.append(f"[FAIL] {r.name}: {r.error} ({r.duration_s:.1f}s)")
+    return "\n".join(lines)
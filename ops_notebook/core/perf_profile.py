@@ -0,0 +1,226 @@
+from __future__ import annotations
+
+import math
+import os
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import List, Optional, Sequence, Tuple
+
+from .hashing import DEFAULT_FINGERPRINT, fingerprint_file
+from .metrics import dir_size
+from .scanner import walk_note_files
+from .state import StateStore
+
+# --doctor performance thresholds: crossing one predicts a slow weekly run
+LARGE_NOTEBOOK_NOTES = 20_000
+SLOW_HASH_MB_S = 50.0
+SLOW_FULL_HASH_S = 60.0  # first run / fingerprint switch re-hashes everything
+SLOW_STATE_LOAD_S = 1.0
+LARGE_STATE_BYTES = 50 * 1024 * 1024
+LARGE_SNAPSHOT_FILES = 50_000
+LARGE_SNAPSHOT_BYTES = 1024 * 1024 * 1024
+LARGE_RAG_CACHE_BYTES = 50 * 1024 * 1024
+SLOW_RAG_P95_S = 2.0
+
+# hash sample: stop after this many bytes or seconds; below the minimum the
+# number is mostly open() overhead and not worth reporting
+HASH_SAMPLE_BYTES = 64 * 1024 * 1024
+HASH_SAMPLE_S = 2.0
+HASH_MIN_SAMPLE_BYTES = 1024 * 1024
+
+REMOTE_FS_TYPES = frozenset(
+    {"nfs", "nfs4", "cifs", "smb", "smbfs", "smb3", "9p", "afs", "davfs", "fuse.sshfs", "fuse.rclone", "drvfs"}
+)
+
+
+@dataclass
+class PerfProfile:
+    notes: int = 0
+    notes_bytes: int = 0
+    state_bytes: int = 0
+    state_load_s: float = 0.0
+    snapshot_bytes: int = 0
+    snapshot_files: int = 0
+    rag_cache_bytes: int = 0
+    hash_algorithm: str = DEFAULT_FINGERPRINT
+    hash_sample_bytes: int = 0
+    hash_mb_s: Optional[float] = None
+    rag_latency_s: List[float] = field(default_factory=list)
+    remote_fs: Optional[str] = None  # filesystem type when notes_dir is on a network share
+
+    def lines(self) -> List[str]:
+        out = [
+            f"[INFO] notes: {self.notes} ({self.notes_bytes / 1e6:.1f} MB)",
+            f"[INFO] state: {self.state_bytes / 1e3:.1f} KB, loads in {self.state_load_s * 1000:.0f} ms",
+            f"[INFO] snapshots: {self.snapshot_files} files, {self.snapshot_bytes / 1e6:.1f} MB",
+            f"[INFO] RAG cache: {self.rag_cache_bytes / 1e3:.1f} KB",
+        ]
+        if self.hash_mb_s is not None:
+            out.append(
+                f"[INFO] hash throughput ({self.hash_algorithm}, {self.hash_sample_bytes / 1e6:.1f} MB sample): "
+                f"{self.hash_mb_s:.0f} MB/s"
+            )
+        else:
+            out.append("[INFO] hash throughput: notebook too small to measure")
+        if self.rag_latency_s:
+            out.append(
+                f"[INFO] RAG latency over {len(self.rag_latency_s)} pings: "
+                f"p50 {percentile(self.rag_latency_s, 50) * 1000:.0f} ms, "
+                f"p95 {percentile(self.rag_latency_s, 95) * 1000:.0f} ms"
+            )
+        return out
+
+    def warnings(self, rag_budget_s: float = 0) -> List[str]:
+        out: List[str] = []
+        if self.remote_fs:
+            out.append(
+                f"[WARN] notes_dir is on a network filesystem ({self.remote_fs}): every scan stats and "
+                "reads over the network; consider scan.backend: git or a local copy"
+            )
+        if self.notes > LARGE_NOTEBOOK_NOTES:
+            out.append(f"[WARN] large notebook ({self.notes} notes); scan.backend: git only hashes modified notes")
+        if self.hash_mb_s is not None:
+            if self.hash_mb_s < SLOW_HASH_MB_S:
+                out.append(
+                    f"[WARN] slow hashing ({self.hash_mb_s:.0f} MB/s < {SLOW_HASH_MB_S:g}); "
+                    "slow disk, or try scan.fingerprint: blake2b"
+                )
+            full_s = self.notes_bytes / (self.hash_mb_s * 1e6)
+            if full_s > SLOW_FULL_HASH_S:
+                out.append(
+                    f"[WARN] a full re-hash (first run, fingerprint switch) would take ~{full_s:.0f}s"
+                )
+        if self.state_load_s > SLOW_STATE_LOAD_S or self.state_bytes > LARGE_STATE_BYTES:
+            out.append(
+                f"[WARN] state file is slow to load ({self.state_bytes / 1e6:.1f} MB, {self.state_load_s:.2f}s); "
+                "every run loads and rewrites it"
+            )
+        if self.snapshot_files > LARGE_SNAPSHOT_FILES or self.snapshot_bytes > LARGE_SNAPSHOT_BYTES:
+            out.append(
+                f"[WARN] large snapshot dir ({self.snapshot_files} files, {self.snapshot_bytes / 1e6:.0f} MB); "
+                "scan.backend: git keeps no snapshot copies"
+            )
+        if self.rag_cache_bytes > LARGE_RAG_CACHE_BYTES:
+            out.append(f"[WARN] large RAG cache ({self.rag_cache_bytes / 1e6:.0f} MB); it is loaded on every RAG run")
+        if self.rag_latency_s:
+            p50 = percentile(self.rag_latency_s, 50)
+            p95 = percentile(self.rag_latency_s, 95)
+            if p95 > SLOW_RAG_P95_S:
+                covers = ""
+                if rag_budget_s > 0 and p50 > 0:
+                    covers = f"; rag.budget_s={rag_budget_s:g} covers ~{int(rag_budget_s / p50)} uncached lookups"
+                out.append(f"[WARN] slow RAG server (p95 {p95:.1f}s){covers}; consider --warm-rag")
+        return out
+
+
+def percentile(values: Sequence[float], q: float) -> float:
+    # nearest-rank (a handful of samples: no interpolation)
+    if not values:
+        return 0.0
+    s = sorted(values)
+    k = max(1, math.ceil(q / 100 * len(s)))
+    return s[min(k, len(s)) - 1]
+
+
+def measure_hash_throughput(
+    notes: Sequence[Path],
+    algorithm: str = DEFAULT_FINGERPRINT,
+    max_bytes: int = HASH_SAMPLE_BYTES,
+    max_s: float = HASH_SAMPLE_S,
+) -> Tuple[int, Optional[float]]:
+    """
+    Fingerprint notes (largest first) until `max_bytes` or `max_s`.
+    Returns (bytes hashed, MB/s or None when the sample is too small).
+    """
+    hashed = 0
+    t0 = time.perf_counter()
+    for f in notes:
+        try:
+            size = f.stat().st_size
+            fingerprint_file(f, algorithm)
+        except OSError:
+            continue
+        hashed += size
+        if hashed >= max_bytes or time.perf_counter() - t0 >= max_s:
+            break
+    elapsed = time.perf_counter() - t0
+    if hashed < HASH_MIN_SAMPLE_BYTES or elapsed <= 0:
+        return hashed, None
+    return hashed, hashed / elapsed / 1e6
+
+
+def remote_filesystem(path: Path) -> Optional[str]:
+    """
+    Filesystem type if `path` is on a network share, else None (best effort).
+    """
+    try:
+        resolved = path.resolve()
+    except OSError:
+        return None
+    if os.name == "nt":
+        s = str(resolved)
+        if s.startswith("\\\\"):
+            return "unc"
+        try:
+            import ctypes
+
+            drive_remote = 4
+            if ctypes.windll.kernel32.GetDriveTypeW(resolved.anchor) == drive_remote:  # type: ignore[attr-defined]
+                return "network drive"
+        except Exception:
+            return None
+        return None
+    try:
+        mounts = Path("/proc/mounts").read_text(encoding="utf-8").splitlines()
+    except OSError:
+        return None
+    best, fstype = "", None
+    target = resolved.as_posix()
+    for line in mounts:
+        parts = line.split()
+        if len(parts) < 3:
+            continue
+        mnt = parts[1].replace("\\040", " ")
+        if (target == mnt or target.startswith(mnt.rstrip("/") + "/")) and len(mnt) >= len(best):
+            best, fstype = mnt, parts[2]
+    return fstype if fstype in REMOTE_FS_TYPES else None
+
+
+def collect_perf_profile(
+    notes_dir: Path,
+    state_path: Path,
+    algorithm: str = DEFAULT_FINGERPRINT,
+    rag_cache_path: Optional[Path] = None,
+) -> PerfProfile:
+    p = PerfProfile(hash_algorithm=algorithm)
+    sized: List[Tuple[int, Path]] = []
+    for _rel, f in walk_note_files(notes_dir):
+        try:
+            size = f.stat().st_size
+        except OSError:
+            continue
+        sized.append((size, f))
+        p.notes += 1
+        p.notes_bytes += size
+
+    try:
+        p.state_bytes = state_path.stat().st_size
+    except OSError:
+        p.state_bytes = 0
+    t = time.perf_counter()
+    StateStore(state_path).load()
+    p.state_load_s = time.perf_counter() - t
+
+    state_dir = state_path.parent
+    p.snapshot_bytes, p.snapshot_files = dir_size(state_dir / "snapshots")
+    try:
+        # a cache shared by several notebooks lives next to the top-level state
+        p.rag_cache_bytes = (rag_cache_path or state_dir / "rag_cache.json").stat().st_size
+    except OSError:
+        p.rag_cache_bytes = 0
+
+    sized.sort(key=lambda x: -x[0])
+    p.hash_sample_bytes, p.hash_mb_s = measure_hash_throughput([f for _, f in sized], algorithm)
+    p.remote_fs = remote_filesystem(notes_dir)
+    return p
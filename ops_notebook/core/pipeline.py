@@ -0,0 +1,243 @@
+from __future__ import annotations
+
+import asyncio
+import threading
+from concurrent.futures import Executor, ProcessPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from dataclasses import dataclass, replace
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from .derived import DerivedCache
+from .git_backend import GitSnapshots
+from .rag_phase import RagLookup, RagPhase
+from .render import (
+    PARALLEL_MIN_FILES,
+    RenderedSections,
+    RenderJob,
+    build_rag_query,
+    render_job,
+    render_sections_within_budget,
+    resolve_workers,
+)
+from .scanner import ScanItem, is_this_week_candidate, scan_order_key
+from .snapshots import SnapshotStore, load_render_job, load_render_texts
+from .state import StateStore
+from .weekly import WeekWindow
+
+LOAD_WORKERS = 4
+
+_DONE = object()
+
+
+@dataclass
+class PipelineResult:
+    candidates: List[ScanItem]  # this week's items, report order
+    rendered: List[RenderedSections]  # aligned with candidates
+    rag_lookups: List[Optional[RagLookup]]  # aligned with candidates (empty when RAG is off)
+    # snapshot writes for after the report (write_snapshots()); jobs without old_text
+    snapshot_writes: List[Tuple[ScanItem, Optional[RenderJob]]]
+
+
+async def run_async_pipeline(
+    scan_items: Callable[[], Iterable[ScanItem]],
+    store: StateStore,
+    snapshots: SnapshotStore | GitSnapshots,
+    week: WeekWindow,
+    rag: Optional[RagPhase],
+    render_workers: int = 0,
+    queue_size: int = 32,
+    rag_concurrency: int = 4,
+    verbose: bool = False,
+    after_scan: Optional[Callable[[], None]] = None,
+    markdown: bool = True,
+    budget_lines: int = 0,
+    budget_bytes: int = 0,
+    executor: Optional[Executor] = None,
+    derived: Optional[DerivedCache] = None,
+) -> PipelineResult:
+    """
+    Streams scan results through concurrent stages connected by bounded queues:
+
+      scan (thread, streaming) -> load texts -> render diff/digest (process pool for big weeks)
+                                  -> RAG lookup (N in flight)
+
+    Results are collected per relpath and re-ordered like the sequential path, so the
+    report is identical regardless of completion order. The state file is saved as soon
+    as the scan finishes; snapshot writes are only collected (`snapshot_writes`), the
+    caller writes them once the report is written.
+
+    `after_scan` runs (in a thread) once the scan is done; when given, RAG lookups are
+    held back until it returns (the local index / the server's index must have this
+    run's changes first), so they only start after the scan. Loading and rendering
+    don't wait for it.
+
+    With a report budget (`budget_lines`/`budget_bytes`) rendering waits for all jobs,
+    since the biggest changes must be rendered first; the loaders then leave the texts
+    to the render stage, which reads them only for the diffs it renders. A given `executor` (shared by
+    several notebooks) is used instead of a pool of its own and is not shut down.
+    `derived` (per-fingerprint title/preview cache) is filled by the loaders.
+    """
+    loop = asyncio.get_running_loop()
+    load_q: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+    render_q: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+    rag_q: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+
+    candidates: List[ScanItem] = []
+    rendered: Dict[str, RenderedSections] = {}
+    rag_lookups: Dict[str, Optional[RagLookup]] = {}
+    deferred_rag: List[Tuple[ScanItem, Optional[str]]] = []
+    budgeted = budget_lines > 0 or budget_bytes > 0
+    snapshot_writes: List[Tuple[ScanItem, Optional[RenderJob]]] = []
+    abort = threading.Event()
+
+    async def _route(it: ScanItem, needs_snapshot: bool) -> None:
+        if is_this_week_candidate(it, week):
+            candidates.append(it)
+            await load_q.put(it)
+        elif needs_snapshot:
+            snapshot_writes.append((it, None))
+
+    def _scan_thread() -> None:
+        for it in scan_items():
+            if abort.is_set():
+                return
+            # unchanged notes already have an up-to-date snapshot
+            needs_snapshot = snapshots.writes_snapshots and it.status != "unchanged"
+            fut = asyncio.run_coroutine_threadsafe(_route(it, needs_snapshot), loop)
+            # blocking here is the backpressure: the scanner waits while queues are full
+            while True:
+                try:
+                    fut.result(timeout=0.5)
+                    break
+                except FutureTimeoutError:
+                    if abort.is_set():
+                        fut.cancel()
+                        return
+        store.save()
+
+    async def _load_worker() -> None:
+        while True:
+            it = await load_q.get()
+            if it is _DONE:
+                return
+            job = await asyncio.to_thread(load_render_job, it, snapshots, markdown, derived, budgeted)
+            await render_q.put(job)
+            if rag is not None:
+                deleted = it.status == "deleted" or it.abspath is None
+                entry = (it, None if deleted else build_rag_query(it.relpath, job.new_text, job.meta))
+                if after_scan is not None:
+                    deferred_rag.append(entry)
+                else:
+                    await rag_q.put(entry)
+            if snapshots.writes_snapshots:
+                # the snapshot write only needs the new text: don't hold on to the old one
+                snapshot_writes.append((it, replace(job, old_text="")))
+
+    async def _render_worker() -> None:
+        n = resolve_workers(render_workers)
+        pool: Optional[Executor] = None
+        in_flight = asyncio.Semaphore(max(2, n * 2))
+        tasks: List[asyncio.Task] = []
+        seen = 0
+
+        async def _render_one(job: RenderJob, ex: Optional[Executor]) -> None:
+            try:
+                try:
+                    rendered[job.relpath] = await loop.run_in_executor(ex, render_job, job)
+                except Exception:
+                    if ex is None:
+                        raise
+                    # best effort: pool unavailable -> render in a thread
+                    rendered[job.relpath] = await asyncio.to_thread(render_job, job)
+            finally:
+                in_flight.release()
+
+        if budgeted:
+            jobs: List[RenderJob] = []
+            while True:
+                job = await render_q.get()
+                if job is _DONE:
+                    break
+                jobs.append(job)
+            by_rel = {it.relpath: it for it in candidates}
+            results = await asyncio.to_thread(
+                render_sections_within_budget,
+                jobs,
+                budget_lines,
+                budget_bytes,
+                render_workers,
+                executor,
+                verbose,
+                lambda job: load_render_texts(job, by_rel[job.relpath], snapshots),
+            )
+            rendered.update((job.relpath, r) for job, r in zip(jobs, results))
+            return
+
+        try:
+            while True:
+                job = await render_q.get()
+                if job is _DONE:
+                    break
+                seen += 1
+                # same threshold idea as render_sections(): small weeks stay in-process
+                if pool is None and n > 1 and seen >= PARALLEL_MIN_FILES:
+                    if verbose:
+                        print(f"[INFO] pipeline: rendering with {n} worker processes")
+                    pool = executor or ProcessPoolExecutor(max_workers=n)
+                await in_flight.acquire()
+                tasks.append(asyncio.create_task(_render_one(job, pool)))
+            await asyncio.gather(*tasks)
+        finally:
+            if pool is not None and pool is not executor:
+                pool.shutdown(wait=True, cancel_futures=True)
+
+    async def _rag_worker() -> None:
+        assert rag is not None
+        while True:
+            entry = await rag_q.get()
+            if entry is _DONE:
+                return
+            it, q = entry
+            if q is None:
+                rag_lookups[it.relpath] = None
+                continue
+            res = await asyncio.to_thread(rag.lookup, it.relpath, it.sha256 or "", q)
+            rag_lookups[it.relpath] = res
+
+    load_tasks = [asyncio.create_task(_load_worker()) for _ in range(LOAD_WORKERS)]
+    render_task = asyncio.create_task(_render_worker())
+    rag_tasks = [
+        asyncio.create_task(_rag_worker()) for _ in range(max(1, rag_concurrency) if rag else 0)
+    ]
+
+    async def _drive() -> None:
+        await asyncio.to_thread(_scan_thread)
+        for _ in load_tasks:
+            await load_q.put(_DONE)
+        if after_scan is not None:
+            await asyncio.to_thread(after_scan)
+        await asyncio.gather(*load_tasks)
+        await render_q.put(_DONE)
+        for entry in deferred_rag:
+            await rag_q.put(entry)
+        for _ in rag_tasks:
+            await rag_q.put(_DONE)
+
+    all_tasks = [*load_tasks, render_task, *rag_tasks]
+    driver = asyncio.create_task(_drive())
+    try:
+        await asyncio.gather(driver, *all_tasks)
+    except BaseException:
+        abort.set()
+        for t in (driver, *all_tasks):
+            t.cancel()
+        await asyncio.gather(driver, *all_tasks, return_exceptions=True)
+        raise
+
+    candidates.sort(key=scan_order_key)
+    return PipelineResult(
+        candidates=candidates,
+        rendered=[rendered[it.relpath] for it in candidates],
+        rag_lookups=[rag_lookups[it.relpath] for it in candidates] if rag else [],
+        snapshot_writes=snapshot_writes,
+    )
@@ -2,15 +2,27 @@ from __future__ import annotations
 
 import json
 from pathlib import Path
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, List, Mapping, Optional, Tuple
 
 from .rag_client import RagEvidence
+from .run_lock import RunLock
+
+# saving a shared cache waits at most this long for another process's save
+SHARED_SAVE_TIMEOUT_S = 60.0
 
 
 class RagCache:
-    def __init__(self, path: Path):
+    """
+    `shared`: the file is used by several notebooks whose runs may overlap (run locks
+    are per notebook). Saves then take `<file>.lock` and merge the entries set by this
+    process into what is on disk, instead of overwriting other runs' entries.
+    """
+
+    def __init__(self, path: Path, shared: bool = False):
         self.path = path
+        self.shared = shared
         self.data: Dict[str, Any] = {"version": 1, "items": {}}
+        self._dirty: set[str] = set()  # keys set/migrated since load (shared merge)
 
     def load(self) -> None:
         if not self.path.exists():
@@ -25,6 +37,24 @@ class RagCache:
             self.data = {"version": 1, "items": {}}
 
     def save(self) -> None:
+        if not self.shared:
+            self._write()
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with RunLock(self.path.with_name(self.path.name + ".lock"), timeout_s=SHARED_SAVE_TIMEOUT_S):
+            mine = self.data.get("items", {})
+            fingerprint = self.data.get("fingerprint")
+            self.load()
+            items = self.data.setdefault("items", {})
+            for key in self._dirty:
+                if key in mine:
+                    items[key] = mine[key]
+            if fingerprint is not None:
+                self.data["fingerprint"] = fingerprint
+            self._write()
+        self._dirty.clear()
+
+    def _write(self) -> None:
         self.path.parent.mkdir(parents=True, exist_ok=True)
         tmp = self.path.with_suffix(self.path.suffix + ".tmp")
         tmp.write_text(json.dumps(self.data, ensure_ascii=False, indent=2), encoding="utf-8")
@@ -64,6 +94,22 @@ class RagCache:
             )
         return evs
 
+    def migrate(self, migrations: Mapping[str, Tuple[str, str]], algorithm: str) -> int:
+        """
+        Re-key entries after a fingerprint algorithm change: relpath -> (old, new digest)
+        as recorded by the scan. Returns the number of entries carried over.
+        """
+        items = self.data.get("items", {})
+        moved = 0
+        for relpath, (old_sha, new_sha) in migrations.items():
+            item = items.get(relpath)
+            if isinstance(item, dict) and item.get("sha256") == old_sha:
+                item["sha256"] = new_sha
+                self._dirty.add(relpath)
+                moved += 1
+        self.data["fingerprint"] = algorithm
+        return moved
+    
     def set(
         self,
         relpath: str,
@@ -73,6 +119,7 @@ class RagCache:
         max_chars: int,
         evidences: List[RagEvidence],
     ) -> None:
+        self._dirty.add(relpath)
         self.data.setdefault("items", {})[relpath] = {
             "sha256": sha256,
             "rag_url": rag_url,
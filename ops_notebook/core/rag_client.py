@@ -1,7 +1,7 @@
 from __future__ import annotations
 
 from dataclasses import dataclass
-from typing import Any, List, Optional
+from typing import Any, Dict, List, Optional
 
 import requests
 
@@ -13,6 +13,27 @@ class RagEvidence:
     score: Optional[float] = None
 
 
+class CircuitBreaker:
+    """
+    Opens after `max_failures` consecutive failures and stays open for the rest of
+    the run (a weekly batch job has no use for half-open probing).
+    """
+
+    def __init__(self, max_failures: int = 3):
+        self.max_failures = max(1, int(max_failures))
+        self.consecutive_failures = 0
+
+    @property
+    def is_open(self) -> bool:
+        return self.consecutive_failures >= self.max_failures
+
+    def record_success(self) -> None:
+        self.consecutive_failures = 0
+
+    def record_failure(self) -> None:
+        self.consecutive_failures += 1
+
+
 class RagClient:
     """
     Compatible with local-rag-kit api_hybrid.py:
@@ -20,13 +41,33 @@ class RagClient:
         { query, top_k, include_text, max_chars, ... }
       Response:
         { ..., chunks: [ {rank, score, doc, chunk_index, ..., text?}, ... ] }
+    
+    Optional incremental ingest (rag.ingest_url):
+      POST <ingest_url>
+        { upsert: [ {doc, text, fingerprint}, ... ], delete: [doc, ...] }
+      Any 2xx response means the whole batch was applied.
     """
     
-    def __init__(self, rag_url: str, timeout_s: int = 12):
+    def __init__(
+        self,
+        rag_url: str,
+        timeout_s: int = 12,
+        session: Optional[requests.Session] = None,
+        ingest_url: str = "",
+    ):
         self.rag_url = rag_url
         self.timeout_s = timeout_s
+        # optional shared session (keep-alive across notebooks in one run)
+        self.session = session
+        self.ingest_url = ingest_url
     
-    def query_topk(self, query: str, top_k: int = 3, max_chars: int = 260) -> List[RagEvidence]:
+    def query_topk(
+        self,
+        query: str,
+        top_k: int = 3,
+        max_chars: int = 260,
+        timeout_s: Optional[float] = None,
+    ) -> List[RagEvidence]:
         # 1) POST top_k
         payload = {
             "query": query,
@@ -37,10 +78,30 @@ class RagClient:
             # keep defaults: mode="hybrid", etc.
         }
         
-        r = requests.post(self.rag_url, json=payload, timeout=self.timeout_s)
+        timeout = self.timeout_s if timeout_s is None else min(self.timeout_s, timeout_s)
+        post = self.session.post if self.session is not None else requests.post
+        r = post(self.rag_url, json=payload, timeout=timeout)
         r.raise_for_status()
         return self._parse_any(r.json(), top_k=top_k)
     
+    def ingest(
+        self,
+        upserts: List[Dict[str, str]],
+        deletes: List[str],
+        timeout_s: Optional[float] = None,
+    ) -> None:
+        """
+        Push one batch of changed (`upserts`: doc/text/fingerprint) and deleted docs to
+        the ingest endpoint. Raises on failure (the caller keeps the batch pending).
+        """
+        if not self.ingest_url:
+            raise ValueError("no ingest_url configured")
+        payload = {"upsert": upserts, "delete": deletes}
+        timeout = self.timeout_s if timeout_s is None else timeout_s
+        post = self.session.post if self.session is not None else requests.post
+        r = post(self.ingest_url, json=payload, timeout=timeout)
+        r.raise_for_status()
+    
     def _parse_any(self, data: Any, top_k: int) -> List[RagEvidence]:
         """
         Accept shapes:
@@ -0,0 +1,165 @@
+from __future__ import annotations
+
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from .rag_client import RagClient
+from .sidecar import NoteSidecar
+from .state import StateStore
+
+INGEST_FILENAME = "rag_ingest.json"
+DEFAULT_INGEST_BATCH_SIZE = 50
+# upsert texts per request; a single bigger note is still sent (alone)
+MAX_INGEST_BATCH_BYTES = 4 * 1024 * 1024
+
+
+@dataclass
+class IngestResult:
+    upserted: int = 0
+    deleted: int = 0
+    failed_batches: int = 0
+    pending: int = 0  # left for the next run
+    out_of_budget: bool = False  # stopped at budget_s, the rest is pending
+    error: str = ""
+
+
+class RagIngest(NoteSidecar):
+    """
+    Incremental push of note changes to the RAG server's index, recorded at
+      .ops_state/rag_ingest.json
+
+    The record holds the fingerprint last pushed per note. A sync compares it with the
+    (already scanned) state: notes whose fingerprint differs are upserted, recorded
+    notes that are gone from the state are deleted. A batch only enters the record once
+    the server accepted it, so whatever failed (or wasn't reached after a failure) is
+    the pending queue of the next run.
+
+    Without a record yet (ingest just enabled), notes that didn't change in this run
+    are taken as already indexed: the first sync pushes this run's changes, not the
+    whole notebook.
+    """
+
+    section = "pushed"
+
+    def __init__(self, path: Path, batch_size: int = DEFAULT_INGEST_BATCH_SIZE, doc_prefix: str = ""):
+        super().__init__(path)
+        self.batch_size = max(1, batch_size)
+        # several notebooks pushing into one index: doc ids are "<notebook>/<relpath>"
+        self.doc_prefix = doc_prefix
+        self.first_use = True
+
+    def load(self) -> None:
+        # a corrupt record is not a first use: everything is pushed again
+        if self.path.exists():
+            self.first_use = False
+        super().load()
+
+    def pending(self, store: StateStore) -> Tuple[List[Tuple[str, str]], List[str]]:
+        """
+        ([(relpath, fingerprint) to upsert], [relpaths to delete]), path order.
+        """
+        if self.first_use:
+            pushed: Dict[str, str] = self.data["pushed"]
+            for rel in store.all_relpaths():
+                fs = store.get(rel)
+                # the scan stamps notes it found changed with last_changed_at == last_scanned_at
+                if fs is not None and fs.sha256 and fs.last_changed_at != fs.last_scanned_at:
+                    pushed.setdefault(rel, fs.sha256)
+            self.first_use = False
+            # the record is written even if nothing is pushed: the next run isn't a first use
+            self._dirty = True
+        return self.stale(store)
+
+    def sync(
+        self,
+        notes_dir: Path,
+        store: StateStore,
+        client: RagClient,
+        deadline: Optional[float] = None,
+    ) -> IngestResult:
+        """
+        Push pending changes in batches of `batch_size` docs, stopping at the first
+        failed batch or at `deadline` (time.monotonic(); the RAG phase's, see
+        RagPhase.deadline()). Saves the record.
+        """
+        res = IngestResult()
+        upserts, deletes = self.pending(store)
+        pushed: Dict[str, str] = self.data["pushed"]
+        todo: List[Tuple[str, str | None]] = [(rel, None) for rel in deletes] + list(upserts)
+        i = 0
+        while i < len(todo):
+            timeout_s: float | None = None
+            if deadline is not None:
+                timeout_s = deadline - time.monotonic()
+                if timeout_s <= 0:
+                    res.out_of_budget = True
+                    break
+                timeout_s = min(timeout_s, client.timeout_s)
+            batch_up: List[Dict[str, str]] = []
+            batch_del: List[str] = []
+            done: List[Tuple[str, str | None]] = []
+            size = 0
+            while i < len(todo) and len(done) < self.batch_size:
+                rel, sha = todo[i]
+                if sha is None:
+                    batch_del.append(self.doc_prefix + rel)
+                else:
+                    try:
+                        text = (notes_dir / rel).read_text(encoding="utf-8", errors="replace")
+                    except OSError:
+                        # vanished since the scan: the next run deletes it
+                        i += 1
+                        continue
+                    if done and size + len(text) > MAX_INGEST_BATCH_BYTES:
+                        break
+                    size += len(text)
+                    batch_up.append({"doc": self.doc_prefix + rel, "text": text, "fingerprint": sha})
+                done.append((rel, sha))
+                i += 1
+            if not done:
+                continue
+            try:
+                client.ingest(batch_up, batch_del, timeout_s=timeout_s)
+            except Exception as e:
+                res.failed_batches += 1
+                res.error = str(e) or type(e).__name__
+                break
+            for rel, sha in done:
+                if sha is None:
+                    pushed.pop(rel, None)
+                else:
+                    pushed[rel] = sha
+            self._dirty = True
+            res.upserted += len(batch_up)
+            res.deleted += len(batch_del)
+        res.pending = len(upserts) + len(deletes) - res.upserted - res.deleted
+        self.save()
+        return res
+
+
+def push_changes(
+    ingest: RagIngest,
+    notes_dir: Path,
+    store: StateStore,
+    client: RagClient,
+    deadline: Optional[float] = None,
+    verbose: bool = False,
+) -> Optional[IngestResult]:
+    """
+    ingest.sync() with the run's log lines; None if the record couldn't be saved
+    (best effort: the same changes are pushed next time).
+    """
+    try:
+        res = ingest.sync(notes_dir, store, client, deadline=deadline)
+    except OSError as e:
+        print(f"[WARN] RAG ingest: could not save {ingest.path}: {e}")
+        return None
+    if res.failed_batches:
+        print(f"[WARN] RAG ingest failed ({res.error}); {res.pending} change(s) pending for the next run")
+    elif res.out_of_budget:
+        print(f"[WARN] RAG ingest: rag.budget_s used up; {res.pending} change(s) pending for the next run")
+    if verbose:
+        print(f"[INFO] RAG ingest: {res.upserted} upserted, {res.deleted} deleted, {res.pending} pending")
+    return res
@@ -0,0 +1,168 @@
+from __future__ import annotations
+
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Dict, List, Mapping, Optional, Protocol, Tuple
+
+from .constants import MAX_RAG_SNIPPET_CHARS
+from .rag_cache import RagCache
+from .rag_client import CircuitBreaker, RagEvidence
+
+# total wall-clock budget for server calls in one run (cache hits are free)
+DEFAULT_RAG_BUDGET_S = 60.0
+DEFAULT_RAG_MAX_FAILURES = 3
+
+# reasons a file was not (successfully) queried; rendered into the report
+SKIP_BUDGET = "budget"
+SKIP_CIRCUIT = "circuit"
+SKIP_ERROR = "error"
+
+# rag.provider: the local-rag-kit server, the offline BM25 index, or server + index fallback
+RAG_PROVIDERS = ("http", "local", "auto")
+
+
+class EvidenceProvider(Protocol):
+    # RagClient (local-rag-kit server) or LocalIndex (offline BM25)
+    def query_topk(
+        self,
+        query: str,
+        top_k: int = 3,
+        max_chars: int = 260,
+        timeout_s: Optional[float] = None,
+    ) -> List[RagEvidence]: ...
+
+
+@dataclass
+class RagLookup:
+    evidences: List[RagEvidence] = field(default_factory=list)
+    skipped: Optional[str] = None  # SKIP_* when the server was not (successfully) queried
+    fallback: bool = False  # evidences came from the local index instead of the server
+
+
+class RagPhase:
+    """
+    Per-file RAG evidence lookups for one report run: cache first, then the server.
+
+    Server calls share a total deadline (`budget_s`, started at the first call) and a
+    circuit breaker that stops querying after `max_failures` consecutive failures, so
+    a hung server costs at most the budget instead of timeout x changed files.
+    Failed calls are not cached; the next run retries them.
+
+    With a `fallback` provider (rag.provider: auto), files the server could not answer
+    for are served from the local index instead; fallback results are not cached.
+    Without a cache (rag.provider: local), every lookup goes to the provider.
+
+    `lookup` may be called from worker threads (async pipeline); cache and breaker
+    access is serialized, network calls are not.
+
+    `key_prefix` namespaces cache keys when one cache is shared by several notebooks.
+    """
+
+    def __init__(
+        self,
+        client: EvidenceProvider,
+        cache: Optional[RagCache],
+        rag_url: str,
+        top_k: int,
+        max_chars: int = MAX_RAG_SNIPPET_CHARS,
+        budget_s: float = DEFAULT_RAG_BUDGET_S,
+        max_failures: int = DEFAULT_RAG_MAX_FAILURES,
+        fallback: Optional[EvidenceProvider] = None,
+        key_prefix: str = "",
+    ):
+        self.client = client
+        self.key_prefix = key_prefix
+        self.fallback = fallback
+        self.cache = cache
+        self.rag_url = rag_url
+        self.top_k = top_k
+        self.max_chars = max_chars
+        self.budget_s = float(budget_s)
+        self.breaker = CircuitBreaker(max_failures)
+        self._deadline: Optional[float] = None
+        self._lock = threading.Lock()
+        # run metrics: provider calls, cache hits, failed calls, skipped files, fallback answers
+        self.stats: Dict[str, int] = {"calls": 0, "hits": 0, "errors": 0, "skipped": 0, "fallback": 0}
+
+    def _remaining_s(self) -> float:
+        # caller holds the lock
+        if self.budget_s <= 0:
+            return float("inf")
+        if self._deadline is None:
+            self._deadline = time.monotonic() + self.budget_s
+        return self._deadline - time.monotonic()
+
+    def deadline(self) -> Optional[float]:
+        """
+        The phase's time.monotonic() deadline (started now if no call was made yet);
+        None without a budget. Other server work of the run (the index push) spends
+        the same budget.
+        """
+        with self._lock:
+            if self.budget_s <= 0:
+                return None
+            self._remaining_s()
+            return self._deadline
+
+    def lookup(self, relpath: str, sha: str, query: str) -> RagLookup:
+        # 캐시 키: relpath + sha256 + url + topk + max_chars
+        with self._lock:
+            if self.cache is not None:
+                cached = self.cache.get(self.key_prefix + relpath, sha, self.rag_url, self.top_k, self.max_chars)
+                if cached is not None:
+                    self.stats["hits"] += 1
+                    return RagLookup(evidences=cached)
+            remaining = 0.0
+            if self.breaker.is_open:
+                skipped: Optional[str] = SKIP_CIRCUIT
+            else:
+                remaining = self._remaining_s()
+                skipped = SKIP_BUDGET if remaining <= 0 else None
+            if skipped is None:
+                self.stats["calls"] += 1
+        if skipped is not None:
+            return self._fallback(query, skipped)
+
+        try:
+            evs = self.client.query_topk(
+                query=query,
+                top_k=self.top_k,
+                max_chars=self.max_chars,
+                timeout_s=remaining,
+            )
+        except Exception:
+            with self._lock:
+                self.breaker.record_failure()
+                self.stats["errors"] += 1
+            return self._fallback(query, SKIP_ERROR)
+
+        with self._lock:
+            self.breaker.record_success()
+            if self.cache is not None:
+                self.cache.set(self.key_prefix + relpath, sha, self.rag_url, self.top_k, self.max_chars, evs)
+        return RagLookup(evidences=evs)
+
+    def _fallback(self, query: str, reason: str) -> RagLookup:
+        if reason != SKIP_ERROR:
+            with self._lock:
+                self.stats["skipped"] += 1
+        if self.fallback is None:
+            return RagLookup(skipped=reason)
+        try:
+            evs = self.fallback.query_topk(query=query, top_k=self.top_k, max_chars=self.max_chars)
+        except Exception:
+            return RagLookup(skipped=reason)
+        with self._lock:
+            self.stats["fallback"] += 1
+        return RagLookup(evidences=evs, skipped=reason, fallback=True)
+
+    def migrate_keys(self, migrations: Mapping[str, Tuple[str, str]], algorithm: str) -> None:
+        with self._lock:
+            if self.cache is not None:
+                self.cache.migrate({self.key_prefix + rel: v for rel, v in migrations.items()}, algorithm)
+
+    def save(self) -> None:
+        with self._lock:
+            if self.cache is not None:
+                self.cache.save()
@@ -0,0 +1,444 @@
+from __future__ import annotations
+
+import difflib
+import os
+from collections import Counter
+from concurrent.futures import Executor, ProcessPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, List, Optional, Sequence, Tuple
+
+from .constants import MAX_PREVIEW_CHARS
+from .rag_phase import RagLookup
+
+MAX_DIFF_LINES = 160
+RAG_QUERY_PREVIEW_CHARS = 180
+
+# Below these sizes the pool startup cost (esp. spawn on Windows) outweighs the work,
+# so small weeks stay on the in-process path.
+PARALLEL_MIN_FILES = 8
+PARALLEL_MIN_BYTES = 256 * 1024
+
+
+@dataclass(frozen=True)
+class RenderJob:
+    """
+    Inputs for one file's report sections. Texts are loaded by the caller so the
+    render step is a pure function (safe to ship to a worker process).
+    """
+    relpath: str
+    status: str
+    old_text: str
+    new_text: str
+    renamed_from: Optional[str] = None
+    # False: only compute the structured fields (diff stats, title), no Markdown
+    markdown: bool = True
+    # append-only fast path: old_text is not loaded and new_text is only the head of
+    # the note (title/preview); the diff is built from the appended lines, the
+    # last lines before them (context) and the old line count
+    appended_text: Optional[str] = None
+    append_context: Tuple[str, ...] = ()
+    append_old_lines: int = 0
+    # derived metadata (title/preview/counts); computed from new_text when None
+    meta: Optional[NoteMeta] = None
+    # report budget: the texts aren't loaded yet (new_text may be, old_text isn't) and are
+    # only loaded for diffs that get rendered; the estimate is meta.lines vs old_lines
+    texts_loaded: bool = True
+    old_lines: Optional[int] = None
+
+
+@dataclass(frozen=True)
+class RenderedSections:
+    diff: str
+    digest: str
+    # for the JSON sidecar: line counts of the (untruncated) diff, None for deletions
+    added: Optional[int] = None
+    removed: Optional[int] = None
+    title: Optional[str] = None
+    # report budget spent: no diff was computed, added/removed are estimates
+    diff_omitted: bool = False
+    # size of the diff body as rendered (after MAX_DIFF_LINES), also without Markdown:
+    # what the report budget counts
+    diff_lines: int = 0
+    diff_bytes: int = 0
+    # note size (None for deletions and append-only items, whose text isn't read whole)
+    lines: Optional[int] = None
+    words: Optional[int] = None
+
+
+@dataclass(frozen=True)
+class NoteMeta:
+    """
+    Everything the report derives from a note's text besides the diff. Depends on the
+    content only, so it is cached per fingerprint (.ops_state/derived.json).
+    """
+    heading: Optional[str]  # first "#" heading; None -> file name
+    preview: str
+    query_preview: str
+    lines: Optional[int] = None  # None: derived from the head only (append-only path)
+    words: Optional[int] = None
+
+    def title(self, fallback_name: str) -> str:
+        return self.heading or fallback_name
+
+
+def _first_heading(text: str) -> Optional[str]:
+    for line in text.splitlines():
+        line = line.strip()
+        if line.startswith("#"):
+            return line.lstrip("#").strip()
+    return None
+
+
+def _first_heading_or_filename(text: str, fallback_name: str) -> str:
+    return _first_heading(text) or fallback_name
+
+
+def _truncate(t: str, limit: int) -> str:
+    if len(t) <= limit:
+        return t
+    return t[:limit].rstrip() + "..."
+
+
+def _preview(text: str, limit: int = MAX_PREVIEW_CHARS) -> str:
+    return _truncate(" ".join(text.split()), limit)
+
+
+def derive_meta(text: str, complete: bool = True) -> NoteMeta:
+    """
+    `complete`=False: `text` is only the head of the note (no line/word counts).
+    """
+    words = text.split()
+    t = " ".join(words)
+    return NoteMeta(
+        heading=_first_heading(text),
+        preview=_truncate(t, MAX_PREVIEW_CHARS),
+        query_preview=_truncate(t, RAG_QUERY_PREVIEW_CHARS),
+        lines=len(text.splitlines()) if complete else None,
+        words=len(words) if complete else None,
+    )
+
+
+def _job_meta(job: RenderJob) -> NoteMeta:
+    return job.meta if job.meta is not None else derive_meta(job.new_text)
+
+
+def _unified_diff_lines(old_text: str, new_text: str, relpath: str) -> List[str]:
+    return list(
+        difflib.unified_diff(
+            old_text.splitlines(),
+            new_text.splitlines(),
+            fromfile=f"a/{relpath}",
+            tofile=f"b/{relpath}",
+            lineterm="",
+        )
+    )
+
+
+def _format_range(start: int, length: int) -> str:
+    # same as difflib's unified hunk ranges
+    beginning = start + 1
+    if length == 1:
+        return f"{beginning}"
+    if not length:
+        beginning -= 1
+    return f"{beginning},{length}"
+
+
+def _append_diff_lines(job: RenderJob) -> List[str]:
+    """
+    What difflib.unified_diff() gives for old + appended lines, without the old text.
+    """
+    appended = (job.appended_text or "").splitlines()
+    if not appended:
+        return []
+    context = list(job.append_context)
+    start = job.append_old_lines - len(context)
+    return [
+        f"--- a/{job.relpath}",
+        f"+++ b/{job.relpath}",
+        f"@@ -{_format_range(start, len(context))} +{_format_range(start, len(context) + len(appended))} @@",
+        *(" " + line for line in context),
+        *("+" + line for line in appended),
+    ]
+
+
+def _diff_stats(diff_lines: List[str]) -> Tuple[int, int]:
+    added = removed = 0
+    for line in diff_lines:
+        if line.startswith("+") and not line.startswith("+++"):
+            added += 1
+        elif line.startswith("-") and not line.startswith("---"):
+            removed += 1
+    return added, removed
+
+
+def _unified_diff_text(
+    old_text: str, new_text: str, relpath: str, diff_lines: Optional[List[str]] = None
+) -> str:
+    if diff_lines is None:
+        diff_lines = _unified_diff_lines(old_text, new_text, relpath)
+    if not diff_lines:
+        return "(no diff)"
+
+    if len(diff_lines) > MAX_DIFF_LINES:
+        diff_lines = diff_lines[:MAX_DIFF_LINES] + ["...(diff truncated)"]
+    return "\n".join(diff_lines)
+
+
+def render_diff_section(job: RenderJob, diff_lines: Optional[List[str]] = None) -> str:
+    lines: List[str] = [f"### `{job.relpath}` ({job.status})"]
+    if job.status == "deleted":
+        lines += ["", "> deleted", ""]
+        return "\n".join(lines)
+    if job.renamed_from:
+        lines += ["", f"> renamed from `{job.renamed_from}`"]
+
+    if diff_lines is None and job.appended_text is not None:
+        diff_lines = _append_diff_lines(job)
+    diff_text = _unified_diff_text(job.old_text, job.new_text, job.relpath, diff_lines)
+    lines += ["", "```diff", diff_text, "```", ""]
+    return "\n".join(lines)
+
+
+def render_digest_section(job: RenderJob, meta: Optional[NoteMeta] = None) -> str:
+    if job.status == "deleted":
+        return f"- `{job.relpath}`: (deleted)"
+
+    meta = meta or _job_meta(job)
+    title = meta.title(Path(job.relpath).name)
+    return f"- `{job.relpath}` — **{title}**\n  - preview: {meta.preview}"
+
+
+def render_job(job: RenderJob) -> RenderedSections:
+    if job.status == "deleted":
+        diff = render_diff_section(job) if job.markdown else ""
+        digest = render_digest_section(job) if job.markdown else ""
+        return RenderedSections(diff=diff, digest=digest)
+
+    # one difflib pass for both the Markdown diff and the stats
+    if job.appended_text is not None:
+        diff_lines = _append_diff_lines(job)
+    else:
+        diff_lines = _unified_diff_lines(job.old_text, job.new_text, job.relpath)
+    added, removed = _diff_stats(diff_lines)
+    diff_text = _unified_diff_text(job.old_text, job.new_text, job.relpath, diff_lines)
+    meta = _job_meta(job)
+    return RenderedSections(
+        diff=render_diff_section(job, diff_lines) if job.markdown else "",
+        digest=render_digest_section(job, meta) if job.markdown else "",
+        added=added,
+        removed=removed,
+        title=meta.title(Path(job.relpath).name),
+        lines=meta.lines,
+        words=meta.words,
+        diff_lines=diff_text.count("\n") + 1,
+        diff_bytes=len(diff_text.encode("utf-8")) + 1,
+    )
+
+
+def estimate_diff_stats(job: RenderJob) -> Tuple[int, int]:
+    """
+    Cheap (added, removed) estimate without difflib: multiset difference of the lines,
+    or the change in line count while the texts aren't loaded. Never more than the real
+    diff (moved lines count as unchanged).
+    """
+    if job.status == "deleted":
+        return 0, 0
+    if job.appended_text is not None:
+        return len(job.appended_text.splitlines()), 0
+    if not job.texts_loaded:
+        new = job.meta.lines if job.meta is not None and job.meta.lines is not None else 0
+        old = job.old_lines or 0
+        return max(0, new - old), max(0, old - new)
+    old = Counter(job.old_text.splitlines())
+    new = Counter(job.new_text.splitlines())
+    return sum((new - old).values()), sum((old - new).values())
+
+
+def _min_diff_lines(job: RenderJob, estimate: Tuple[int, int]) -> int:
+    # lower bound on RenderedSections.diff_lines (and diff_bytes: each line has a prefix
+    # and a newline): ---/+++/@@ headers plus the changed lines, up to MAX_DIFF_LINES
+    if job.status == "deleted":
+        return 0
+    changed = estimate[0] + estimate[1]
+    return min(3 + changed, MAX_DIFF_LINES + 1) if changed else 1
+
+
+def render_stat_only(job: RenderJob, estimate: Optional[Tuple[int, int]] = None) -> RenderedSections:
+    if job.status == "deleted":
+        return render_job(job)
+    added, removed = estimate if estimate is not None else estimate_diff_stats(job)
+    diff = ""
+    if job.markdown:
+        lines = [f"### `{job.relpath}` ({job.status})", ""]
+        if job.renamed_from:
+            lines += [f"> renamed from `{job.renamed_from}`", ""]
+        lines += [f"> diff omitted (report budget spent): ~+{added} / -{removed} lines", ""]
+        diff = "\n".join(lines)
+    meta = _job_meta(job)
+    return RenderedSections(
+        diff=diff,
+        digest=render_digest_section(job, meta) if job.markdown else "",
+        added=added,
+        removed=removed,
+        title=meta.title(Path(job.relpath).name),
+        diff_omitted=True,
+        lines=meta.lines,
+        words=meta.words,
+    )
+
+
+def build_rag_query(relpath: str, text: str, meta: Optional[NoteMeta] = None) -> str:
+    # query 구성: 제목 + 파일명 + preview (meta 가 있으면 본문을 다시 보지 않음)
+    if meta is None:
+        meta = derive_meta(text, complete=False)
+    title = meta.title(Path(relpath).name)
+    return f"{title}\n파일: {relpath}\n내용요약: {meta.query_preview}\n관련 근거/관련 노트를 찾아줘"
+
+
+RAG_SKIP_NOTES = {
+    "budget": "- (not queried: RAG time budget exhausted)\n",
+    "circuit": "- (not queried: RAG circuit breaker open after repeated failures)\n",
+    "error": "- (RAG query failed)\n",
+}
+
+
+def render_rag_section(relpath: str, status: str, lookup: Optional[RagLookup] = None) -> str:
+    lines: List[str] = [f"### `{relpath}`"]
+    if status == "deleted":
+        lines.append("- (deleted)\n")
+        return "\n".join(lines)
+    if lookup is None or not lookup.evidences:
+        skipped = lookup.skipped if lookup is not None else None
+        lines.append(RAG_SKIP_NOTES.get(skipped or "", "- (no evidence)\n"))
+        return "\n".join(lines)
+
+    if lookup.fallback:
+        lines.append("- (RAG server unavailable: local index evidence)")
+    for i, ev in enumerate(lookup.evidences, start=1):
+        src = f" — source: {ev.source}" if ev.source else ""
+        score = f"  (score={ev.score:.4f})" if ev.score is not None else ""
+        lines.append(f"- Top{i}{score}{src}")
+    lines.append("")
+    return "\n".join(lines)
+
+
+def resolve_workers(workers: int) -> int:
+    """
+    0 (or negative) = auto (cpu count), 1 = always in-process.
+    """
+    if workers <= 0:
+        return max(1, os.cpu_count() or 1)
+    return workers
+
+
+def should_parallelize(jobs: Sequence[RenderJob], workers: int) -> bool:
+    if resolve_workers(workers) <= 1 or len(jobs) < PARALLEL_MIN_FILES:
+        return False
+    total = sum(len(j.old_text) + len(j.new_text) for j in jobs)
+    return total >= PARALLEL_MIN_BYTES
+
+
+def render_sections(
+    jobs: Sequence[RenderJob],
+    workers: int = 0,
+    executor: Optional[Executor] = None,
+    verbose: bool = False,
+) -> List[RenderedSections]:
+    """
+    Render per-file sections, in the same order as `jobs`.
+    Large weeks are farmed out to a process pool (the given `executor`, or a
+    short-lived one); any pool failure falls back to in-process rendering.
+    """
+    if not should_parallelize(jobs, workers):
+        return [render_job(j) for j in jobs]
+
+    n = resolve_workers(workers)
+    chunksize = max(1, len(jobs) // (n * 4))
+    if verbose:
+        print(f"[INFO] rendering {len(jobs)} file sections with {n} workers")
+    try:
+        if executor is not None:
+            return list(executor.map(render_job, jobs, chunksize=chunksize))
+        with ProcessPoolExecutor(max_workers=n) as pool:
+            return list(pool.map(render_job, jobs, chunksize=chunksize))
+    except Exception as e:
+        # best effort: pools can be unavailable (frozen exe, sandboxed hosts, ...)
+        if verbose:
+            print(f"[WARN] parallel rendering failed, falling back to in-process: {e}")
+        return [render_job(j) for j in jobs]
+
+
+def render_sections_within_budget(
+    jobs: Sequence[RenderJob],
+    max_lines: int = 0,
+    max_bytes: int = 0,
+    workers: int = 0,
+    executor: Optional[Executor] = None,
+    verbose: bool = False,
+    load: Optional[Callable[[RenderJob], RenderJob]] = None,
+) -> List[RenderedSections]:
+    """
+    render_sections() under a total size budget for the diffs (0 = unlimited), counted
+    on the rendered diff bodies (`diff_lines` / `diff_bytes`) so it applies the same
+    with or without Markdown output.
+
+    Jobs are rendered biggest estimated change first. A diff that doesn't fit in what is
+    left of the budget is skipped and the next ones are still tried; diffs that can't
+    fit even by their estimate aren't computed at all. Skipped files get a stat-only
+    section (render_stat_only). Jobs whose texts aren't loaded (`texts_loaded`) are
+    passed through `load` right before their diff is computed, so omitted diffs never
+    read their texts. Results are in the same order as `jobs`, and which files get a
+    full diff doesn't depend on `workers`.
+    """
+    if max_lines <= 0 and max_bytes <= 0:
+        if load is not None:
+            jobs = [j if j.texts_loaded else load(j) for j in jobs]
+        return render_sections(jobs, workers, executor, verbose)
+
+    estimates = [estimate_diff_stats(j) for j in jobs]
+    order = sorted(range(len(jobs)), key=lambda i: (-(estimates[i][0] + estimates[i][1]), jobs[i].relpath))
+    out: List[Optional[RenderedSections]] = [None] * len(jobs)
+    n = resolve_workers(workers)
+    # parallel: render a few files per worker ahead; results past the budget are dropped
+    batch = max(PARALLEL_MIN_FILES, n * 4) if n > 1 and len(jobs) >= PARALLEL_MIN_FILES else 1
+    pool: Optional[Executor] = None
+    used_lines = used_bytes = 0
+
+    def _fits(n_lines: int, n_bytes: int) -> bool:
+        return (max_lines <= 0 or used_lines + n_lines <= max_lines) and (
+            max_bytes <= 0 or used_bytes + n_bytes <= max_bytes
+        )
+
+    try:
+        pos = 0
+        while pos < len(order):
+            idx: List[int] = []
+            while pos < len(order) and len(idx) < batch:
+                i = order[pos]
+                pos += 1
+                least = _min_diff_lines(jobs[i], estimates[i])
+                if _fits(least, least):
+                    idx.append(i)
+            if not idx:
+                break
+            loaded = [jobs[i] if jobs[i].texts_loaded or load is None else load(jobs[i]) for i in idx]
+            if pool is None and executor is None and should_parallelize(loaded, workers):
+                pool = ProcessPoolExecutor(max_workers=n)
+            results = render_sections(loaded, workers, executor or pool, verbose=False)
+            for i, r in zip(idx, results):
+                if _fits(r.diff_lines, r.diff_bytes):
+                    out[i] = r
+                    used_lines += r.diff_lines
+                    used_bytes += r.diff_bytes
+    finally:
+        if pool is not None:
+            pool.shutdown(wait=True, cancel_futures=True)
+
+    omitted = [i for i, r in enumerate(out) if r is None]
+    if verbose and omitted:
+        print(f"[INFO] report budget spent: {len(omitted)} file(s) get stat-only diff sections")
+    for i in omitted:
+        out[i] = render_stat_only(jobs[i], estimates[i])
+    return [r for r in out if r is not None]
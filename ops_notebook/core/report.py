@@ -1,42 +1,64 @@
 from __future__ import annotations
 
-import difflib
+import asyncio
+import time
+from concurrent.futures import Executor
 from datetime import datetime
 from pathlib import Path
-from typing import List, Optional
+from typing import Any, Dict, Iterator, List, Optional, Tuple
 
-from .constants import MAX_PREVIEW_CHARS, MAX_RAG_SNIPPET_CHARS
+import requests
+
+from .constants import MAX_RAG_SNIPPET_CHARS
+from .derived import DERIVED_FILENAME, DerivedCache
+from .git_backend import GIT_FINGERPRINT, GitSnapshots, is_git_worktree, iter_git_scan
+from .hashing import DEFAULT_FINGERPRINT
+from .local_index import LocalIndex
+from .metrics import (
+    METRICS_FILENAME,
+    RunMetrics,
+    append_metrics,
+    file_size,
+    write_prometheus_textfile,
+)
+from .near_dup import DEFAULT_MAX_DISTANCE, SignatureIndex
 from .rag_cache import RagCache
 from .rag_client import RagClient, RagEvidence
-from .scanner import ScanItem, scan
-from .snapshots import SnapshotStore
+from .rag_ingest import DEFAULT_INGEST_BATCH_SIZE, INGEST_FILENAME, RagIngest, push_changes
+from .rag_phase import DEFAULT_RAG_BUDGET_S, DEFAULT_RAG_MAX_FAILURES, RagLookup, RagPhase
+from .render import (
+    MAX_DIFF_LINES,  # noqa: F401 (re-export)
+    RenderedSections,
+    RenderJob,
+    _first_heading_or_filename,
+    build_rag_query,
+    render_rag_section,
+    render_sections_within_budget,
+)
+from .report_json import build_report_json, write_report_json
+from .rollup import update_week_summary
+from .run_lock import DEFAULT_LOCK_TIMEOUT_S, RunLock
+from .scanner import (
+    CHANGE_STATUSES,
+    ScanItem,
+    ScanScope,
+    ScanStats,
+    is_this_week_candidate,
+    iter_scan,
+    scan_order_key,
+    tree_matches_state,
+)
+from .snapshots import (
+    SNAPSHOT_WORKERS,
+    SnapshotStore,
+    load_render_jobs,
+    load_render_texts,
+    read_text_safe,
+    write_snapshots,
+)
 from .state import StateStore
-from .weekly import current_week_window_local, parse_iso_maybe
-
-MAX_DIFF_LINES = 160
-
-
-def _read_text_safe(path: Path) -> str:
-    try:
-        return path.read_text(encoding="utf-8")
-    except UnicodeDecodeError:
-        # fallback
-        return path.read_text(encoding="utf-8", errors="replace")
-
-
-def _first_heading_or_filename(text: str, fallback_name: str) -> str:
-    for line in text.splitlines():
-        line = line.strip()
-        if line.startswith("#"):
-            return line.lstrip("#").strip() or fallback_name
-    return fallback_name
-
-
-def _preview(text: str, limit: int = MAX_PREVIEW_CHARS) -> str:
-    t = " ".join(text.split())
-    if len(t) <= limit:
-        return t
-    return t[:limit].rstrip() + "..."
+from .throttle import IoThrottle
+from .weekly import current_week_window_local
 
 
 def _format_changed_files_block(items: List[ScanItem]) -> str:
@@ -48,77 +70,70 @@ def _format_changed_files_block(items: List[ScanItem]) -> str:
             "changed": "🟧 changed",
             "new": "🟩 new",
             "deleted": "🟥 deleted",
+            "renamed": "🟦 renamed",
             "unchanged": "⬜ unchanged",
         }.get(it.status, it.status)
-        lines.append(f"- {badge}: `{it.relpath}`")
+        origin = f" (from `{it.renamed_from}`)" if it.renamed_from else ""
+        lines.append(f"- {badge}: `{it.relpath}`{origin}")
     return "\n".join(lines) + "\n"
 
 
-def _unified_diff_text(old_text: str, new_text: str, relpath: str) -> str:
-    old_lines = old_text.splitlines()
-    new_lines = new_text.splitlines()
-    diff_iter = difflib.unified_diff(
-        old_lines,
-        new_lines,
-        fromfile=f"a/{relpath}",
-        tofile=f"b/{relpath}",
-        lineterm="",
-    )
-    diff_lines = list(diff_iter)
-    if not diff_lines:
-        return "(no diff)"
-    
-    if len(diff_lines) > MAX_DIFF_LINES:
-        diff_lines = diff_lines[:MAX_DIFF_LINES] + ["...(diff truncated)"]
-    return "\n".join(diff_lines)
+def _rag_lookup_for(it: ScanItem, job: RenderJob, rag: RagPhase) -> Optional[RagLookup]:
+    if it.status == "deleted" or it.abspath is None:
+        return None
+    q = build_rag_query(it.relpath, job.new_text, job.meta)
+    return rag.lookup(it.relpath, it.sha256 or "", q)
 
 
-def _format_diff_block(items: List[ScanItem], notes_dir: Path, snapshots: SnapshotStore) -> str:
-    if not items:
-        return "- (none)\n"
-    
-    lines: List[str] = []
+MAX_NEAR_DUPS_LISTED = 5
+
+
+def _near_duplicates(
+    items: List[ScanItem], index: SignatureIndex, max_distance: int
+) -> Dict[str, List[Tuple[str, int]]]:
+    out: Dict[str, List[Tuple[str, int]]] = {}
     for it in items:
-        lines.append(f"### `{it.relpath}` ({it.status})")
-        
-        if it.status == "deleted" or it.abspath is None:
-            lines.append("")
-            lines.append("> deleted")
-            lines.append("")
+        if it.status == "deleted":
             continue
-        
-        new_text = _read_text_safe(it.abspath)
-        old_text = snapshots.load_text(it.relpath) or ""
-        
-        diff_text = _unified_diff_text(old_text, new_text, it.relpath)
-        
-        lines.append("")
-        lines.append("```diff")
-        lines.append(diff_text)
-        lines.append("```")
-        lines.append("")
-    
-    return "\n".join(lines).rstrip() + "\n"
+        dups = index.near_duplicates(it.relpath, max_distance)
+        if dups:
+            out[it.relpath] = dups
+    return out
 
 
-def _format_auto_digest_block(items: List[ScanItem], notes_dir: Path) -> str:
-    if not items:
-        return "- (none)\n"
-    
+def _format_near_duplicates_block(
+    items: List[ScanItem], near_dups: Optional[Dict[str, List[Tuple[str, int]]]]
+) -> str:
+    if near_dups is None:
+        return "- (near-duplicate detection disabled)\n"
     lines: List[str] = []
     for it in items:
-        if it.status == "deleted" or it.abspath is None:
-            lines.append(f"- `{it.relpath}`: (deleted)")
-            continue
-        
-        text = _read_text_safe(it.abspath)
-        title = _first_heading_or_filename(text, Path(it.relpath).name)
-        prev = _preview(text)
-        lines.append(f"- `{it.relpath}` — **{title}**")
-        lines.append(f"  - preview: {prev}")
+        dups = near_dups.get(it.relpath)
+        if dups:
+            others = ", ".join(f"`{rel}` (distance {d})" for rel, d in dups[:MAX_NEAR_DUPS_LISTED])
+            if len(dups) > MAX_NEAR_DUPS_LISTED:
+                others += f" (+{len(dups) - MAX_NEAR_DUPS_LISTED} more)"
+            lines.append(f"- `{it.relpath}` ≈ {others}")
+    if not lines:
+        return "- (no near-duplicates)\n"
     return "\n".join(lines) + "\n"
 
 
+def _format_diff_block(rendered: List[RenderedSections], biggest_first: bool = False) -> str:
+    if not rendered:
+        return "- (none)\n"
+    if biggest_first:
+        # report budget: full diffs by size, then the stat-only sections
+        rendered = sorted(rendered, key=lambda r: (r.diff_omitted, -((r.added or 0) + (r.removed or 0))))
+    return "\n".join(r.diff for r in rendered).rstrip() + "\n"
+
+
+def _format_auto_digest_block(rendered: List[RenderedSections]) -> str:
+    if not rendered:
+        return "- (none)\n"
+    return "\n".join(r.digest for r in rendered) + "\n"
+
+
 def _default_rag_query(changed_items: List[ScanItem], notes_dir: Path) -> str:
     """
     Construct a reasonable query without being fancy:
@@ -129,7 +144,7 @@ def _default_rag_query(changed_items: List[ScanItem], notes_dir: Path) -> str:
         if it.status == "deleted" or it.abspath is None:
             titles.append(Path(it.relpath).stem)
             continue
-        text = _read_text_safe(it.abspath)
+        text = read_text_safe(it.abspath)
         titles.append(_first_heading_or_filename(text, Path(it.relpath).stem))
     
     if not titles:
@@ -156,14 +171,53 @@ def _format_rag_block(evidences: Optional[List[RagEvidence]], top_k: int) -> str
     return "\n".join(lines) + "\n"
 
 
-def _auto_report_path(reports_dir: Path, week_start: datetime) -> Path:
+def _record_run_metrics(
+    m: RunMetrics,
+    scan_stats: ScanStats,
+    rag: Optional[RagPhase],
+    state_path: Path,
+    snapshots: SnapshotStore | GitSnapshots,
+    prometheus_textfile: Optional[Path],
+    verbose: bool,
+) -> None:
+    state_dir = state_path.parent
+    try:
+        m.counts = {"total": scan_stats.files, **scan_stats.counts}
+        m.bytes_hashed = scan_stats.bytes_hashed
+        m.rag = dict(rag.stats) if rag is not None else {}
+        m.sizes = {
+            "state": file_size(state_path),
+            "rag_cache": file_size(rag.cache.path if rag and rag.cache else state_dir / "rag_cache.json"),
+            "local_index": file_size(state_dir / "local_index.json"),
+            "signatures": file_size(state_dir / "signatures.json"),
+            "derived": file_size(state_dir / DERIVED_FILENAME),
+            "rag_ingest": file_size(state_dir / INGEST_FILENAME),
+        }
+        if isinstance(snapshots, SnapshotStore):
+            # bytes this run wrote; the whole snapshot tree is only walked by --doctor
+            m.snapshot_bytes_written = snapshots.bytes_written
+        m.finish()
+        append_metrics(state_dir / METRICS_FILENAME, m)
+        if prometheus_textfile is not None:
+            write_prometheus_textfile(prometheus_textfile, m)
+    except Exception as e:
+        # best effort: metrics must never fail the report
+        print(f"[WARN] could not record run metrics: {e}")
+        return
+    if verbose:
+        print(f"[INFO] run metrics: {m.duration_s:.2f}s, phases={m.phases}")
+
+
+def _auto_report_path(reports_dir: Path, week_start: datetime, partial: bool = False) -> Path:
     iso = week_start.isocalendar() # (year, week, weekday)
     y = iso.year
     w = iso.week
-    return reports_dir / f"{y}-W{w:02d}.md"
+    # scoped runs must not overwrite the full weekly report
+    suffix = ".partial" if partial else ""
+    return reports_dir / f"{y}-W{w:02d}{suffix}.md"
 
 
-def generate_weekly_report(
+def _write_weekly_report(
     notes_dir: Path,
     reports_dir: Path,
     report_path: Optional[Path],
@@ -174,7 +228,34 @@ def generate_weekly_report(
     rag_top_k: int,
     rag_query: str,
     verbose: bool = False,
-) -> None:
+    render_workers: int = 0,
+    pipeline: str = "sequential",
+    queue_size: int = 32,
+    rag_concurrency: int = 4,
+    rag_timeout_s: float = 12,
+    rag_budget_s: float = DEFAULT_RAG_BUDGET_S,
+    rag_max_failures: int = DEFAULT_RAG_MAX_FAILURES,
+    scan_backend: str = "files",
+    fingerprint: str = DEFAULT_FINGERPRINT,
+    append_only: bool = False,
+    rag_provider: str = "http",
+    near_dup: bool = False,
+    near_dup_max_distance: int = DEFAULT_MAX_DISTANCE,
+    metrics: bool = True,
+    prometheus_textfile: Optional[Path] = None,
+    markdown: bool = True,
+    json_output: bool = True,
+    scope: Optional[ScanScope] = None,
+    budget_lines: int = 0,
+    budget_bytes: int = 0,
+    render_executor: Optional[Executor] = None,
+    rag_session: Optional[requests.Session] = None,
+    rag_cache: Optional[RagCache] = None,
+    rag_namespace: str = "",
+    io_limit: int = 0,
+    ingest_url: str = "",
+    ingest_batch_size: int = DEFAULT_INGEST_BATCH_SIZE,
+) -> Path:
     if verbose:
         print(f"[INFO] notes_dir={notes_dir}")
         print(f"[INFO] reports_dir={reports_dir}")
@@ -184,115 +265,378 @@ def generate_weekly_report(
     store = StateStore(state_path)
     store.load()
     
-    items = scan(notes_dir, store)
-    store.save()
-    
-    # filter: changed/new/deleted that happened within current week window
     week = current_week_window_local()
     week_range = f"{week.start.date().isoformat()} ~ {(week.end.date()).isoformat()} (Mon~Mon)"
     generated_at = datetime.now().astimezone().isoformat(timespec="seconds")
     
-    this_week_candidates: List[ScanItem] = []
-    for it in items:
-        if it.status not in ("changed", "new", "deleted"):
-            continue
-        dt = parse_iso_maybe(it.last_changed_at)
-        if dt is None:
-            continue
-        if week.start <= dt < week.end:
-            this_week_candidates.append(it)
-    
     # Output path
     reports_dir.mkdir(parents=True, exist_ok=True)
-    final_report_path = report_path if report_path is not None else _auto_report_path(reports_dir, week.start)
+    final_report_path = (
+        report_path
+        if report_path is not None
+        else _auto_report_path(reports_dir, week.start, partial=scope is not None)
+    )
     
-    # Snapshots (for diffs)
-    snapshots_root = state_path.parent / "snapshots"
-    snapshots = SnapshotStore(snapshots_root)
+    run_metrics = RunMetrics(pipeline=pipeline, scan_backend=scan_backend, partial=scope is not None)
+    scan_stats = ScanStats()
+    # scan.io_limit / --nice: pace fingerprint reads and snapshot writes
+    throttle = IoThrottle(io_limit) if io_limit > 0 else None
     
-    # Build blocks
-    changed_files_block = _format_changed_files_block(this_week_candidates)
-    diff_block = _format_diff_block(this_week_candidates, notes_dir, snapshots)
-    auto_digest_block = _format_auto_digest_block(this_week_candidates, notes_dir)
+    # Snapshots (for diffs) + scan backend
+    snapshots: SnapshotStore | GitSnapshots
+    if scope is not None:
+        print(f"[INFO] partial run, scope: {scope.describe()}")
+        # a partial run can't migrate the state to another fingerprint algorithm
+        if scan_backend != "git" and fingerprint != store.algorithm:
+            print(f"[WARN] scoped run keeps the state's fingerprint ({store.algorithm}); run a full scan to switch")
+    git_ok = scan_backend == "git" and is_git_worktree(notes_dir)
+    if git_ok and scope is not None and store.algorithm != GIT_FINGERPRINT:
+        print("[WARN] scoped runs need a state already on the git backend; using file scan")
+        git_ok = False
+    if git_ok:
+        git_snapshots = GitSnapshots(notes_dir)
+        snapshots = git_snapshots
+        
+        def _scan_items() -> Iterator[ScanItem]:
+            return iter_git_scan(
+                notes_dir, store, git_snapshots, statuses=CHANGE_STATUSES, stats=scan_stats, scope=scope
+            )
+    else:
+        if scan_backend == "git" and not is_git_worktree(notes_dir):
+            print(f"[WARN] scan.backend=git but {notes_dir} is not a git working tree; using file scan")
+        snapshots_root = state_path.parent / "snapshots"
+        snapshots = SnapshotStore(snapshots_root, throttle=throttle)
+        
+        def _scan_items() -> Iterator[ScanItem]:
+            return iter_scan(
+                notes_dir,
+                store,
+                statuses=CHANGE_STATUSES,
+                algorithm=fingerprint,
+                stats=scan_stats,
+                scope=scope,
+                throttle=throttle,
+                append_only=append_only,
+            )
     
-    rag_per_file_block = "- (RAG disabled)\n"
+    rag: Optional[RagPhase] = None
+    local_index: Optional[LocalIndex] = None
     if use_rag:
-        client = RagClient(rag_url=rag_url, timeout_s=12)
+        # rag.provider: http (server) | local (offline BM25 index) | auto (server, index as fallback)
+        if rag_provider in ("local", "auto"):
+            local_index = LocalIndex(state_path.parent / "local_index.json")
+            local_index.load()
+        if rag_provider == "local":
+            assert local_index is not None
+            rag = RagPhase(
+                local_index,
+                None,
+                "local",
+                rag_top_k,
+                budget_s=0,
+                max_failures=rag_max_failures,
+            )
+        else:
+            # a cache shared by several notebooks is passed in (keys namespaced per notebook)
+            if rag_cache is None:
+                rag_cache = RagCache(state_path.parent / "rag_cache.json")
+                rag_cache.load()
+            rag = RagPhase(
+                RagClient(rag_url=rag_url, timeout_s=rag_timeout_s, session=rag_session),
+                rag_cache,
+                rag_url,
+                rag_top_k,
+                budget_s=rag_budget_s,
+                max_failures=rag_max_failures,
+                fallback=local_index,
+                key_prefix=f"{rag_namespace}:" if rag_namespace else "",
+            )
+    
+    # title/preview/counts per fingerprint: notes seen before aren't re-derived
+    derived = DerivedCache(state_path.parent / DERIVED_FILENAME)
+    derived.load()
+    
+    signatures: Optional[SignatureIndex] = None
+    if near_dup:
+        signatures = SignatureIndex(state_path.parent / "signatures.json")
+        signatures.load()
+    
+    # rag.ingest_url: push this run's changes to the server's index before querying it
+    ingest: Optional[RagIngest] = None
+    if rag is not None and ingest_url and rag_provider != "local":
+        ingest = RagIngest(
+            state_path.parent / INGEST_FILENAME,
+            batch_size=ingest_batch_size,
+            doc_prefix=f"{rag_namespace}/" if rag_namespace else "",
+        )
+        ingest.load()
+    
+    def _sync_signatures() -> None:
+        if signatures is not None:
+            n = signatures.sync(notes_dir, store)
+            if verbose:
+                print(f"[INFO] near-dup signatures: {n} note(s) updated, {len(signatures)} total")
+    
+    # what the RAG lookups need first: the server's index and the local index
+    def _before_rag() -> None:
+        if ingest is not None and rag is not None:
+            t = time.perf_counter()
+            client = RagClient(rag_url=rag_url, timeout_s=rag_timeout_s, session=rag_session, ingest_url=ingest_url)
+            # one deadline for the push and the lookups: together they stay within rag.budget_s
+            res = push_changes(ingest, notes_dir, store, client, rag.deadline(), verbose)
+            if res is not None:
+                run_metrics.ingest = {
+                    "upserted": res.upserted,
+                    "deleted": res.deleted,
+                    "failed_batches": res.failed_batches,
+                    "pending": res.pending,
+                    "out_of_budget": int(res.out_of_budget),
+                }
+            run_metrics.phases["ingest"] = round(time.perf_counter() - t, 4)
+        # only notes whose fingerprint changed since the last sync are read
+        if local_index is not None:
+            n = local_index.sync(notes_dir, store)
+            if verbose:
+                print(f"[INFO] local index: {n} note(s) re-indexed, {len(local_index)} indexed")
+    
+    # only changed/new/deleted/renamed items are kept in memory; unchanged notes are
+    # fingerprinted and recorded in the state but never materialized
+    changed_items: Optional[List[ScanItem]] = None
+    if pipeline == "async":
+        from .pipeline import run_async_pipeline
         
-        cache_path = state_path.parent / "rag_cache.json"
-        rag_cache = RagCache(cache_path)
-        rag_cache.load()
+        # stages overlap, so only the whole pipeline is timed
+        with run_metrics.phase("pipeline"):
+            result = asyncio.run(
+                run_async_pipeline(
+                    scan_items=_scan_items,
+                    store=store,
+                    snapshots=snapshots,
+                    week=week,
+                    rag=rag,
+                    render_workers=render_workers,
+                    queue_size=queue_size,
+                    rag_concurrency=rag_concurrency,
+                    verbose=verbose,
+                    # lookups wait only for what they query, not for the near-dup signatures
+                    after_scan=_before_rag if local_index is not None or ingest is not None else None,
+                    markdown=markdown,
+                    budget_lines=budget_lines,
+                    budget_bytes=budget_bytes,
+                    executor=render_executor,
+                    derived=derived,
+                )
+            )
+        this_week_candidates = result.candidates
+        rendered = result.rendered
+        rag_lookups = result.rag_lookups
+        snapshot_writes = result.snapshot_writes
+        with run_metrics.phase("index"):
+            _sync_signatures()
+    else:
+        with run_metrics.phase("scan"):
+            changed_items = sorted(_scan_items(), key=scan_order_key)
+            store.save()
         
-        lines: List[str] = []
-        for it in this_week_candidates:
-            if it.status == "deleted" or it.abspath is None:
-                lines.append(f"### `{it.relpath}`")
-                lines.append("- (deleted)\n")
-                continue
-            
-            # query 구성: 제목 + 파일명 + preview
-            text = _read_text_safe(it.abspath)
-            title = _first_heading_or_filename(text, Path(it.relpath).name)
-            pv = _preview(text, limit=180)
-            q = f"{title}\n파일: {it.relpath}\n내용요약: {pv}\n관련 근거/관련 노트를 찾아줘"
-            
-            # 캐시 키: relpath + sha256 + url + topk + max_chars
-            sha = it.sha256 or ""
-            cached = rag_cache.get(it.relpath, sha, rag_url, rag_top_k, MAX_RAG_SNIPPET_CHARS)
-            
-            lines.append(f"### `{it.relpath}`")
-            if cached is not None:
-                evs = cached
-            else:
-                try:
-                    evs = client.query_topk(query=q, top_k=rag_top_k, max_chars=MAX_RAG_SNIPPET_CHARS)
-                except Exception:
-                    evs = []
-                rag_cache.set(it.relpath, sha, rag_url, rag_top_k, MAX_RAG_SNIPPET_CHARS, evs)
-            
-            if not evs:
-                lines.append("- (no evidence)\n")
-                continue
-            
-            for i, ev in enumerate(evs, start=1):
-                snippet = (ev.snippet or "").strip().replace("\n", " ")
-                if len(snippet) > MAX_RAG_SNIPPET_CHARS:
-                    snippet = snippet[:MAX_RAG_SNIPPET_CHARS].rstrip() + "..."
-                src = f" — source: {ev.source}" if ev.source else ""
-                score = f"  (score={ev.score:.4f})" if ev.score is not None else ""
-                lines.append(f"- Top{i}{score}{src}")
-            lines.append("")
+        this_week_candidates = [it for it in changed_items if is_this_week_candidate(it, week)]
+        # with a budget, texts are only read for the diffs that get rendered
+        budgeted = budget_lines > 0 or budget_bytes > 0
+        by_rel = {it.relpath: it for it in this_week_candidates}
+        with run_metrics.phase("load"):
+            jobs = load_render_jobs(this_week_candidates, snapshots, markdown, derived, lazy=budgeted)
+        with run_metrics.phase("render"):
+            rendered = render_sections_within_budget(
+                jobs,
+                budget_lines,
+                budget_bytes,
+                workers=render_workers,
+                executor=render_executor,
+                verbose=verbose,
+                load=lambda job: load_render_texts(job, by_rel[job.relpath], snapshots),
+            )
+        with run_metrics.phase("index"):
+            _before_rag()
+            _sync_signatures()
+        rag_lookups: List[Optional[RagLookup]] = []
+        if rag is not None:
+            with run_metrics.phase("rag"):
+                rag_lookups = [_rag_lookup_for(it, job, rag) for it, job in zip(this_week_candidates, jobs)]
+        jobs_by_rel = {j.relpath: j for j in jobs}
+        snapshot_writes = [(it, jobs_by_rel.get(it.relpath)) for it in changed_items]
+    
+    write_started = time.perf_counter()
+    near_dups: Optional[Dict[str, List[Tuple[str, int]]]] = None
+    if signatures is not None:
+        near_dups = _near_duplicates(this_week_candidates, signatures, near_dup_max_distance)
+        signatures.save()
+    
+    try:
+        if store.migrations:
+            derived.migrate(store.migrations)
+        derived.prune({fs.sha256 for fs in (store.get(rel) for rel in store.all_relpaths()) if fs and fs.sha256})
+        derived.save()
+    except OSError as e:
+        # best effort: only a cache
+        print(f"[WARN] could not save {derived.path}: {e}")
+    if verbose:
+        print(f"[INFO] derived metadata: {derived.hits} cached, {derived.misses} computed, {len(derived)} stored")
+    
+    if rag is not None:
+        if store.migrations:
+            rag.migrate_keys(store.migrations, store.algorithm)
+        rag.save()
+        if local_index is not None:
+            local_index.save()
+        if verbose and rag.breaker.is_open:
+            print(f"[WARN] RAG circuit breaker opened after {rag.breaker.max_failures} consecutive failures")
+    
+    if markdown:
+        # Build blocks
+        changed_files_block = _format_changed_files_block(this_week_candidates)
+        if scope is not None:
+            changed_files_block = (
+                f"> **Partial report** — only `{scope.describe()}` was scanned; "
+                "changes elsewhere in the notebook are not included.\n\n" + changed_files_block
+            )
+        diff_block = _format_diff_block(rendered, biggest_first=budget_lines > 0 or budget_bytes > 0)
+        auto_digest_block = _format_auto_digest_block(rendered)
+        near_duplicates_block = _format_near_duplicates_block(this_week_candidates, near_dups)
+        
+        rag_per_file_block = "- (RAG disabled)\n"
+        if rag is not None:
+            rag_sections = [
+                render_rag_section(it.relpath, "deleted" if res is None else it.status, res)
+                for it, res in zip(this_week_candidates, rag_lookups)
+            ]
+            rag_per_file_block = "\n".join(rag_sections).rstrip() + "\n"
+        
+        template = template_path.read_text(encoding="utf-8")
+        out = template.format(
+            week_range=week_range,
+            generated_at=generated_at,
+            report_file=final_report_path.as_posix(),
+            changed_files_block=changed_files_block,
+            diff_block=diff_block,
+            auto_digest_block=auto_digest_block,
+            rag_top_k=rag_top_k,
+            rag_per_file_block=rag_per_file_block,
+            near_duplicates_block=near_duplicates_block,
+        )
         
-        rag_cache.save()
-        rag_per_file_block = "\n".join(lines).rstrip() + "\n"
+        final_report_path.parent.mkdir(parents=True, exist_ok=True)
+        final_report_path.write_text(out, encoding="utf-8")
     
-    template = template_path.read_text(encoding="utf-8")
-    out = template.format(
-        week_range=week_range,
+    data = build_report_json(
+        week=week,
         generated_at=generated_at,
-        report_file=final_report_path.as_posix(),
-        changed_files_block=changed_files_block,
-        diff_block=diff_block,
-        auto_digest_block=auto_digest_block,
-        rag_top_k=rag_top_k,
-        rag_per_file_block=rag_per_file_block,
+        markdown_file=final_report_path.as_posix() if markdown else None,
+        items=this_week_candidates,
+        rendered=rendered,
+        rag_lookups=rag_lookups,
+        rag_enabled=rag is not None,
+        scope=scope,
+        near_dups=near_dups or {},
     )
+    if json_output:
+        write_report_json(final_report_path.with_suffix(".json"), data)
+    # compact per-week summary for --rollup (merged over all runs of the week)
+    try:
+        update_week_summary(state_path.parent, data)
+    except OSError as e:
+        print(f"[WARN] could not update the weekly summary: {e}")
+    run_metrics.phases["write"] = round(time.perf_counter() - write_started, 4)
     
-    final_report_path.parent.mkdir(parents=True, exist_ok=True)
-    final_report_path.write_text(out, encoding="utf-8")
+    # Update snapshots AFTER report generation (so diff uses previous snapshot), in both
+    # pipelines: a run that fails before this point leaves the old snapshots in place.
+    # The git backend reads old text from git objects and keeps no copies.
+    # Unchanged notes already have an up-to-date snapshot.
+    with run_metrics.phase("snapshots"):
+        write_snapshots(snapshots, snapshot_writes, workers=SNAPSHOT_WORKERS if pipeline == "async" else 1)
     
-    # Update snapshots AFTER report generation (so diff uses previous snapshot)
-    for it in items:
-        if it.abspath is None or it.status == "deleted":
-            snapshots.delete(it.relpath)
-            continue
-        try:
-            snapshots.save_text(it.relpath, _read_text_safe(it.abspath))
-        except Exception:
-            # best effort
-            pass
+    if throttle is not None:
+        run_metrics.throttle_s = round(throttle.waited_s, 4)
+        if throttle.waited_s > 0 or verbose:
+            print(
+                f"[INFO] I/O throttle ({io_limit / 1024**2:g} MiB/s): {throttle.bytes / 1e6:.1f} MB read/written, "
+                f"+{throttle.waited_s:.1f}s waiting"
+            )
+    
+    if metrics:
+        _record_run_metrics(
+            run_metrics, scan_stats, rag, state_path, snapshots, prometheus_textfile, verbose
+        )
     
+    written = final_report_path if markdown else final_report_path.with_suffix(".json")
     if verbose:
-        print(f"[DONE] wrote: {report_path}")
+        print(f"[DONE] wrote: {written}")
     else:
-        print(f"[OK] weekly report generated: {report_path}")
\ No newline at end of file
+        print(f"[OK] weekly report generated: {written}")
+    return written
+
+
+def _reuse_concurrent_run(
+    notes_dir: Path, state_path: Path, report_path: Path, expected_algorithm: Optional[str], since: float
+) -> bool:
+    """
+    After waiting for another run: its results are reusable if it wrote this report
+    after we started waiting and no note changed since its scan (stat check only).
+    """
+    try:
+        if report_path.stat().st_mtime < since:
+            return False
+    except OSError:
+        return False
+    store = StateStore(state_path)
+    store.load()
+    if expected_algorithm is not None and store.algorithm != expected_algorithm:
+        return False
+    return tree_matches_state(notes_dir, store)
+
+
+def generate_weekly_report(
+    notes_dir: Path,
+    reports_dir: Path,
+    report_path: Optional[Path],
+    template_path: Path,
+    state_path: Path,
+    *,
+    lock_timeout_s: float = DEFAULT_LOCK_TIMEOUT_S,
+    **options: Any,
+) -> Path:
+    """
+    Runs under the cross-process run lock (.ops_state/run.lock): a second invocation
+    waits for the running one and, if that produced this week's report and nothing
+    changed since, reuses it instead of scanning again.
+
+    `options` are passed through to _write_weekly_report() (use_rag, rag_url, ...,
+    see there), so new report options need no change here. `render_executor`,
+    `rag_session` and `rag_cache` let several notebooks in one process share a render
+    pool, HTTP connections and one RAG cache (see notebooks.py).
+    Returns the written report (the JSON sidecar with markdown=False).
+    """
+    scope: Optional[ScanScope] = options.get("scope")
+    markdown = bool(options.get("markdown", True))
+    final_report_path = report_path or _auto_report_path(
+        reports_dir, current_week_window_local().start, partial=scope is not None
+    )
+    lock = RunLock(state_path.parent / "run.lock", lock_timeout_s)
+    wait_started = time.time()
+    lock.acquire(verbose=bool(options.get("verbose", False)))
+    try:
+        if lock.waited:
+            git = options.get("scan_backend", "files") == "git" and is_git_worktree(notes_dir)
+            expected = GIT_FINGERPRINT if git else options.get("fingerprint", DEFAULT_FINGERPRINT)
+            written = final_report_path if markdown else final_report_path.with_suffix(".json")
+            if _reuse_concurrent_run(notes_dir, state_path, written, expected, wait_started):
+                print(f"[OK] already up to date (concurrent run wrote {written})")
+                return written
+        return _write_weekly_report(
+            notes_dir=notes_dir,
+            reports_dir=reports_dir,
+            report_path=report_path,
+            template_path=template_path,
+            state_path=state_path,
+            **options,
+        )
+    finally:
+        lock.release()
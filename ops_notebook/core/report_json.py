@@ -0,0 +1,90 @@
+from __future__ import annotations
+
+import json
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from .rag_phase import RagLookup
+from .render import RenderedSections
+from .scanner import ScanItem, ScanScope
+from .weekly import WeekWindow
+
+# bump when fields are renamed/removed (adding fields keeps the version)
+REPORT_JSON_SCHEMA = 1
+
+
+def _item_row(
+    it: ScanItem,
+    rendered: RenderedSections,
+    lookup: Optional[RagLookup],
+    rag_enabled: bool,
+    near_dups: Sequence[Tuple[str, int]],
+) -> Dict[str, Any]:
+    row: Dict[str, Any] = {
+        "relpath": it.relpath,
+        "status": it.status,
+        "renamed_from": it.renamed_from,
+        "fingerprint": it.sha256,
+        "size": it.size,
+        "mtime_epoch": it.mtime_epoch,
+        "last_changed_at": it.last_changed_at,
+        "title": rendered.title,
+        # null for deletions and append-only items (text not read whole)
+        "lines": rendered.lines,
+        "words": rendered.words,
+        # omitted: report budget spent, added/removed are estimates
+        "diff": {"added": rendered.added, "removed": rendered.removed, "omitted": rendered.diff_omitted},
+        "near_duplicates": [{"relpath": rel, "distance": d} for rel, d in near_dups],
+    }
+    if rag_enabled:
+        row["rag"] = None
+        if lookup is not None:
+            row["rag"] = {
+                "skipped": lookup.skipped,
+                "fallback": lookup.fallback,
+                "evidences": [
+                    {"source": ev.source, "score": ev.score, "snippet": ev.snippet} for ev in lookup.evidences
+                ],
+            }
+    return row
+
+
+def build_report_json(
+    week: WeekWindow,
+    generated_at: str,
+    markdown_file: Optional[str],
+    items: Sequence[ScanItem],
+    rendered: Sequence[RenderedSections],
+    rag_lookups: Sequence[Optional[RagLookup]],
+    rag_enabled: bool,
+    near_dups: Dict[str, List[Tuple[str, int]]],
+    scope: Optional[ScanScope] = None,
+) -> Dict[str, Any]:
+    """
+    Machine-readable twin of the Markdown report, built from the same in-memory
+    scan/render/RAG results (nothing is re-read).
+    """
+    y, w, _ = week.start.isocalendar()
+    lookups = list(rag_lookups) if rag_enabled else [None] * len(items)
+    return {
+        "schema": REPORT_JSON_SCHEMA,
+        "week": f"{y}-W{w:02d}",
+        "week_start": week.start.isoformat(timespec="seconds"),
+        "week_end": week.end.isoformat(timespec="seconds"),
+        "generated_at": generated_at,
+        "markdown_file": markdown_file,
+        "rag_enabled": rag_enabled,
+        # partial run: only these subtrees/globs were scanned
+        "scope": {"paths": list(scope.paths), "globs": list(scope.globs)} if scope is not None else None,
+        "items": [
+            _item_row(it, r, lk, rag_enabled, near_dups.get(it.relpath, []))
+            for it, r, lk in zip(items, rendered, lookups)
+        ],
+    }
+
+
+def write_report_json(path: Path, data: Dict[str, Any]) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(path.suffix + ".tmp")
+    tmp.write_text(json.dumps(data, ensure_ascii=False, indent=2), encoding="utf-8")
+    tmp.replace(path)
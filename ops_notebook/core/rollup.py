@@ -0,0 +1,279 @@
+from __future__ import annotations
+
+import json
+from datetime import date, datetime, timedelta
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+SUMMARIES_DIRNAME = "summaries"
+ROLLUP_KINDS = ("month", "quarter")
+MAX_EVIDENCE_SNIPPET_CHARS = 160
+MOST_CHANGED_LISTED = 20
+
+STATUS_BADGES = {"changed": "🟧 changed", "new": "🟩 new", "deleted": "🟥 deleted", "renamed": "🟦 renamed"}
+
+
+def _merge_item(old: Optional[Dict[str, Any]], new: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    One note seen in several runs (same week) or weeks (rollup): line counts add up,
+    the latest title/evidence wins, and a note created in the period stays "new" while
+    it is only edited afterwards.
+    """
+    if old is None:
+        return dict(new)
+    status = new["status"]
+    if old["status"] == "new" and status in ("changed", "renamed"):
+        status = "new"
+    merged = dict(old)
+    merged.update(
+        status=status,
+        title=new.get("title") or old.get("title"),
+        renamed_from=old.get("renamed_from") or new.get("renamed_from"),
+        evidence=new.get("evidence") or old.get("evidence"),
+    )
+    for k in ("added", "removed"):
+        if old.get(k) is not None or new.get(k) is not None:
+            merged[k] = (old.get(k) or 0) + (new.get(k) or 0)
+    return merged
+
+
+def _summary_item(row: Dict[str, Any]) -> Dict[str, Any]:
+    diff = row.get("diff") or {}
+    evidence = None
+    rag = row.get("rag") or {}
+    evs = rag.get("evidences") or []
+    if evs:
+        top = evs[0]
+        evidence = {
+            "source": top.get("source"),
+            "score": top.get("score"),
+            "snippet": " ".join(str(top.get("snippet") or "").split())[:MAX_EVIDENCE_SNIPPET_CHARS],
+        }
+    return {
+        "status": row["status"],
+        "title": row.get("title"),
+        "renamed_from": row.get("renamed_from"),
+        "added": diff.get("added"),
+        "removed": diff.get("removed"),
+        "evidence": evidence,
+    }
+
+
+def summary_path(state_dir: Path, week: str) -> Path:
+    return state_dir / SUMMARIES_DIRNAME / f"{week}.json"
+
+
+def load_week_summary(path: Path) -> Optional[Dict[str, Any]]:
+    try:
+        data = json.loads(path.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return None
+    if not isinstance(data, dict) or not isinstance(data.get("items"), dict):
+        return None
+    return data
+
+
+def update_week_summary(state_dir: Path, report: Dict[str, Any]) -> Path:
+    """
+    Merge one run's results (the report JSON dict) into
+      .ops_state/summaries/YYYY-Www.json
+    Every run only reports what changed since the previous one, so the week's summary
+    accumulates all runs of that week (partial runs included).
+    """
+    path = summary_path(state_dir, report["week"])
+    summary = load_week_summary(path) or {
+        "version": 1,
+        "week": report["week"],
+        "week_start": report["week_start"],
+        "runs": 0,
+        "items": {},
+    }
+    items: Dict[str, Any] = summary["items"]
+    for row in report.get("items", []):
+        items[row["relpath"]] = _merge_item(items.get(row["relpath"]), _summary_item(row))
+    summary["runs"] = int(summary.get("runs") or 0) + 1
+    summary["updated_at"] = report.get("generated_at")
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(path.suffix + ".tmp")
+    tmp.write_text(json.dumps(summary, ensure_ascii=False, separators=(",", ":")), encoding="utf-8")
+    tmp.replace(path)
+    return path
+
+
+def parse_period(kind: str, period: Optional[str], today: Optional[date] = None) -> Tuple[str, date, date]:
+    """
+    ("2026-10" | "2026-Q4", first day, first day after) of a month/quarter; `period`
+    defaults to the one containing today. Raises ValueError on a malformed period.
+    """
+    today = today or datetime.now().astimezone().date()
+    if kind == "month":
+        if period:
+            y, m = period.split("-")
+            start = date(int(y), int(m), 1)
+        else:
+            start = today.replace(day=1)
+        end = date(start.year + start.month // 12, start.month % 12 + 1, 1)
+        return f"{start.year}-{start.month:02d}", start, end
+    if kind == "quarter":
+        if period:
+            y, q = period.upper().split("-Q")
+            quarter = int(q)
+            if not 1 <= quarter <= 4:
+                raise ValueError(f"invalid quarter: {period!r}")
+            year = int(y)
+        else:
+            year, quarter = today.year, (today.month - 1) // 3 + 1
+        start = date(year, 3 * quarter - 2, 1)
+        end = date(year + quarter // 4, (3 * quarter) % 12 + 1, 1)
+        return f"{year}-Q{quarter}", start, end
+    raise ValueError(f"unknown rollup kind: {kind!r}")
+
+
+def _iso_week(d: date) -> str:
+    y, w, _ = d.isocalendar()
+    return f"{y}-W{w:02d}"
+
+
+def build_rollup(state_dir: Path, kind: str, period: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Aggregate the stored weekly summaries whose week starts (Monday) in the period.
+    Reads nothing but .ops_state/summaries.
+    """
+    today = datetime.now().astimezone().date()
+    label, start, end = parse_period(kind, period, today)
+    mondays: List[date] = []
+    d = start + timedelta(days=(7 - start.weekday()) % 7)
+    while d < end:
+        mondays.append(d)
+        d += timedelta(days=7)
+
+    weeks: List[Dict[str, Any]] = []
+    notes: Dict[str, Dict[str, Any]] = {}
+    missing: List[str] = []
+    for monday in mondays:
+        week = _iso_week(monday)
+        summary = load_week_summary(summary_path(state_dir, week))
+        if summary is None:
+            if monday <= today:
+                missing.append(week)
+            continue
+        counts = {s: 0 for s in STATUS_BADGES}
+        added = removed = 0
+        for rel, item in sorted(summary["items"].items()):
+            counts[item["status"]] = counts.get(item["status"], 0) + 1
+            added += item.get("added") or 0
+            removed += item.get("removed") or 0
+            merged = _merge_item(notes.get(rel), item)
+            merged["weeks"] = [*(notes[rel]["weeks"] if rel in notes else []), week]
+            notes[rel] = merged
+        weeks.append({"week": week, "counts": counts, "added": added, "removed": removed})
+
+    totals = {s: 0 for s in STATUS_BADGES}
+    for item in notes.values():
+        totals[item["status"]] = totals.get(item["status"], 0) + 1
+    return {
+        "kind": kind,
+        "period": label,
+        "start": start.isoformat(),
+        "end": end.isoformat(),
+        "weeks": weeks,
+        "missing_weeks": missing,
+        "totals": {
+            "notes": totals,
+            "added": sum(w["added"] for w in weeks),
+            "removed": sum(w["removed"] for w in weeks),
+        },
+        "notes": notes,
+    }
+
+
+def _lines_changed(item: Dict[str, Any]) -> int:
+    return (item.get("added") or 0) + (item.get("removed") or 0)
+
+
+def render_rollup_markdown(rollup: Dict[str, Any], generated_at: str) -> str:
+    notes: Dict[str, Dict[str, Any]] = rollup["notes"]
+    statuses = list(STATUS_BADGES)
+    out: List[str] = [
+        f"# Ops Rollup {rollup['period']} ({rollup['kind']})",
+        "",
+        f"Generated: {generated_at}  ",
+        f"Period: {rollup['start']} ~ {rollup['end']} (weeks starting in the period)  ",
+        f"Weekly summaries: {len(rollup['weeks'])}"
+        + (f" (missing: {', '.join(rollup['missing_weeks'])})" if rollup["missing_weeks"] else ""),
+        "",
+        "## 1) Weeks",
+        "",
+        "| Week | " + " | ".join(s.capitalize() for s in statuses) + " | +Lines | -Lines |",
+        "|---|" + "---:|" * (len(statuses) + 2),
+    ]
+    for w in rollup["weeks"]:
+        cells = [str(w["counts"].get(s, 0)) for s in statuses] + [str(w["added"]), str(w["removed"])]
+        out.append(f"| {w['week']} | " + " | ".join(cells) + " |")
+    t = rollup["totals"]
+    cells = [str(t["notes"].get(s, 0)) for s in statuses] + [str(t["added"]), str(t["removed"])]
+    out.append("| **Distinct notes** | " + " | ".join(cells) + " |")
+
+    out += ["", f"## 2) Most changed notes (top {MOST_CHANGED_LISTED} by lines changed)", ""]
+    ranked = sorted(notes.items(), key=lambda kv: (-_lines_changed(kv[1]), kv[0]))
+    ranked = [(rel, it) for rel, it in ranked if _lines_changed(it) > 0][:MOST_CHANGED_LISTED]
+    for rel, it in ranked:
+        title = f" — **{it['title']}**" if it.get("title") else ""
+        out.append(
+            f"- `{rel}`{title}: +{it.get('added') or 0} / -{it.get('removed') or 0} lines "
+            f"in {len(it['weeks'])} week(s) ({', '.join(it['weeks'])})"
+        )
+    if not ranked:
+        out.append("- (none)")
+
+    out += ["", "## 3) All changed notes", ""]
+    for status in statuses:
+        group = sorted(rel for rel, it in notes.items() if it["status"] == status)
+        if not group:
+            continue
+        out.append(f"### {STATUS_BADGES[status]} ({len(group)})")
+        for rel in group:
+            origin = f" (from `{notes[rel]['renamed_from']}`)" if notes[rel].get("renamed_from") else ""
+            out.append(f"- `{rel}`{origin}")
+        out.append("")
+    if not notes:
+        out += ["- (none)", ""]
+
+    out += ["## 4) Top RAG evidence per note", ""]
+    with_evidence = [(rel, it["evidence"]) for rel, it in sorted(notes.items()) if it.get("evidence")]
+    for rel, ev in with_evidence:
+        score = f" (score={ev['score']:.4f})" if isinstance(ev.get("score"), (int, float)) else ""
+        src = f" — source: {ev['source']}" if ev.get("source") else ""
+        out.append(f"- `{rel}`{score}{src}")
+        if ev.get("snippet"):
+            out.append(f"  - {ev['snippet']}")
+    if not with_evidence:
+        out.append("- (no evidence recorded)")
+    return "\n".join(out).rstrip() + "\n"
+
+
+def write_rollup(
+    state_dir: Path,
+    reports_dir: Path,
+    kind: str,
+    period: Optional[str] = None,
+    markdown: bool = True,
+    json_output: bool = True,
+) -> Path:
+    """
+    reports/rollup-YYYY-MM.md (or rollup-YYYY-Qn.md) and/or its JSON twin.
+    Returns the written report (the JSON with markdown=False).
+    """
+    rollup = build_rollup(state_dir, kind, period)
+    generated_at = datetime.now().astimezone().isoformat(timespec="seconds")
+    path = reports_dir / f"rollup-{rollup['period']}.md"
+    reports_dir.mkdir(parents=True, exist_ok=True)
+    if markdown:
+        path.write_text(render_rollup_markdown(rollup, generated_at), encoding="utf-8")
+    if json_output:
+        data = {"generated_at": generated_at, **rollup}
+        tmp = path.with_suffix(".json.tmp")
+        tmp.write_text(json.dumps(data, ensure_ascii=False, indent=2), encoding="utf-8")
+        tmp.replace(path.with_suffix(".json"))
+    return path if markdown else path.with_suffix(".json")
@@ -0,0 +1,131 @@
+from __future__ import annotations
+
+import json
+import os
+import time
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from .state import _now_iso_local
+
+DEFAULT_LOCK_TIMEOUT_S = 900.0
+_POLL_S = 0.5
+# Windows locks byte ranges and a locked range can't be read by others, so lock a
+# byte far past the holder info instead of the start of the file
+_WIN_LOCK_OFFSET = 1 << 30
+
+if os.name == "nt":
+    import msvcrt
+
+    def _try_lock(fd: int) -> bool:
+        os.lseek(fd, _WIN_LOCK_OFFSET, os.SEEK_SET)
+        try:
+            msvcrt.locking(fd, msvcrt.LK_NBLCK, 1)
+            return True
+        except OSError:
+            return False
+
+    def _unlock(fd: int) -> None:
+        os.lseek(fd, _WIN_LOCK_OFFSET, os.SEEK_SET)
+        msvcrt.locking(fd, msvcrt.LK_UNLCK, 1)
+
+else:
+    import fcntl
+
+    def _try_lock(fd: int) -> bool:
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            return True
+        except OSError:
+            return False
+
+    def _unlock(fd: int) -> None:
+        fcntl.flock(fd, fcntl.LOCK_UN)
+
+
+class RunLockTimeout(RuntimeError):
+    pass
+
+
+class RunLock:
+    """
+    Cross-process advisory lock around state mutation:
+      .ops_state/run.lock
+
+    The OS releases the lock when the holder exits (even on a crash), so a stale
+    lock file is harmless. The file also records the holder's pid and start time
+    for log messages / --doctor.
+    """
+
+    def __init__(self, path: Path, timeout_s: float = DEFAULT_LOCK_TIMEOUT_S):
+        self.path = path
+        self.timeout_s = float(timeout_s)
+        self.waited = False  # True if another run held the lock when we asked
+        self._fd: Optional[int] = None
+
+    def holder(self) -> Dict[str, Any]:
+        try:
+            raw = json.loads(self.path.read_text(encoding="utf-8") or "{}")
+            return raw if isinstance(raw, dict) else {}
+        except Exception:
+            return {}
+
+    def is_held(self) -> bool:
+        # by another process (probe only; never blocks)
+        if self._fd is not None:
+            return False
+        if not self.path.exists():
+            return False
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT)
+        try:
+            if _try_lock(fd):
+                _unlock(fd)
+                return False
+            return True
+        finally:
+            os.close(fd)
+
+    def acquire(self, verbose: bool = False) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT)
+        deadline = time.monotonic() + self.timeout_s
+        while not _try_lock(fd):
+            if not self.waited:
+                self.waited = True
+                h = self.holder()
+                print(
+                    f"[INFO] another run is in progress (pid {h.get('pid', '?')}, "
+                    f"since {h.get('started_at', '?')}); waiting"
+                )
+            if time.monotonic() >= deadline:
+                os.close(fd)
+                raise RunLockTimeout(f"run lock still held after {self.timeout_s:g}s: {self.path}")
+            time.sleep(_POLL_S)
+        self._fd = fd
+
+        info = json.dumps({"pid": os.getpid(), "started_at": _now_iso_local()}).encode("utf-8")
+        try:
+            os.ftruncate(fd, 0)
+            os.lseek(fd, 0, os.SEEK_SET)
+            os.write(fd, info)
+        except OSError:
+            # best effort (diagnostics only)
+            pass
+        if verbose and self.waited:
+            print("[INFO] run lock acquired")
+
+    def release(self) -> None:
+        if self._fd is None:
+            return
+        try:
+            _unlock(self._fd)
+        finally:
+            os.close(self._fd)
+            self._fd = None
+
+    def __enter__(self) -> "RunLock":
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc: object) -> None:
+        self.release()
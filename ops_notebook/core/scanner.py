@@ -1,67 +1,249 @@
-from dataclasses import dataclass
+import fnmatch
+import os
+import posixpath
+from dataclasses import dataclass, field
 from pathlib import Path
-from typing import List
+from typing import Collection, Dict, Iterator, List, Sequence, Tuple
 
-from .constants import SUPPORTED_SUFFIXES, to_posix_relpath
-from .hashing import sha256_file
+from .constants import SUPPORTED_SUFFIXES
+from .hashing import (
+    FINGERPRINT_ALGORITHMS,
+    AppendFingerprint,
+    append_fingerprint_file,
+    fingerprint_file,
+    fingerprint_file_multi,
+)
 from .state import FileState, StateStore, _now_iso_local
+from .throttle import IoThrottle
+from .weekly import WeekWindow, is_within_window
 
+# stable ordering: changed first, then others
+STATUS_ORDER = {"changed": 0, "renamed": 1, "new": 2, "deleted": 3, "unchanged": 4}
 
-@dataclass
+# statuses worth reporting (everything except "unchanged")
+CHANGE_STATUSES = frozenset({"changed", "new", "deleted", "renamed"})
+
+
+@dataclass(slots=True)
 class ScanItem:
     relpath: str
     abspath: Path | None
-    status: str     # "unchanged" | "changed" | "new" | "deleted"
+    status: str     # "unchanged" | "changed" | "new" | "deleted" | "renamed" (git backend)
     sha256: str | None
     size: int | None
     mtime_epoch: float | None
     last_changed_at: str | None
+    renamed_from: str | None = None
+    # append-only fast path: the note only grew; old size (bytes) and old line count
+    append_from: int | None = None
+    append_lines: int | None = None
+    # fingerprint at the last run, for changed notes (cached metadata of the old text)
+    prev_sha256: str | None = None
 
 
-def iter_note_files(notes_dir: Path) -> List[Path]:
+@dataclass(slots=True)
+class ScanStats:
+    # filled in by the scan regardless of which items are yielded (run metrics)
+    files: int = 0
+    bytes_hashed: int = 0
+    counts: Dict[str, int] = field(default_factory=dict)
+
+    def count(self, status: str) -> None:
+        self.counts[status] = self.counts.get(status, 0) + 1
+
+
+@dataclass(frozen=True)
+class ScanScope:
+    """
+    Subset of the notebook for a partial run: subtrees (`paths`, relative to notes_dir)
+    and/or fnmatch-style globs on the posix relpath (`globs`; `*` also crosses `/`).
+    A note is in scope if it matches any of them.
+    """
+
+    paths: Tuple[str, ...] = ()
+    globs: Tuple[str, ...] = ()
+
+    @classmethod
+    def from_args(cls, paths: Sequence[str] = (), globs: Sequence[str] = ()) -> "ScanScope | None":
+        norm = tuple(posixpath.normpath(p.strip().replace("\\", "/")).strip("/") for p in paths)
+        norm = tuple(p for p in norm if p and p != ".")
+        if not norm and not globs:
+            return None
+        return cls(paths=norm, globs=tuple(globs))
+
+    def contains(self, relpath: str) -> bool:
+        for p in self.paths:
+            if relpath == p or relpath.startswith(p + "/"):
+                return True
+        return any(fnmatch.fnmatchcase(relpath, g) for g in self.globs)
+
+    def describe(self) -> str:
+        return ", ".join([f"{p}/" for p in self.paths] + list(self.globs))
+
+
+def walk_note_files(notes_dir: Path, scope: "ScanScope | None" = None) -> Iterator[Tuple[str, Path]]:
+    """
+    Yields (posix relpath, path) for every note, in sorted path order, without
+    materializing the whole tree. With a path-only scope only those subtrees are walked.
+    """
     if not notes_dir.exists():
-        return []
-    files: List[Path] = []
-    for p in notes_dir.rglob("*"):
-        if p.is_file() and p.suffix.lower() in SUPPORTED_SUFFIXES:
-            files.append(p)
-    return sorted(files)
+        return
 
+    def _walk(d: Path, prefix: str) -> Iterator[Tuple[str, Path]]:
+        try:
+            with os.scandir(d) as it:
+                entries = sorted(it, key=lambda e: e.name)
+        except OSError:
+            return
+        for e in entries:
+            rel = prefix + e.name
+            if e.is_dir():
+                yield from _walk(Path(e.path), rel + "/")
+            elif e.is_file() and os.path.splitext(e.name)[1].lower() in SUPPORTED_SUFFIXES:
+                yield rel, Path(e.path)
 
-def scan(notes_dir: Path, store: StateStore) -> List[ScanItem]:
+    if scope is None:
+        yield from _walk(notes_dir, "")
+        return
+    if scope.globs:
+        # globs can match anywhere: walk everything, filter
+        for rel, f in _walk(notes_dir, ""):
+            if scope.contains(rel):
+                yield rel, f
+        return
+    for sub in sorted(set(scope.paths)):
+        root = notes_dir / sub
+        if root.is_dir():
+            yield from _walk(root, sub + "/")
+        elif root.is_file() and root.suffix.lower() in SUPPORTED_SUFFIXES:
+            yield sub, root
+
+
+def iter_note_files(notes_dir: Path) -> List[Path]:
+    return [p for _, p in walk_note_files(notes_dir)]
+
+
+def tree_matches_state(notes_dir: Path, store: StateStore) -> bool:
     """
-    Compare current fingerprints with stored fingerprints.
+    Cheap "anything to do?" check (stat only, nothing is read): True if every note's
+    size/mtime equals the state and no note was added or removed.
+    """
+    seen = 0
+    for rel, f in walk_note_files(notes_dir):
+        prev = store.get(rel)
+        if prev is None or prev.sha256 is None:
+            return False
+        try:
+            st = f.stat()
+        except OSError:
+            return False
+        if prev.size != st.st_size or prev.mtime_epoch != float(st.st_mtime):
+            return False
+        seen += 1
+    live = 0
+    for rel in store.all_relpaths():
+        fs = store.get(rel)
+        if fs is not None and fs.sha256 is not None:
+            live += 1
+    return live == seen
+
+
+def is_wanted(
+    item: ScanItem,
+    statuses: Collection[str] | None = None,
+    window: WeekWindow | None = None,
+) -> bool:
+    if statuses is not None and item.status not in statuses:
+        return False
+    if window is not None and not is_within_window(item.last_changed_at, window):
+        return False
+    return True
+
+
+def iter_scan(
+    notes_dir: Path,
+    store: StateStore,
+    statuses: Collection[str] | None = None,
+    window: WeekWindow | None = None,
+    algorithm: str | None = None,
+    stats: ScanStats | None = None,
+    scope: ScanScope | None = None,
+    throttle: IoThrottle | None = None,
+    append_only: bool = False,
+) -> Iterator[ScanItem]:
+    """
+    Streaming scan: yields items as they are fingerprinted (path order, deletions last).
+
+    Every note is still fingerprinted and its state entry updated, but only items
+    matching `statuses` / `window` (on last_changed_at) are yielded, so callers that
+    only care about e.g. this week's changes hold memory proportional to the change set.
+
+    `algorithm` defaults to the one recorded in the state. When it differs, each note
+    is hashed with both algorithms in one read pass: the old digest decides the status
+    and the new one is stored, so switching algorithms doesn't report every note as
+    changed (see `store.migrations`).
+
+    With a `scope`, only notes in scope are fingerprinted and only those can be
+    reported deleted; all other state entries are left untouched. Scoped scans keep the
+    state's algorithm (a partial migration would mix digests).
+    A `throttle` paces the bytes read for fingerprints (scan.io_limit / --nice).
+    `append_only` (scan.append_only): a note whose old content is an unchanged prefix
+    of the current one is marked (`append_from`) for the append fast path.
     Updates store entries (but does NOT save to disk; caller saves).
     """
     now = _now_iso_local()
-    
-    existing_files = iter_note_files(notes_dir)
     seen: set[str] = set()
-    
-    results: List[ScanItem] = []
-    
-    for f in existing_files:
-        rel = to_posix_relpath(f, notes_dir)
+    old_algorithm = store.algorithm
+    algorithm = old_algorithm if scope is not None else (algorithm or old_algorithm)
+    migrating = algorithm != old_algorithm and old_algorithm in FINGERPRINT_ALGORITHMS
+
+    for rel, f in walk_note_files(notes_dir, scope):
         seen.add(rel)
-        
-        sha = sha256_file(f)
+
+        prev = store.get(rel)
+        prev_sha = prev.sha256 if prev is not None else None
+        appended: AppendFingerprint | None = None
+        bytes_read: int | None = None
+        if migrating and prev_sha is not None:
+            fps = fingerprint_file_multi(f, (old_algorithm, algorithm))
+            sha = fps[algorithm]
+            if fps[old_algorithm] == prev_sha:
+                store.migrations[rel] = (prev_sha, sha)
+                prev_sha = sha
+        else:
+            af = None
+            if append_only and prev is not None and prev_sha and prev.size:
+                # a note that only grew is diffed/snapshotted from its appended bytes
+                af = append_fingerprint_file(f, algorithm, int(prev.size), prev_sha)
+            if af is not None:
+                sha, bytes_read = af.digest, af.bytes_read
+                appended = af if af.appended_from is not None else None
+            else:
+                sha = fingerprint_file(f, algorithm)
         st = f.stat()
         size = int(st.st_size)
         mtime_epoch = float(st.st_mtime)
-        
-        prev = store.get(rel)
-        
+
         if prev is None:
             status = "new"
             last_changed_at = now
         else:
-            if prev.sha256 == sha:
+            if prev_sha == sha:
                 status = "unchanged"
                 last_changed_at = prev.last_changed_at
             else:
                 status = "changed"
                 last_changed_at = now
-        
+
+        if bytes_read is None:
+            bytes_read = size
+        if stats is not None:
+            stats.files += 1
+            stats.bytes_hashed += bytes_read
+            stats.count(status)
+        if throttle is not None:
+            throttle.consume(bytes_read)
+
         # update state
         store.set(
             rel,
@@ -73,55 +255,73 @@ def scan(notes_dir: Path, store: StateStore) -> List[ScanItem]:
                 last_scanned_at=now,
             ),
         )
-        
-        results.append(
-            ScanItem(
-                relpath=rel,
-                abspath=f,
-                status=status,
-                sha256=sha,
-                size=size,
-                mtime_epoch=mtime_epoch,
-                last_changed_at=last_changed_at,
-            )
+
+        item = ScanItem(
+            relpath=rel,
+            abspath=f,
+            status=status,
+            sha256=sha,
+            size=size,
+            mtime_epoch=mtime_epoch,
+            last_changed_at=last_changed_at,
+            prev_sha256=prev_sha if status == "changed" else None,
         )
-    
+        if appended is not None and status == "changed":
+            item.append_from = appended.appended_from
+            item.append_lines = appended.old_lines
+        if is_wanted(item, statuses, window):
+            yield item
+
     # detect deletions
     for rel in store.all_relpaths():
-        if rel not in seen:
-            prev = store.get(rel)
-            # already deleted state? keep as-is, but don't spam weekly report forever:
-            # still mark deleted "changed_at" only when first time we notice deletion
-            if prev and prev.sha256 is None:
-                # already known deleted
-                results.append(
-                    ScanItem(
-                        relpath=rel,
-                        abspath=None,
-                        status="deleted",
-                        sha256=None,
-                        size=None,
-                        mtime_epoch=None,
-                        last_changed_at=prev.last_changed_at,
-                    )
-                )
-                continue
-            
+        if rel in seen or (scope is not None and not scope.contains(rel)):
+            continue
+        prev = store.get(rel)
+        # already deleted state? keep as-is, but don't spam weekly report forever:
+        # still mark deleted "changed_at" only when first time we notice deletion
+        newly_deleted = prev is None or prev.sha256 is not None
+        if newly_deleted:
             store.mark_deleted(rel)
-            prev2 = store.get(rel)
-            results.append(
-                ScanItem(
-                    relpath=rel,
-                    abspath=None,
-                    status="deleted",
-                    sha256=None,
-                    size=None,
-                    mtime_epoch=None,
-                    last_changed_at=prev2.last_changed_at if prev2 else now,
-                )
-            )
-    
-    # stable ordering: changed first, then others
-    order = {"changed": 0, "new": 1, "deleted": 2, "unchanged": 3}
-    results.sort(key=lambda x: (order.get(x.status, 9), x.relpath))
-    return results
\ No newline at end of file
+            prev = store.get(rel)
+
+        item = ScanItem(
+            relpath=rel,
+            abspath=None,
+            status="deleted",
+            sha256=None,
+            size=None,
+            mtime_epoch=None,
+            last_changed_at=prev.last_changed_at if prev else now,
+        )
+        if stats is not None and newly_deleted:
+            stats.count("deleted")
+        if is_wanted(item, statuses, window):
+            yield item
+
+    store.set_algorithm(algorithm)
+
+
+def scan(
+    notes_dir: Path,
+    store: StateStore,
+    algorithm: str | None = None,
+    scope: ScanScope | None = None,
+) -> List[ScanItem]:
+    """
+    Compare current fingerprints with stored fingerprints.
+    Updates store entries (but does NOT save to disk; caller saves).
+    """
+    results = list(iter_scan(notes_dir, store, algorithm=algorithm, scope=scope))
+    results.sort(key=scan_order_key)
+    return results
+
+
+def scan_order_key(item: ScanItem) -> tuple[int, str]:
+    return (STATUS_ORDER.get(item.status, 9), item.relpath)
+
+
+def is_this_week_candidate(it: ScanItem, week: WeekWindow) -> bool:
+    # changed/new/deleted/renamed that happened within current week window
+    if it.status not in CHANGE_STATUSES:
+        return False
+    return is_within_window(it.last_changed_at, week)
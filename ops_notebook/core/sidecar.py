@@ -0,0 +1,121 @@
+from __future__ import annotations
+
+import json
+from pathlib import Path
+from typing import Any, Dict, List, Tuple
+
+from .state import StateStore
+
+
+def live_fingerprints(store: StateStore) -> Dict[str, str]:
+    # relpath -> fingerprint of every note in the (already scanned) state
+    live: Dict[str, str] = {}
+    for rel in store.all_relpaths():
+        fs = store.get(rel)
+        if fs is not None and fs.sha256:
+            live[rel] = fs.sha256
+    return live
+
+
+def _entry_sha(entry: Any) -> str | None:
+    # entries are {"sha": ..., ...} or just the fingerprint
+    if isinstance(entry, dict):
+        return entry.get("sha")
+    return entry if isinstance(entry, str) else None
+
+
+class NoteSidecar:
+    """
+    Base for per-note caches kept next to the state in .ops_state (local index, near-dup
+    signatures, RAG ingest record): a JSON file whose `section` maps relpath -> entry
+    built from the note's fingerprint.
+
+    `stale()` compares the entries with the (already scanned) state, so each run only
+    reads the notes whose fingerprint changed. Subclasses implement `update()` /
+    `remove()` to use `sync()`.
+    """
+
+    section = "docs"
+    # files of another version are dropped and rebuilt by the next sync
+    version = 1
+
+    def __init__(self, path: Path):
+        self.path = path
+        self.data: Dict[str, Any] = self._empty()
+        self._dirty = False
+
+    @classmethod
+    def _empty(cls) -> Dict[str, Any]:
+        return {"version": cls.version, cls.section: {}}
+
+    def load(self) -> None:
+        if not self.path.exists():
+            return
+        try:
+            loaded = json.loads(self.path.read_text(encoding="utf-8"))
+            if (
+                isinstance(loaded, dict)
+                and loaded.get("version", 1) == self.version
+                and isinstance(loaded.get(self.section), dict)
+            ):
+                self.data = loaded
+        except Exception:
+            # rebuilt by the next sync
+            self.data = self._empty()
+
+    def save(self) -> None:
+        if not self._dirty:
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_suffix(self.path.suffix + ".tmp")
+        tmp.write_text(json.dumps(self.data, ensure_ascii=False), encoding="utf-8")
+        tmp.replace(self.path)
+        self._dirty = False
+
+    def __len__(self) -> int:
+        return len(self.data.get(self.section, {}))
+
+    def stale(self, store: StateStore) -> Tuple[List[Tuple[str, str]], List[str]]:
+        """
+        ([(relpath, fingerprint) without an entry for that fingerprint], [relpaths
+        gone from the state]), path order. Entries of notes whose fingerprint algorithm
+        switched (content unchanged) are re-keyed instead.
+        """
+        live = live_fingerprints(store)
+        entries: Dict[str, Any] = self.data[self.section]
+        for rel, (old_sha, new_sha) in store.migrations.items():
+            entry = entries.get(rel)
+            if entry is None or _entry_sha(entry) != old_sha:
+                continue
+            if isinstance(entry, dict):
+                entry["sha"] = new_sha
+            else:
+                entries[rel] = new_sha
+            self._dirty = True
+        changed = sorted((rel, sha) for rel, sha in live.items() if _entry_sha(entries.get(rel)) != sha)
+        gone = sorted(rel for rel in entries if rel not in live)
+        return changed, gone
+
+    def update(self, relpath: str, sha: str, text: str) -> None:
+        raise NotImplementedError
+
+    def remove(self, relpath: str) -> None:
+        raise NotImplementedError
+
+    def sync(self, notes_dir: Path, store: StateStore) -> int:
+        """
+        Bring the entries in line with the state: rebuild notes whose fingerprint
+        changed, drop notes that are gone. Returns the number of notes read.
+        """
+        changed, gone = self.stale(store)
+        for rel in gone:
+            self.remove(rel)
+        read = 0
+        for rel, sha in changed:
+            try:
+                text = (notes_dir / rel).read_text(encoding="utf-8", errors="replace")
+            except OSError:
+                continue
+            self.update(rel, sha, text)
+            read += 1
+        return read
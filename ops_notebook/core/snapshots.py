@@ -1,9 +1,23 @@
 from __future__ import annotations
 
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import replace
 from pathlib import Path
+from typing import Iterable, List, Optional, Tuple
+
+from .derived import DerivedCache
+from .git_backend import GitSnapshots
+from .render import RenderJob, derive_meta
+from .scanner import ScanItem
+from .throttle import IoThrottle
 
 # 너무 큰 노트가 있어도 운영룰이 죽지 않도록 안전장치
 MAX_SNAPSHOT_CHARS = 200_000
+TRUNCATED_MARKER = "\n\n... (snapshot truncated)\n"
+
+# write_snapshots() threads for the async pipeline
+SNAPSHOT_WORKERS = 2
 
 
 class SnapshotStore:
@@ -12,16 +26,30 @@ class SnapshotStore:
       .ops_state/snapshots/<relpath>
     
     This allows generating diffs between previous and current runs.
+    Writes are paced by an optional `throttle` (scan.io_limit / --nice) and counted in
+    `bytes_written` (run metrics).
     """
     
-    def __init__(self, root_dir: Path):
+    writes_snapshots = True
+    
+    def __init__(self, root_dir: Path, throttle: Optional[IoThrottle] = None):
         self.root_dir = root_dir
+        self.throttle = throttle
+        self.bytes_written = 0
+        self._lock = threading.Lock()  # snapshot writers may run in several threads
+    
+    def _wrote(self, n: int) -> None:
+        with self._lock:
+            self.bytes_written += n
     
     def _path_for(self, relpath: str) -> Path:
         # relpath is POSIX-like (scanner produces /). Path() will handle it on Windows too.
         p = self.root_dir / Path(relpath)
         return p
     
+    def exists(self, relpath: str) -> bool:
+        return self._path_for(relpath).exists()
+    
     def load_text(self, relpath: str) -> str | None:
         p = self._path_for(relpath)
         if not p.exists():
@@ -38,11 +66,45 @@ class SnapshotStore:
         p.parent.mkdir(parents=True, exist_ok=True)
         
         if len(text) > MAX_SNAPSHOT_CHARS:
-            text = text[:MAX_SNAPSHOT_CHARS] + "\n\n... (snapshot truncated)\n"
+            text = text[:MAX_SNAPSHOT_CHARS] + TRUNCATED_MARKER
         
+        data = text.encode("utf-8")
+        if self.throttle is not None:
+            self.throttle.consume(len(data))
         tmp = p.with_suffix(p.suffix + ".tmp")
-        tmp.write_text(text, encoding="utf-8")
+        tmp.write_bytes(data)
         tmp.replace(p)
+        self._wrote(len(data))
+    
+    def append_text(self, relpath: str, text: str) -> bool:
+        """
+        Append-only notes: extend the snapshot instead of rewriting it. False when the
+        caller has to save the full text instead (no snapshot yet, or the append would
+        cross MAX_SNAPSHOT_CHARS).
+        """
+        p = self._path_for(relpath)
+        try:
+            size = p.stat().st_size
+        except OSError:
+            return False
+        marker = TRUNCATED_MARKER.encode("utf-8")
+        if size >= MAX_SNAPSHOT_CHARS + len(TRUNCATED_MARKER):
+            with p.open("rb") as f:
+                f.seek(size - len(marker))
+                # already cut at the limit: appended text wouldn't be kept anyway
+                if f.read() == marker:
+                    return True
+        # the limit is in characters, like save_text(); the byte size bounds the
+        # snapshot's character count from above, so only a sure fit is appended
+        if size + len(text) > MAX_SNAPSHOT_CHARS:
+            return False
+        data = text.encode("utf-8")
+        if self.throttle is not None:
+            self.throttle.consume(len(data))
+        with p.open("ab") as f:
+            f.write(data)
+        self._wrote(len(data))
+        return True
     
     def delete(self, relpath: str) -> None:
         p = self._path_for(relpath)
@@ -51,4 +113,175 @@ class SnapshotStore:
                 p.unlink()
         except Exception:
             # best effort
-            pass
\ No newline at end of file
+            pass
+
+
+def read_text_safe(path: Path) -> str:
+    try:
+        return path.read_text(encoding="utf-8")
+    except UnicodeDecodeError:
+        # fallback
+        return path.read_text(encoding="utf-8", errors="replace")
+
+
+# append-only notes: bytes read from the start for title/preview/RAG query
+APPEND_HEAD_BYTES = 64 * 1024
+DIFF_CONTEXT_LINES = 3
+
+
+def _decode_text(data: bytes) -> str:
+    # like read_text_safe on a byte range (universal newlines)
+    return data.decode("utf-8", errors="replace").replace("\r\n", "\n").replace("\r", "\n")
+
+
+def _read_appended(path: Path, offset: int) -> str:
+    with path.open("rb") as f:
+        f.seek(offset)
+        return _decode_text(f.read())
+
+
+def _read_append_parts(path: Path, offset: int) -> Tuple[str, List[str], str]:
+    """
+    (head, context lines before `offset`, appended text) of an append-only note,
+    reading only the head, a few lines before the append and the appended bytes.
+    """
+    with path.open("rb") as f:
+        head = f.read(APPEND_HEAD_BYTES)
+        back = 4096
+        while True:
+            start = max(0, offset - back)
+            f.seek(start)
+            before = f.read(offset - start)
+            if start == 0 or before.count(b"\n") > DIFF_CONTEXT_LINES:
+                break
+            back *= 4
+        f.seek(offset)
+        appended = f.read()
+    lines = _decode_text(before).splitlines()
+    if start > 0:
+        # the first line may start before the window
+        lines = lines[1:]
+    return _decode_text(head), lines[-DIFF_CONTEXT_LINES:], _decode_text(appended)
+
+
+def write_snapshot(
+    snapshots: SnapshotStore | GitSnapshots, it: ScanItem, job: Optional[RenderJob] = None
+) -> None:
+    if it.abspath is None or it.status == "deleted":
+        snapshots.delete(it.relpath)
+        return
+    try:
+        if it.append_from is not None and isinstance(snapshots, SnapshotStore):
+            appended = job.appended_text if job is not None else None
+            if appended is None:
+                appended = _read_appended(it.abspath, it.append_from)
+            if snapshots.append_text(it.relpath, appended):
+                return
+        full = job.new_text if job is not None and job.texts_loaded and job.appended_text is None else None
+        snapshots.save_text(it.relpath, full if full is not None else read_text_safe(it.abspath))
+    except Exception:
+        # best effort
+        pass
+
+
+def load_render_job(
+    it: ScanItem,
+    snapshots: SnapshotStore | GitSnapshots,
+    markdown: bool = True,
+    derived: Optional[DerivedCache] = None,
+    lazy: bool = False,
+) -> RenderJob:
+    """
+    `lazy` (report budget): the old snapshot is not read, and with both the old and
+    the new metadata cached neither is the note; load_render_texts() completes the job
+    if its diff gets rendered.
+    """
+    if it.status == "deleted" or it.abspath is None:
+        return RenderJob(relpath=it.relpath, status="deleted", old_text="", new_text="", markdown=markdown)
+    if it.append_from is not None and it.append_lines is not None:
+        # append-only: neither the old snapshot nor the whole note is read
+        head, context, appended = _read_append_parts(it.abspath, it.append_from)
+        return RenderJob(
+            relpath=it.relpath,
+            status=it.status,
+            old_text="",
+            new_text=head,
+            markdown=markdown,
+            appended_text=appended,
+            append_context=tuple(context),
+            append_old_lines=it.append_lines,
+            meta=derive_meta(head, complete=False),
+        )
+    meta = derived.get(it.sha256) if derived is not None else None
+    old_meta = derived.get(it.prev_sha256) if lazy and derived is not None and it.prev_sha256 else None
+    if old_meta is not None and old_meta.lines is not None:
+        new_text = ""
+        if meta is None:
+            new_text = read_text_safe(it.abspath)
+            meta = derive_meta(new_text)
+            derived.put(it.sha256, meta)
+        return RenderJob(
+            relpath=it.relpath,
+            status=it.status,
+            old_text="",
+            new_text=new_text,
+            renamed_from=it.renamed_from,
+            markdown=markdown,
+            meta=meta,
+            texts_loaded=False,
+            old_lines=old_meta.lines,
+        )
+    new_text = read_text_safe(it.abspath)
+    if meta is None:
+        meta = derive_meta(new_text)
+        if derived is not None:
+            derived.put(it.sha256, meta)
+    return RenderJob(
+        relpath=it.relpath,
+        status=it.status,
+        old_text=snapshots.load_text(it.relpath) or "",
+        new_text=new_text,
+        renamed_from=it.renamed_from,
+        markdown=markdown,
+        meta=meta,
+    )
+
+
+def load_render_jobs(
+    items: List[ScanItem],
+    snapshots: SnapshotStore | GitSnapshots,
+    markdown: bool = True,
+    derived: Optional[DerivedCache] = None,
+    lazy: bool = False,
+) -> List[RenderJob]:
+    return [load_render_job(it, snapshots, markdown, derived, lazy) for it in items]
+
+
+def load_render_texts(
+    job: RenderJob, it: ScanItem, snapshots: SnapshotStore | GitSnapshots
+) -> RenderJob:
+    # the texts of a lazy job, once its diff is going to be rendered
+    if job.texts_loaded or it.abspath is None:
+        return job
+    new_text = job.new_text or read_text_safe(it.abspath)
+    return replace(job, old_text=snapshots.load_text(it.relpath) or "", new_text=new_text, texts_loaded=True)
+
+
+def write_snapshots(
+    snapshots: SnapshotStore | GitSnapshots,
+    entries: Iterable[Tuple[ScanItem, Optional[RenderJob]]],
+    workers: int = 1,
+) -> None:
+    """
+    Snapshot writes of a run, once its report is written (the diffs need the previous
+    snapshots until then). `workers` > 1 writes from a small thread pool.
+    """
+    if not snapshots.writes_snapshots:
+        return
+    if workers <= 1:
+        for it, job in entries:
+            write_snapshot(snapshots, it, job)
+        return
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for _ in pool.map(lambda e: write_snapshot(snapshots, *e), entries):
+            pass
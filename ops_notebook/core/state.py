@@ -2,9 +2,10 @@ import json
 from dataclasses import dataclass
 from datetime import datetime
 from pathlib import Path
-from typing import Any, Dict, Optional
+from typing import Any, Dict, Optional, Tuple
 
 from .constants import DEFAULT_STATE_VERSION
+from .hashing import DEFAULT_FINGERPRINT
 
 
 def _now_iso_local() -> str:
@@ -12,7 +13,7 @@ def _now_iso_local() -> str:
     return datetime.now().astimezone().isoformat(timespec="seconds")
 
 
-@dataclass
+@dataclass(slots=True)
 class FileState:
     sha256: Optional[str]
     size: Optional[int]
@@ -27,9 +28,20 @@ class StateStore:
         self.state_path = state_path
         self.data: Dict[str, Any] = {
             "version": DEFAULT_STATE_VERSION,
+            "fingerprint": DEFAULT_FINGERPRINT,
             "files": {},    # relpath -> file state dict
             "last_run_at": None,
         }
+        # runtime only: relpath -> (old digest, new digest) for entries re-fingerprinted
+        # by an algorithm change during this run (so digest-keyed caches can follow)
+        self.migrations: Dict[str, Tuple[str, str]] = {}
+    
+    @property
+    def algorithm(self) -> str:
+        return str(self.data.get("fingerprint") or DEFAULT_FINGERPRINT)
+    
+    def set_algorithm(self, algorithm: str) -> None:
+        self.data["fingerprint"] = algorithm
     
     def load(self) -> None:
         if not self.state_path.exists():
@@ -42,9 +54,16 @@ class StateStore:
             # if corrupted, don't crash ops. start fresh.
             self.data = {
                 "version": DEFAULT_STATE_VERSION,
+                "fingerprint": DEFAULT_FINGERPRINT,
                 "files": {},
                 "last_run_at": None,
             }
+            return
+        
+        # v1 -> v2: digests were always sha256
+        if int(self.data.get("version") or 1) < 2:
+            self.data.setdefault("fingerprint", "sha256")
+            self.data["version"] = DEFAULT_STATE_VERSION
     
     def save(self) -> None:
         self.data["last_run_at"] = _now_iso_local()
@@ -65,13 +84,14 @@ class StateStore:
         )
     
     def set(self, relpath: str, fs: FileState) -> None:
-        self.data.setdefault("files", {})[relpath] = {
+        entry: Dict[str, Any] = {
             "sha256": fs.sha256,
             "size": fs.size,
             "mtime_epoch": fs.mtime_epoch,
             "last_changed_at": fs.last_changed_at,
             "last_scanned_at": fs.last_scanned_at,
         }
+        self.data.setdefault("files", {})[relpath] = entry
     
     def mark_deleted(self, relpath: str) -> None:
         prev = self.get(relpath)
@@ -86,6 +106,9 @@ class StateStore:
         prev.last_changed_at = now
         self.set(relpath, prev)
     
+    def remove(self, relpath: str) -> None:
+        self.data.get("files", {}).pop(relpath, None)
+    
     def all_relpaths(self) -> list[str]:
         files = self.data.get("files", {})
         if not isinstance(files, dict):
@@ -0,0 +1,113 @@
+from __future__ import annotations
+
+import os
+import shutil
+import subprocess
+import threading
+import time
+from typing import List
+
+# --nice without scan.io_limit
+NICE_IO_LIMIT = 20 * 1024 * 1024
+# bucket size: a run reading less than this never waits, so small notebooks and
+# incremental runs keep their speed; cold scans / mass snapshot rewrites are paced
+DEFAULT_BURST_BYTES = 64 * 1024 * 1024
+# the longest single wait; bigger debts are paid in several sleeps
+MAX_SLEEP_S = 1.0
+
+_SIZE_UNITS = {"": 1, "K": 1024, "M": 1024**2, "G": 1024**3}
+
+
+def parse_rate(value: object) -> int:
+    """
+    Bytes/second from config/CLI: 20971520, "20M", "512K", "20MB/s". 0 = unlimited.
+    """
+    if value is None or value is False:
+        return 0
+    if isinstance(value, (int, float)):
+        return max(0, int(value))
+    s = str(value).strip().upper().removesuffix("/S").removesuffix("B")
+    if not s:
+        return 0
+    unit = s[-1] if s[-1] in _SIZE_UNITS else ""
+    number = s[: -len(unit)] if unit else s
+    try:
+        return max(0, int(float(number) * _SIZE_UNITS[unit]))
+    except ValueError:
+        raise ValueError(f"invalid I/O rate: {value!r}") from None
+
+
+class IoThrottle:
+    """
+    Token bucket over bytes read while hashing and written to snapshots.
+    Thread-safe (the async pipeline writes snapshots from several threads).
+    `waited_s` is the time added by throttling.
+    """
+
+    def __init__(self, bytes_per_s: int, burst_bytes: int = DEFAULT_BURST_BYTES):
+        self.bytes_per_s = bytes_per_s
+        self.burst_bytes = max(burst_bytes, bytes_per_s)
+        self.waited_s = 0.0
+        self.bytes = 0
+        self._tokens = float(self.burst_bytes)
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def consume(self, n: int) -> None:
+        if n <= 0:
+            return
+        with self._lock:
+            self.bytes += n
+            now = time.monotonic()
+            self._tokens = min(self.burst_bytes, self._tokens + (now - self._last) * self.bytes_per_s)
+            self._last = now
+            self._tokens -= n
+            debt = -self._tokens
+            # waiting under the lock is the point: other readers/writers queue behind
+            while debt > 0:
+                pause = min(MAX_SLEEP_S, debt / self.bytes_per_s)
+                time.sleep(pause)
+                self.waited_s += pause
+                now = time.monotonic()
+                self._tokens = min(self.burst_bytes, self._tokens + (now - self._last) * self.bytes_per_s)
+                self._last = now
+                debt = -self._tokens
+
+
+def lower_priority() -> List[str]:
+    """
+    Lowers this process' CPU and I/O scheduling priority where the OS allows it
+    (best effort; children such as git inherit it). Returns what was applied.
+    """
+    applied: List[str] = []
+    if os.name == "nt":
+        try:
+            import ctypes
+
+            # background mode: low CPU, I/O and memory priority for the process
+            process_mode_background_begin = 0x00100000
+            kernel32 = ctypes.windll.kernel32  # type: ignore[attr-defined]
+            if kernel32.SetPriorityClass(kernel32.GetCurrentProcess(), process_mode_background_begin):
+                applied.append("background mode")
+        except Exception:
+            pass
+        return applied
+    try:
+        os.nice(10)
+        applied.append("nice +10")
+    except (AttributeError, OSError):
+        pass
+    ionice = shutil.which("ionice")
+    if ionice:
+        try:
+            # best-effort class, lowest level (idle class could starve on a busy host)
+            r = subprocess.run(
+                [ionice, "-c", "2", "-n", "7", "-p", str(os.getpid())],
+                capture_output=True,
+                timeout=5,
+            )
+            if r.returncode == 0:
+                applied.append("ionice best-effort/7")
+        except (OSError, subprocess.SubprocessError):
+            pass
+    return applied
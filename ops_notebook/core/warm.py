@@ -0,0 +1,144 @@
+from __future__ import annotations
+
+import copy
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import List, Optional
+
+import requests
+
+from .derived import DERIVED_FILENAME, DerivedCache
+from .rag_cache import RagCache
+from .rag_client import RagClient
+from .rag_ingest import DEFAULT_INGEST_BATCH_SIZE, INGEST_FILENAME, RagIngest, push_changes
+from .rag_phase import DEFAULT_RAG_BUDGET_S, DEFAULT_RAG_MAX_FAILURES, RagPhase
+from .render import build_rag_query, derive_meta
+from .run_lock import DEFAULT_LOCK_TIMEOUT_S, RunLock
+from .scanner import CHANGE_STATUSES, ScanItem, iter_scan
+from .snapshots import read_text_safe
+from .state import StateStore
+
+WARM_STATE_FILENAME = "rag_warm_state.json"
+DEFAULT_WARM_CONCURRENCY = 1
+
+
+def warm_rag_cache(
+    notes_dir: Path,
+    state_path: Path,
+    rag_url: str,
+    rag_top_k: int,
+    rag_timeout_s: float = 12,
+    concurrency: int = DEFAULT_WARM_CONCURRENCY,
+    rag_budget_s: float = DEFAULT_RAG_BUDGET_S,
+    rag_max_failures: int = DEFAULT_RAG_MAX_FAILURES,
+    lock_timeout_s: float = DEFAULT_LOCK_TIMEOUT_S,
+    verbose: bool = False,
+    rag_session: Optional[requests.Session] = None,
+    rag_cache: Optional[RagCache] = None,
+    rag_namespace: str = "",
+    ingest_url: str = "",
+    ingest_batch_size: int = DEFAULT_INGEST_BATCH_SIZE,
+) -> int:
+    """
+    Pre-fill .ops_state/rag_cache.json for notes changed since the last warm-up, so
+    the weekly report is (mostly) cache hits.
+
+    Change tracking uses its own state (.ops_state/rag_warm_state.json, seeded from the
+    report state on first use); the report's state and snapshots are never touched.
+    Fingerprints use the report state's algorithm and queries come from the same
+    build_rag_query(), so cache keys match what generate_weekly_report() looks up (pass
+    the same shared `rag_cache` and `rag_namespace` for multi-notebook configs).
+    With `ingest_url`, pending changes are pushed to the server's index first, like the
+    report does, so the cache never holds evidence from before the push; if changes are
+    left pending nothing is warmed and the next warm-up retries.
+    Returns the number of notes warmed.
+    """
+    state_dir = state_path.parent
+    with RunLock(state_dir / "run.lock", lock_timeout_s):
+        report_store = StateStore(state_path)
+        report_store.load()
+        warm_store = StateStore(state_dir / WARM_STATE_FILENAME)
+        if warm_store.state_path.exists():
+            warm_store.load()
+        else:
+            # first warm-up: start from the last report, not from an empty notebook
+            warm_store.data = copy.deepcopy(report_store.data)
+
+        items: List[ScanItem] = [
+            it
+            for it in iter_scan(notes_dir, warm_store, statuses=CHANGE_STATUSES, algorithm=report_store.algorithm)
+            if it.status != "deleted" and it.abspath is not None
+        ]
+        if verbose:
+            print(f"[INFO] warm-rag: {len(items)} note(s) changed since the last warm-up")
+
+        cache = rag_cache
+        if cache is None:
+            cache = RagCache(state_dir / "rag_cache.json")
+            cache.load()
+        rag = RagPhase(
+            RagClient(rag_url=rag_url, timeout_s=rag_timeout_s, session=rag_session),
+            cache,
+            rag_url,
+            rag_top_k,
+            budget_s=rag_budget_s,
+            max_failures=rag_max_failures,
+            key_prefix=f"{rag_namespace}:" if rag_namespace else "",
+        )
+
+        if ingest_url:
+            ingest = RagIngest(
+                state_dir / INGEST_FILENAME,
+                batch_size=ingest_batch_size,
+                doc_prefix=f"{rag_namespace}/" if rag_namespace else "",
+            )
+            ingest.load()
+            client = RagClient(rag_url=rag_url, timeout_s=rag_timeout_s, session=rag_session, ingest_url=ingest_url)
+            # push first: lookups made before the index has the changes would cache stale evidence
+            pushed = push_changes(ingest, notes_dir, warm_store, client, rag.deadline(), verbose)
+            if pushed is not None and pushed.pending:
+                print("[WARN] warm-rag: index push incomplete; skipping lookups until it catches up")
+                for it in items:
+                    warm_store.data.get("files", {}).pop(it.relpath, None)
+                items = []
+
+        # notes the report (or an earlier warm-up) already derived aren't read again
+        derived = DerivedCache(state_dir / DERIVED_FILENAME)
+        derived.load()
+
+        def _warm(it: ScanItem) -> Optional[str]:
+            # same query builder as the report's RAG phase
+            assert it.abspath is not None
+            meta = derived.get(it.sha256)
+            if meta is None:
+                meta = derive_meta(read_text_safe(it.abspath))
+                derived.put(it.sha256, meta)
+            q = build_rag_query(it.relpath, "", meta)
+            res = rag.lookup(it.relpath, it.sha256 or "", q)
+            return res.skipped
+
+        with ThreadPoolExecutor(max_workers=max(1, concurrency)) as pool:
+            skipped = list(pool.map(_warm, items))
+
+        # not warmed (error / budget / breaker): forget them so the next warm-up retries
+        for it, reason in zip(items, skipped):
+            if reason is not None:
+                warm_store.data.get("files", {}).pop(it.relpath, None)
+        if warm_store.migrations:
+            rag.migrate_keys(warm_store.migrations, warm_store.algorithm)
+        rag.save()
+        warm_store.save()
+        try:
+            derived.save()
+        except OSError:
+            # best effort: only a cache
+            pass
+
+    warmed = sum(1 for reason in skipped if reason is None)
+    print(
+        f"[OK] warm-rag: {warmed}/{len(items)} note(s) cached "
+        f"(server calls {rag.stats['calls']}, already cached {rag.stats['hits']}, errors {rag.stats['errors']})"
+    )
+    if rag.breaker.is_open:
+        print(f"[WARN] RAG circuit breaker opened after {rag.breaker.max_failures} consecutive failures")
+    return warmed
@@ -31,4 +31,11 @@ def parse_iso_maybe(ts: str | None) -> datetime | None:
     try:
         return datetime.fromisoformat(ts)
     except Exception:
-        return None
\ No newline at end of file
+        return None
+
+
+def is_within_window(ts: str | None, week: WeekWindow) -> bool:
+    dt = parse_iso_maybe(ts)
+    if dt is None:
+        return False
+    return week.start <= dt < week.end
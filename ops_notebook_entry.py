@@ -1,4 +1,8 @@
+import multiprocessing
+
 from ops_notebook.cli import main
 
 if __name__ == "__main__":
+    # required for the rendering process pool in the PyInstaller onefile build
+    multiprocessing.freeze_support()
     raise SystemExit(main())
@@ -0,0 +1,32 @@
+from pathlib import Path
+
+from ops_notebook.core.derived import DerivedCache
+from ops_notebook.core.render import (
+    _first_heading_or_filename,
+    _preview,
+    build_rag_query,
+    derive_meta,
+)
+
+
+def test_derived_meta_matches_text_and_round_trips(tmp_path: Path):
+    text = "intro line\n\n#  Backup   runbook \n" + "step one two three\n" * 40
+    meta = derive_meta(text)
+    assert meta.title("db.md") == _first_heading_or_filename(text, "db.md") == "Backup   runbook"
+    assert meta.preview == _preview(text)
+    assert (meta.lines, meta.words) == (43, 165)
+    assert derive_meta("no heading").title("db.md") == "db.md"
+
+    cache = DerivedCache(tmp_path / "derived.json")
+    cache.put("sha-1", meta)
+    cache.put("sha-2", derive_meta(text[:50], complete=False))  # head only: not cached
+    cache.save()
+
+    cache = DerivedCache(tmp_path / "derived.json")
+    cache.load()
+    assert cache.get("sha-1") == meta and cache.get("sha-2") is None
+    # the query built from cached metadata is the one built from the text
+    assert build_rag_query("ops/db.md", "", cache.get("sha-1")) == build_rag_query("ops/db.md", text)
+
+    assert cache.migrate({"ops/db.md": ("sha-1", "blake-1")}) == 1
+    assert cache.prune({"other"}) == 1 and len(cache) == 0
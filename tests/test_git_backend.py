@@ -0,0 +1,95 @@
+import shutil
+import subprocess
+from pathlib import Path
+
+import pytest
+
+from ops_notebook.core.git_backend import GitSnapshots, git_scan
+from ops_notebook.core.hashing import fingerprint_file
+from ops_notebook.core.state import StateStore
+
+pytestmark = pytest.mark.skipif(shutil.which("git") is None, reason="git not installed")
+
+
+def _git(repo: Path, *args: str) -> None:
+    subprocess.run(
+        ["git", "-c", "user.name=t", "-c", "user.email=t@example.invalid", *args],
+        cwd=repo,
+        check=True,
+        capture_output=True,
+    )
+
+
+def _scan(notes_dir: Path, store: StateStore):
+    snaps = GitSnapshots(notes_dir)
+    items = {it.relpath: it for it in git_scan(notes_dir, store, snaps)}
+    return items, snaps
+
+
+def test_git_scan_detects_changes_and_reads_old_text(tmp_path: Path):
+    repo = tmp_path / "repo"
+    notes_dir = repo / "notes"
+    (notes_dir / "ops").mkdir(parents=True)
+    (notes_dir / "ops" / "a.md").write_text("# A\nv1\n", encoding="utf-8")
+    (notes_dir / "ops" / "b.md").write_text("# B\nsame\n", encoding="utf-8")
+    (notes_dir / "gone.md").write_text("bye\n", encoding="utf-8")
+    (repo / "README.rst").write_text("not a note\n", encoding="utf-8")
+    _git(repo, "init", "-q")
+    _git(repo, "add", ".")
+    _git(repo, "commit", "-qm", "init")
+
+    store = StateStore(tmp_path / "fingerprints.json")
+    items, _ = _scan(notes_dir, store)
+    assert {rel: it.status for rel, it in items.items()} == {
+        "gone.md": "new",
+        "ops/a.md": "new",
+        "ops/b.md": "new",
+    }
+
+    # uncommitted edit, untracked note, rename, deletion
+    (notes_dir / "ops" / "a.md").write_text("# A\nv2\n", encoding="utf-8")
+    (notes_dir / "ops" / "c.md").write_text("# C\n", encoding="utf-8")
+    _git(repo, "mv", "notes/ops/b.md", "notes/ops/b2.md")
+    (notes_dir / "gone.md").unlink()
+
+    items, snaps = _scan(notes_dir, store)
+    assert {rel: it.status for rel, it in items.items()} == {
+        "gone.md": "deleted",
+        "ops/a.md": "changed",
+        "ops/b2.md": "renamed",
+        "ops/c.md": "new",
+    }
+    assert items["ops/b2.md"].renamed_from == "ops/b.md"
+    assert items["ops/c.md"].sha256 == fingerprint_file(notes_dir / "ops" / "c.md", "git-blob")
+    assert snaps.load_text("ops/a.md") == "# A\nv1\n"
+
+    items, _ = _scan(notes_dir, store)
+    assert items["ops/a.md"].status == "unchanged"
+    assert items["ops/c.md"].status == "unchanged"
+    # the rename source is not reported again as a deletion
+    assert "ops/b.md" not in items and store.get("ops/b.md") is None
+    assert items["gone.md"].status == "deleted"
+
+
+def test_git_scan_diffs_successive_uncommitted_edits_against_the_previous_run(tmp_path: Path):
+    from ops_notebook.core.render import RenderJob, render_job
+
+    repo = tmp_path / "repo"
+    repo.mkdir()
+    note = repo / "a.md"
+    note.write_text("# A\nv1\n", encoding="utf-8")
+    _git(repo, "init", "-q")
+    _git(repo, "add", ".")
+    _git(repo, "commit", "-qm", "init")
+    store = StateStore(tmp_path / "fingerprints.json")
+    _scan(repo, store)
+
+    note.write_text("# A\nv2\n", encoding="utf-8")
+    _scan(repo, store)
+    note.write_text("# A\nv2\nv3\n", encoding="utf-8")
+    items, snaps = _scan(repo, store)
+    assert items["a.md"].status == "changed"
+    old = snaps.load_text("a.md")
+    assert old == "# A\nv2\n"  # the previous run's uncommitted text, not HEAD
+    r = render_job(RenderJob(relpath="a.md", status="changed", old_text=old, new_text=note.read_text()))
+    assert (r.added, r.removed) == (1, 0)
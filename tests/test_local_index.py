@@ -0,0 +1,60 @@
+from pathlib import Path
+
+from ops_notebook.core.local_index import LocalIndex
+from ops_notebook.core.rag_cache import RagCache
+from ops_notebook.core.rag_phase import SKIP_ERROR, RagPhase
+from ops_notebook.core.scanner import scan
+from ops_notebook.core.state import StateStore
+
+
+class DownClient:
+    def query_topk(self, query, top_k=3, max_chars=260, timeout_s=None):
+        raise ConnectionError("server down")
+
+
+def _notes(tmp_path: Path) -> Path:
+    notes = tmp_path / "notes"
+    notes.mkdir()
+    (notes / "backup.md").write_text("# Backup\n\nnightly backup runs rsync to the nas\n", encoding="utf-8")
+    (notes / "deploy.md").write_text("# Deploy\n\n배포 절차와 롤백 체크리스트\n", encoding="utf-8")
+    return notes
+
+
+def test_sync_reindexes_only_changed_notes(tmp_path: Path):
+    notes = _notes(tmp_path)
+    store = StateStore(tmp_path / "state.json")
+    store.load()
+    scan(notes, store)
+    index = LocalIndex(tmp_path / "local_index.json")
+
+    assert index.sync(notes, store) == 2
+    assert index.sync(notes, store) == 0
+
+    (notes / "backup.md").unlink()
+    scan(notes, store)
+    assert index.sync(notes, store) == 0
+    assert len(index) == 1
+
+    index.save()
+    reloaded = LocalIndex(tmp_path / "local_index.json")
+    reloaded.load()
+    evs = reloaded.query_topk("롤백 배포", top_k=3)
+    assert [e.source for e in evs] == ["deploy.md"]
+
+
+def test_local_index_backs_up_unreachable_server(tmp_path: Path):
+    notes = _notes(tmp_path)
+    store = StateStore(tmp_path / "state.json")
+    store.load()
+    scan(notes, store)
+    index = LocalIndex(tmp_path / "local_index.json")
+    index.sync(notes, store)
+    cache = RagCache(tmp_path / "rag_cache.json")
+    phase = RagPhase(DownClient(), cache, "http://rag.invalid", 3, budget_s=0, fallback=index)
+
+    res = phase.lookup("x.md", "sha-x", "nightly backup nas")
+
+    assert res.fallback and res.skipped == SKIP_ERROR
+    assert res.evidences[0].source == "backup.md"
+    # fallback evidence is not cached; the server is asked again next run
+    assert cache.get("x.md", "sha-x", "http://rag.invalid", 3, 260) is None
@@ -0,0 +1,42 @@
+from pathlib import Path
+
+from ops_notebook.core.metrics import METRICS_FILENAME, load_history, slow_runs
+from ops_notebook.core.report import generate_weekly_report
+
+
+def test_slow_run_flagged_against_rolling_median():
+    rows = [{"duration_s": d} for d in (1.0, 1.2, 0.9, 1.1, 3.0, 1.0)]
+    assert list(slow_runs(rows, baseline_runs=4, slow_factor=1.5)) == [4]
+
+
+def test_report_run_appends_metrics_row(tmp_path: Path):
+    notes = tmp_path / "notes"
+    notes.mkdir()
+    (notes / "a.md").write_text("# A\nhello\n", encoding="utf-8")
+    template = tmp_path / "template.md"
+    template.write_text("{changed_files_block}", encoding="utf-8")
+    prom = tmp_path / "textfile" / "ops_notebook.prom"
+    kw = dict(
+        notes_dir=notes,
+        reports_dir=tmp_path / "reports",
+        report_path=None,
+        template_path=template,
+        state_path=tmp_path / ".ops_state" / "fingerprints.json",
+        use_rag=False,
+        rag_url="",
+        rag_top_k=3,
+        rag_query="",
+        prometheus_textfile=prom,
+    )
+    (tmp_path / ".ops_state").mkdir()
+    generate_weekly_report(**kw)
+    (notes / "b.md").write_text("# B\n", encoding="utf-8")
+    generate_weekly_report(**kw)
+
+    rows = load_history(tmp_path / ".ops_state" / METRICS_FILENAME)
+    assert [r["counts"] for r in rows] == [{"total": 1, "new": 1}, {"total": 2, "unchanged": 1, "new": 1}]
+    assert rows[1]["bytes_hashed"] == len("# A\nhello\n") + len("# B\n")
+    # only the new note's snapshot was written
+    assert rows[1]["snapshot_bytes_written"] == len("# B\n")
+    assert {"scan", "render", "write"} <= set(rows[1]["phases"])
+    assert 'ops_notebook_last_run_notes{status="new"} 1' in prom.read_text(encoding="utf-8")
@@ -0,0 +1,63 @@
+from pathlib import Path
+
+from ops_notebook.core.near_dup import SignatureIndex
+from ops_notebook.core.scanner import scan
+from ops_notebook.core.state import StateStore
+
+RUNBOOK = "\n".join(
+    f"step {i}: ssh to db-primary and check replication lag on shard {i} before the failover"
+    for i in range(12)
+)
+
+
+def test_changed_copy_is_found_and_only_changed_notes_are_rehashed(tmp_path: Path):
+    notes = tmp_path / "notes"
+    notes.mkdir()
+    (notes / "failover.md").write_text(RUNBOOK, encoding="utf-8")
+    (notes / "unrelated.md").write_text(
+        "quarterly budget review, vendor contracts and the hiring plan for next year " * 3,
+        encoding="utf-8",
+    )
+    store = StateStore(tmp_path / "state.json")
+    store.load()
+    scan(notes, store)
+    index = SignatureIndex(tmp_path / "signatures.json")
+    assert index.sync(notes, store) == 2
+
+    (notes / "failover-copy.md").write_text(RUNBOOK.replace("shard 3", "shard 33"), encoding="utf-8")
+    scan(notes, store)
+    assert index.sync(notes, store) == 1
+
+    dups = index.near_duplicates("failover-copy.md")
+    assert [rel for rel, _ in dups] == ["failover.md"]
+    assert index.near_duplicates("unrelated.md") == []
+
+
+def test_lookup_probes_few_candidates_and_misses_nothing_within_max_distance(tmp_path: Path):
+    import random
+
+    from ops_notebook.core.near_dup import DEFAULT_MAX_DISTANCE
+
+    rng = random.Random(7)
+    index = SignatureIndex(tmp_path / "signatures.json")
+    for i in range(5_000):
+        index._insert(f"n{i:04d}.md", f"sha{i}", rng.getrandbits(64))
+    probe = rng.getrandbits(64)
+    # one neighbour per distance up to the max, bits spread over all bands
+    for d in range(1, DEFAULT_MAX_DISTANCE + 1):
+        bits = rng.sample(range(64), d)
+        index._insert(f"near{d}.md", f"near{d}", probe ^ sum(1 << b for b in bits))
+    index._insert("probe.md", "probe", probe)
+
+    found = index.near_duplicates("probe.md")
+    assert [rel for rel, _ in found] == [f"near{d}.md" for d in range(1, DEFAULT_MAX_DISTANCE + 1)]
+    # random notes hit a probed bucket with ~0.1% odds: a handful, not a linear scan
+    candidates = index._candidates(probe, DEFAULT_MAX_DISTANCE)
+    others = candidates - {rel for rel, _ in found} - {"probe.md"}
+    assert len(others) < 25
+
+    # a file with the old 8-bit bands (version 1) is dropped on load and rebuilt
+    (tmp_path / "old.json").write_text('{"version": 1, "docs": {"a.md": {"sha": "x"}}, "bands": {}}')
+    old = SignatureIndex(tmp_path / "old.json")
+    old.load()
+    assert len(old) == 0
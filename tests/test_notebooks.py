@@ -0,0 +1,59 @@
+from pathlib import Path
+
+from ops_notebook.core.notebooks import Notebook, format_summary, load_notebooks, run_notebooks
+
+DEFAULT = Notebook(
+    name="",
+    notes_dir=Path("notes"),
+    template_path=Path("templates/weekly_report_template.md"),
+    reports_dir=Path("reports"),
+    report_path=None,
+    state_path=Path(".ops_state/fingerprints.json"),
+)
+
+
+def test_notebooks_defaults_and_isolated_failures():
+    cfg = {
+        "notebooks": [
+            {"name": "team", "notes_dir": "nb/team"},
+            {"name": "infra", "notes_dir": "nb/infra", "state_path": "infra_state/fp.json"},
+            {"name": "team", "notes_dir": "nb/dup"},  # duplicate name: skipped
+        ]
+    }
+    assert load_notebooks({}, DEFAULT) == [DEFAULT]
+    team, infra = load_notebooks(cfg, DEFAULT)
+    assert team.reports_dir == Path("reports/team")
+    assert team.state_path == Path(".ops_state/team/fingerprints.json")
+    assert team.template_path == DEFAULT.template_path
+    assert infra.state_path == Path("infra_state/fp.json")
+
+    def run(nb: Notebook) -> Path:
+        if nb.name == "team":
+            raise RuntimeError("boom")
+        return nb.reports_dir / "week.md"
+
+    results = run_notebooks([team, infra], run)
+    assert [(r.name, r.ok) for r in results] == [("team", False), ("infra", True)]
+    summary = format_summary(results)
+    assert "2 run, 1 ok, 1 failed" in summary
+    assert "[FAIL] team: boom" in summary
+
+
+def test_shared_rag_cache_saves_merge_entries_of_other_runs(tmp_path: Path):
+    from ops_notebook.core.notebooks import SHARED_RAG_CACHE_FILENAME
+    from ops_notebook.core.rag_cache import RagCache
+    from ops_notebook.core.rag_client import RagEvidence
+
+    path = tmp_path / SHARED_RAG_CACHE_FILENAME
+    team, infra = RagCache(path, shared=True), RagCache(path, shared=True)
+    team.load()
+    infra.load()
+    team.set("team:a.md", "sha-a", "http://rag", 3, 300, [RagEvidence("team", None, None)])
+    infra.set("infra:b.md", "sha-b", "http://rag", 3, 300, [RagEvidence("infra", None, None)])
+    team.save()
+    infra.save()  # overlapping run of another notebook: doesn't drop team's entry
+
+    merged = RagCache(path)
+    merged.load()
+    assert merged.get("team:a.md", "sha-a", "http://rag", 3, 300)[0].snippet == "team"
+    assert merged.get("infra:b.md", "sha-b", "http://rag", 3, 300)[0].snippet == "infra"
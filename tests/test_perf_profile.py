@@ -0,0 +1,26 @@
+from pathlib import Path
+
+from ops_notebook.core.perf_profile import PerfProfile, collect_perf_profile, percentile
+
+
+def test_profile_measures_notebook_and_flags_slow_runs(tmp_path: Path):
+    notes = tmp_path / "notes"
+    (notes / "sub").mkdir(parents=True)
+    (notes / "a.md").write_text("a" * 2_000_000, encoding="utf-8")
+    (notes / "sub" / "b.md").write_text("b" * 10, encoding="utf-8")
+    snaps = tmp_path / ".ops_state" / "snapshots" / "sub"
+    snaps.mkdir(parents=True)
+    (snaps / "b.md").write_text("old", encoding="utf-8")
+
+    p = collect_perf_profile(notes, tmp_path / ".ops_state" / "fingerprints.json", "blake2b")
+
+    assert (p.notes, p.notes_bytes) == (2, 2_000_010)
+    assert (p.snapshot_files, p.snapshot_bytes) == (1, 3)
+    assert p.hash_sample_bytes == 2_000_010 and p.hash_mb_s is not None and p.hash_mb_s > 0
+
+    slow = PerfProfile(notes=30_000, notes_bytes=10**10, hash_mb_s=20.0, rag_latency_s=[0.5, 0.6, 3.5])
+    warnings = "\n".join(slow.warnings(rag_budget_s=60))
+    assert "large notebook" in warnings
+    assert "slow hashing" in warnings and "full re-hash" in warnings
+    assert "slow RAG server (p95 3.5s); rag.budget_s=60 covers ~100 uncached lookups" in warnings
+    assert percentile([0.5, 0.6, 3.5], 50) == 0.6
@@ -0,0 +1,89 @@
+import re
+from pathlib import Path
+
+from ops_notebook.core.report import generate_weekly_report
+
+TEMPLATE = (
+    "# Weekly Ops Report ({week_range})\n\n"
+    "Generated: {generated_at}\n"
+    "Report File: {report_file}\n\n"
+    "## 1) This week changed files\n{changed_files_block}\n"
+    "## 2) File diffs (unified diff)\n{diff_block}\n"
+    "## 3) Auto digest (template-based)\n{auto_digest_block}\n"
+)
+
+
+def _run_twice(root: Path, pipeline: str) -> str:
+    notes_dir = root / "notes"
+    (notes_dir / "ops").mkdir(parents=True)
+    for i in range(12):
+        (notes_dir / "ops" / f"n{i:02d}.md").write_text(f"# Note {i}\n" + "x\n" * i, encoding="utf-8")
+    (root / "template.md").write_text(TEMPLATE, encoding="utf-8")
+
+    kwargs = dict(
+        notes_dir=notes_dir,
+        reports_dir=root / "reports",
+        report_path=root / "reports" / "week.md",
+        template_path=root / "template.md",
+        state_path=root / ".ops_state" / "fingerprints.json",
+        use_rag=False,
+        rag_url="http://127.0.0.1:8000/query",
+        rag_top_k=3,
+        rag_query="",
+        pipeline=pipeline,
+        render_workers=1,
+    )
+    (root / ".ops_state").mkdir()
+    generate_weekly_report(**kwargs)
+
+    for i in range(0, 12, 3):
+        (notes_dir / "ops" / f"n{i:02d}.md").write_text(f"# Note {i}\nedited\n", encoding="utf-8")
+    (notes_dir / "ops" / "n01.md").unlink()
+    generate_weekly_report(**kwargs)
+
+    body = (root / "reports" / "week.md").read_text(encoding="utf-8")
+    return re.sub(r"(Generated|Report File): .*", "", body)
+
+
+def test_async_pipeline_matches_sequential(tmp_path: Path):
+    sequential = _run_twice(tmp_path / "seq", "sequential")
+    pipelined = _run_twice(tmp_path / "async", "async")
+
+    assert pipelined == sequential
+    assert "+edited" in pipelined
+    assert "> deleted" in pipelined
+
+    snaps = tmp_path / "async" / ".ops_state" / "snapshots" / "ops"
+    assert (snaps / "n00.md").read_text(encoding="utf-8") == "# Note 0\nedited\n"
+    assert not (snaps / "n01.md").exists()
+
+
+def test_async_pipeline_writes_snapshots_only_after_the_report(tmp_path: Path):
+    import pytest
+
+    notes_dir = tmp_path / "notes"
+    notes_dir.mkdir()
+    (notes_dir / "a.md").write_text("# A\nold\n", encoding="utf-8")
+    (tmp_path / "template.md").write_text(TEMPLATE, encoding="utf-8")
+    kwargs = dict(
+        notes_dir=notes_dir,
+        reports_dir=tmp_path / "reports",
+        report_path=tmp_path / "reports" / "week.md",
+        template_path=tmp_path / "template.md",
+        state_path=tmp_path / ".ops_state" / "fingerprints.json",
+        use_rag=False,
+        rag_url="http://127.0.0.1:8000/query",
+        rag_top_k=3,
+        rag_query="",
+        pipeline="async",
+    )
+    generate_weekly_report(**kwargs)
+    snapshot = tmp_path / ".ops_state" / "snapshots" / "a.md"
+    assert snapshot.read_text(encoding="utf-8") == "# A\nold\n"
+
+    (notes_dir / "a.md").write_text("# A\nnew\n", encoding="utf-8")
+    # the report fails after the pipeline ran: the previous snapshot must survive
+    (tmp_path / "template.md").write_text(TEMPLATE + "{unknown_block}\n", encoding="utf-8")
+    with pytest.raises(KeyError):
+        generate_weekly_report(**kwargs)
+    assert snapshot.read_text(encoding="utf-8") == "# A\nold\n"
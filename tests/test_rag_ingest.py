@@ -0,0 +1,113 @@
+from pathlib import Path
+
+from ops_notebook.core.rag_ingest import RagIngest
+from ops_notebook.core.scanner import scan
+from ops_notebook.core.state import StateStore
+
+
+class IngestClient:
+    timeout_s = 12
+
+    def __init__(self, fail_after: int = -1):
+        self.fail_after = fail_after
+        self.batches = []
+
+    def ingest(self, upserts, deletes, timeout_s=None):
+        if len(self.batches) == self.fail_after:
+            raise ConnectionError("index server down")
+        self.batches.append(([u["doc"] for u in upserts], deletes))
+
+
+def test_failed_batches_stay_pending_for_the_next_run(tmp_path: Path):
+    notes_dir = tmp_path / "notes"
+    notes_dir.mkdir()
+    for name in ("a.md", "b.md", "c.md"):
+        (notes_dir / name).write_text(f"# {name}\n", encoding="utf-8")
+    store = StateStore(tmp_path / "fingerprints.json")
+    scan(notes_dir, store)
+
+    ingest = RagIngest(tmp_path / "rag_ingest.json", batch_size=2)
+    client = IngestClient(fail_after=1)
+    res = ingest.sync(notes_dir, store, client)
+    assert client.batches == [(["a.md", "b.md"], [])]
+    assert (res.upserted, res.failed_batches, res.pending) == (2, 1, 1)
+
+    (notes_dir / "a.md").unlink()
+    (notes_dir / "b.md").write_text("# b\nedited\n", encoding="utf-8")
+    scan(notes_dir, store)
+    ingest = RagIngest(tmp_path / "rag_ingest.json", batch_size=2)
+    ingest.load()
+    client = IngestClient()
+    res = ingest.sync(notes_dir, store, client)
+    # deletions first, then the edit and what was left pending
+    assert client.batches == [(["b.md"], ["a.md"]), (["c.md"], [])]
+    assert (res.upserted, res.deleted, res.pending) == (2, 1, 0)
+    assert ingest.sync(notes_dir, store, IngestClient()).upserted == 0
+
+
+def test_first_sync_pushes_only_this_runs_changes_within_the_budget(tmp_path: Path, monkeypatch):
+    import ops_notebook.core.rag_ingest as rag_ingest
+
+    notes_dir = tmp_path / "notes"
+    notes_dir.mkdir()
+    for i in range(5):
+        (notes_dir / f"n{i}.md").write_text(f"# {i}\n", encoding="utf-8")
+    store = StateStore(tmp_path / "fingerprints.json")
+    monkeypatch.setattr("ops_notebook.core.scanner._now_iso_local", lambda: "2026-10-12T09:00:00+00:00")
+    scan(notes_dir, store)
+
+    # ingest enabled a week later: the server already indexed the unchanged notes
+    monkeypatch.setattr("ops_notebook.core.scanner._now_iso_local", lambda: "2026-10-19T09:00:00+00:00")
+    (notes_dir / "n1.md").write_text("# 1\nedited\n", encoding="utf-8")
+    (notes_dir / "n9.md").write_text("# 9\n", encoding="utf-8")
+    scan(notes_dir, store)
+    ingest = RagIngest(tmp_path / "rag_ingest.json", batch_size=1)
+    ingest.load()
+    clock = iter([1.0, 9.0])
+    monkeypatch.setattr(rag_ingest.time, "monotonic", lambda: next(clock))
+    client = IngestClient()
+    res = ingest.sync(notes_dir, store, client, deadline=5.0)
+    assert client.batches == [(["n1.md"], [])]
+    assert (res.upserted, res.pending, res.out_of_budget) == (1, 1, True)
+
+    ingest = RagIngest(tmp_path / "rag_ingest.json", batch_size=1)
+    ingest.load()
+    client = IngestClient()
+    assert ingest.sync(notes_dir, store, client).upserted == 1
+    assert client.batches == [(["n9.md"], [])]
+
+
+def test_report_pushes_only_with_rag_enabled_within_the_rag_budget(tmp_path: Path, monkeypatch):
+    from ops_notebook.core import report
+    from ops_notebook.core.rag_phase import RagLookup, RagPhase
+
+    notes_dir = tmp_path / "notes"
+    notes_dir.mkdir()
+    (notes_dir / "a.md").write_text("# A\n", encoding="utf-8")
+    template = tmp_path / "template.md"
+    template.write_text("{changed_files_block}", encoding="utf-8")
+    kw = dict(
+        notes_dir=notes_dir,
+        reports_dir=tmp_path / "reports",
+        report_path=None,
+        template_path=template,
+        state_path=tmp_path / ".ops_state" / "fingerprints.json",
+        rag_url="http://rag.invalid/query",
+        rag_top_k=3,
+        rag_query="",
+        ingest_url="http://rag.invalid/ingest",
+    )
+    report.generate_weekly_report(use_rag=False, **kw)
+    assert not (tmp_path / ".ops_state" / "rag_ingest.json").exists()
+
+    deadlines = []
+
+    def fake_push(ingest, notes_dir, store, client, deadline=None, verbose=False):
+        deadlines.append(deadline)
+
+    monkeypatch.setattr(report, "push_changes", fake_push)
+    monkeypatch.setattr(RagPhase, "lookup", lambda self, *a: deadlines.append(self.deadline()) or RagLookup())
+    (notes_dir / "a.md").write_text("# A\nedited\n", encoding="utf-8")
+    report.generate_weekly_report(use_rag=True, rag_budget_s=30, **kw)
+    # the push and the lookups run against the same deadline
+    assert len(deadlines) == 2 and deadlines[0] is not None and deadlines[0] == deadlines[1]
@@ -0,0 +1,45 @@
+from pathlib import Path
+
+from ops_notebook.core.rag_cache import RagCache
+from ops_notebook.core.rag_client import RagEvidence
+from ops_notebook.core.rag_phase import SKIP_BUDGET, SKIP_CIRCUIT, SKIP_ERROR, RagPhase
+
+URL = "http://rag.invalid/query"
+
+
+class FlakyClient:
+    def __init__(self, fail: bool):
+        self.fail = fail
+        self.calls = 0
+
+    def query_topk(self, query, top_k=3, max_chars=260, timeout_s=None):
+        self.calls += 1
+        if self.fail:
+            raise TimeoutError("hung server")
+        return [RagEvidence(snippet="hit", source="x.md", score=1.0)]
+
+
+def test_circuit_breaker_stops_querying_but_serves_cache(tmp_path: Path):
+    cache = RagCache(tmp_path / "rag_cache.json")
+    cache.set("cached.md", "sha-c", URL, 3, 260, [RagEvidence(snippet="old", source="y.md")])
+    client = FlakyClient(fail=True)
+    phase = RagPhase(client, cache, URL, 3, budget_s=0, max_failures=2)
+
+    results = [phase.lookup(f"n{i}.md", f"sha{i}", "q") for i in range(5)]
+
+    assert [r.skipped for r in results] == [SKIP_ERROR, SKIP_ERROR, SKIP_CIRCUIT, SKIP_CIRCUIT, SKIP_CIRCUIT]
+    assert client.calls == 2
+    assert phase.lookup("cached.md", "sha-c", "q").evidences[0].snippet == "old"
+    # failures are not cached, so the next run retries them
+    assert cache.get("n0.md", "sha0", URL, 3, 260) is None
+
+
+def test_budget_exhausted_skips_remaining_files(tmp_path: Path):
+    client = FlakyClient(fail=False)
+    phase = RagPhase(client, RagCache(tmp_path / "rag_cache.json"), URL, 3, budget_s=1e-9)
+
+    phase.lookup("a.md", "sha-a", "q")
+    second = phase.lookup("b.md", "sha-b", "q")
+
+    assert second.skipped == SKIP_BUDGET
+    assert client.calls <= 1
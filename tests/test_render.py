@@ -0,0 +1,98 @@
+from dataclasses import replace
+
+from ops_notebook.core.render import (
+    PARALLEL_MIN_FILES,
+    RenderJob,
+    derive_meta,
+    render_job,
+    render_sections,
+    render_sections_within_budget,
+    should_parallelize,
+)
+
+
+def _jobs(n: int, body_chars: int) -> list[RenderJob]:
+    jobs = []
+    for i in range(n):
+        old = f"# Note {i}\n" + ("old line\n" * (body_chars // 9))
+        new = f"# Note {i}\n" + ("new line\n" * (body_chars // 9))
+        jobs.append(RenderJob(relpath=f"n{i:03d}.md", status="changed", old_text=old, new_text=new))
+    jobs.append(RenderJob(relpath="gone.md", status="deleted", old_text="", new_text=""))
+    return jobs
+
+
+def test_small_week_stays_in_process():
+    assert not should_parallelize(_jobs(2, 100), workers=4)
+    assert not should_parallelize(_jobs(PARALLEL_MIN_FILES * 4, 100_000), workers=1)
+
+
+def test_parallel_rendering_matches_serial_order():
+    jobs = _jobs(PARALLEL_MIN_FILES * 2, 40_000)
+    assert should_parallelize(jobs, workers=2)
+
+    rendered = render_sections(jobs, workers=2)
+    assert rendered == [render_job(j) for j in jobs]
+    assert rendered[-1].diff.endswith("> deleted\n")
+    assert rendered[0].digest.startswith("- `n000.md` — **Note 0**")
+
+
+def test_budget_renders_biggest_changes_first():
+    small = RenderJob(relpath="a.md", status="changed", old_text="x\n", new_text="y\n")
+    big = RenderJob(
+        relpath="b.md", status="changed", old_text="", new_text="".join(f"line {i}\n" for i in range(20))
+    )
+    jobs = [small, big, RenderJob(relpath="gone.md", status="deleted", old_text="", new_text="")]
+    full = [render_job(j) for j in jobs]
+
+    rendered = render_sections_within_budget(jobs, max_lines=full[1].diff_lines)
+
+    assert rendered[1] == full[1]
+    assert rendered[0].diff_omitted and (rendered[0].added, rendered[0].removed) == (1, 1)
+    assert "diff omitted (report budget spent): ~+1 / -1 lines" in rendered[0].diff
+    assert rendered[0].digest == full[0].digest
+    assert rendered[2] == full[2]
+    assert render_sections_within_budget(jobs) == full
+
+    # JSON-only output: no Markdown, same files get full diffs
+    plain = [replace(j, markdown=False) for j in jobs]
+    rendered = render_sections_within_budget(plain, max_lines=full[1].diff_lines)
+    assert [r.diff_omitted for r in rendered] == [True, False, False]
+    assert rendered[1].added == 20
+
+
+def _grown(relpath: str, n: int) -> RenderJob:
+    return RenderJob(
+        relpath=relpath, status="changed", old_text="# T\n", new_text="# T\n" + "".join(f"l{i}\n" for i in range(n))
+    )
+
+
+def test_budget_skips_an_oversized_diff_and_keeps_filling():
+    jobs = [_grown("big.md", 30), _grown("mid.md", 10), _grown("small.md", 2)]
+    full = [render_job(j) for j in jobs]
+
+    rendered = render_sections_within_budget(jobs, max_lines=full[1].diff_lines + full[2].diff_lines)
+
+    assert [r.diff_omitted for r in rendered] == [True, False, False]
+    assert rendered[1:] == full[1:]
+
+
+def test_budget_loads_texts_only_for_rendered_diffs():
+    jobs = [_grown("big.md", 30), _grown("small.md", 2)]
+    full = [render_job(j) for j in jobs]
+    texts = {j.relpath: j for j in jobs}
+    lazy = [
+        replace(j, old_text="", new_text="", texts_loaded=False, old_lines=1, meta=derive_meta(j.new_text))
+        for j in jobs
+    ]
+    loaded = []
+
+    def load(job: RenderJob) -> RenderJob:
+        loaded.append(job.relpath)
+        return replace(texts[job.relpath], meta=job.meta)
+
+    rendered = render_sections_within_budget(lazy, max_lines=full[1].diff_lines, load=load)
+
+    # the big diff can't fit by its line count alone: its texts are never read
+    assert loaded == ["small.md"]
+    assert rendered[1] == full[1]
+    assert rendered[0].diff_omitted and (rendered[0].added, rendered[0].removed) == (30, 0)
@@ -1,5 +1,7 @@
 from pathlib import Path
 
+import pytest
+
 from ops_notebook.core.report import generate_weekly_report
 
 
@@ -72,4 +74,78 @@ def test_generate_weekly_report(tmp_path: Path):
     report_files2 = list(reports_dir.glob("*.md"))
     assert len(report_files2) == 1
     body2 = report_files2[0].read_text(encoding="utf-8")
-    assert "diff" in body2  # code-fence header inside report
\ No newline at end of file
+    assert "diff" in body2  # code-fence header inside report
+
+def test_json_sidecar_without_markdown(tmp_path: Path):
+    import json
+
+    notes_dir = tmp_path / "notes"
+    notes_dir.mkdir()
+    (notes_dir / "a.md").write_text("# A\nhello\n", encoding="utf-8")
+    kw = dict(
+        notes_dir=notes_dir,
+        reports_dir=tmp_path / "reports",
+        report_path=tmp_path / "reports" / "week.md",
+        template_path=tmp_path / "missing_template.md",  # never read without Markdown
+        state_path=tmp_path / ".ops_state" / "fingerprints.json",
+        use_rag=False,
+        rag_url="http://127.0.0.1:8000/query",
+        rag_top_k=3,
+        rag_query="",
+        markdown=False,
+    )
+    (tmp_path / ".ops_state").mkdir()
+    generate_weekly_report(**kw)
+    (notes_dir / "a.md").write_text("# A\nhello changed\nmore\n", encoding="utf-8")
+    generate_weekly_report(**kw)
+
+    assert not (tmp_path / "reports" / "week.md").exists()
+    data = json.loads((tmp_path / "reports" / "week.json").read_text(encoding="utf-8"))
+    [item] = data["items"]
+    assert (item["relpath"], item["status"], item["title"]) == ("a.md", "changed", "A")
+    assert item["diff"] == {"added": 2, "removed": 1, "omitted": False}
+    assert (item["lines"], item["words"]) == (3, 5)
+    assert data["markdown_file"] is None
+
+
+@pytest.mark.parametrize("pipeline", ["sequential", "async"])
+def test_report_budget_reads_old_snapshots_only_for_rendered_diffs(tmp_path: Path, monkeypatch, pipeline):
+    import json
+
+    from ops_notebook.core.snapshots import SnapshotStore
+
+    notes_dir = tmp_path / "notes"
+    notes_dir.mkdir()
+    (notes_dir / "big.md").write_text("# Big\n", encoding="utf-8")
+    (notes_dir / "small.md").write_text("# Small\n", encoding="utf-8")
+    kw = dict(
+        notes_dir=notes_dir,
+        reports_dir=tmp_path / "reports",
+        report_path=tmp_path / "reports" / "week.md",
+        template_path=tmp_path / "missing_template.md",
+        state_path=tmp_path / ".ops_state" / "fingerprints.json",
+        use_rag=False,
+        rag_url="http://127.0.0.1:8000/query",
+        rag_top_k=3,
+        rag_query="",
+        markdown=False,
+        pipeline=pipeline,
+        budget_lines=10,
+    )
+    generate_weekly_report(**kw)
+    (notes_dir / "big.md").write_text("# Big\n" + "".join(f"- item {i}\n" for i in range(40)), encoding="utf-8")
+    (notes_dir / "small.md").write_text("# Small\n- one\n", encoding="utf-8")
+
+    reads = []
+    load_text = SnapshotStore.load_text
+    monkeypatch.setattr(
+        SnapshotStore, "load_text", lambda self, rel: reads.append(rel) or load_text(self, rel)
+    )
+    generate_weekly_report(**kw)
+
+    # big.md can't fit the budget by its line count: its old snapshot is never read
+    assert reads == ["small.md"]
+    data = json.loads((tmp_path / "reports" / "week.json").read_text(encoding="utf-8"))
+    diffs = {it["relpath"]: it["diff"] for it in data["items"]}
+    assert diffs["big.md"] == {"added": 40, "removed": 0, "omitted": True}
+    assert diffs["small.md"] == {"added": 1, "removed": 0, "omitted": False}
@@ -0,0 +1,51 @@
+from pathlib import Path
+
+import pytest
+
+from ops_notebook.core.rollup import (
+    build_rollup,
+    parse_period,
+    render_rollup_markdown,
+    update_week_summary,
+)
+
+
+def _report(week: str, items):
+    return {
+        "week": week,
+        "week_start": "",
+        "generated_at": "",
+        "items": [
+            {"relpath": rel, "status": status, "title": rel, "diff": {"added": a, "removed": r}}
+            for rel, status, a, r in items
+        ],
+    }
+
+
+def test_rollup_merges_weekly_summaries(tmp_path: Path):
+    # two runs in one week are merged into that week's summary
+    update_week_summary(tmp_path, _report("2026-W37", [("db.md", "new", 10, 0)]))
+    update_week_summary(tmp_path, _report("2026-W37", [("db.md", "changed", 2, 1), ("old.md", "deleted", None, None)]))
+    update_week_summary(tmp_path, _report("2026-W39", [("db.md", "changed", 3, 3), ("dns.md", "changed", 1, 0)]))
+    # W41 starts in October: not part of the September rollup
+    update_week_summary(tmp_path, _report("2026-W41", [("late.md", "new", 5, 0)]))
+
+    rollup = build_rollup(tmp_path, "month", "2026-09")
+    assert [w["week"] for w in rollup["weeks"]] == ["2026-W37", "2026-W39"]
+    assert rollup["missing_weeks"] == ["2026-W38", "2026-W40"]
+    db = rollup["notes"]["db.md"]
+    assert (db["status"], db["added"], db["removed"], db["weeks"]) == ("new", 15, 4, ["2026-W37", "2026-W39"])
+    assert rollup["totals"]["notes"] == {"changed": 1, "new": 1, "deleted": 1, "renamed": 0}
+    assert "late.md" not in rollup["notes"]
+    assert "| **Distinct notes** | 1 | 1 | 1 | 0 | 16 | 4 |" in render_rollup_markdown(rollup, "now")
+
+    assert "late.md" in build_rollup(tmp_path, "quarter", "2026-Q4")["notes"]
+
+
+def test_parse_period():
+    assert parse_period("quarter", "2026-Q4")[1:] == (
+        parse_period("month", "2026-10")[1],
+        parse_period("month", "2027-01")[1],
+    )
+    with pytest.raises(ValueError):
+        parse_period("quarter", "2026-10")
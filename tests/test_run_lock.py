@@ -0,0 +1,54 @@
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+from ops_notebook.core.report import _write_weekly_report, generate_weekly_report
+from ops_notebook.core.run_lock import RunLock, RunLockTimeout
+
+
+def test_second_holder_waits_then_times_out(tmp_path: Path):
+    path = tmp_path / ".ops_state" / "run.lock"
+    with RunLock(path):
+        other = RunLock(path, timeout_s=0.2)
+        assert other.is_held()
+        with pytest.raises(RunLockTimeout):
+            other.acquire()
+        assert other.waited
+    with RunLock(path, timeout_s=0.2) as again:
+        assert not again.waited
+
+
+def test_waiting_run_reuses_concurrent_report(tmp_path: Path, capsys):
+    notes = tmp_path / "notes"
+    notes.mkdir()
+    (notes / "a.md").write_text("# A\nhello\n", encoding="utf-8")
+    template = tmp_path / "template.md"
+    template.write_text("{changed_files_block}", encoding="utf-8")
+    kw = dict(
+        notes_dir=notes,
+        reports_dir=tmp_path / "reports",
+        report_path=tmp_path / "reports" / "out.md",
+        template_path=template,
+        state_path=tmp_path / ".ops_state" / "fingerprints.json",
+        use_rag=False,
+        rag_url="",
+        rag_top_k=3,
+        rag_query="",
+    )
+    (tmp_path / ".ops_state").mkdir()
+
+    holder = RunLock(tmp_path / ".ops_state" / "run.lock")
+    holder.acquire()
+    waiting = threading.Thread(target=generate_weekly_report, kwargs=dict(kw, lock_timeout_s=10))
+    waiting.start()
+    try:
+        time.sleep(0.2)
+        # the run holding the lock does the work
+        _write_weekly_report(**kw)
+    finally:
+        holder.release()
+    waiting.join(timeout=10)
+
+    assert "already up to date" in capsys.readouterr().out
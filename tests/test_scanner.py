@@ -0,0 +1,161 @@
+from pathlib import Path
+
+from ops_notebook.core.scanner import (
+    CHANGE_STATUSES,
+    ScanItem,
+    ScanScope,
+    ScanStats,
+    iter_scan,
+    scan,
+)
+from ops_notebook.core.state import FileState, StateStore
+
+
+def test_iter_scan_yields_only_requested_statuses(tmp_path: Path):
+    notes_dir = tmp_path / "notes"
+    (notes_dir / "ops").mkdir(parents=True)
+    for name in ("a.md", "b.txt", "ops/c.md"):
+        (notes_dir / name).write_text(f"# {name}\n", encoding="utf-8")
+    (notes_dir / "skip.png").write_bytes(b"\x89PNG")
+
+    store = StateStore(tmp_path / "fingerprints.json")
+    assert [it.relpath for it in scan(notes_dir, store)] == ["a.md", "b.txt", "ops/c.md"]
+
+    (notes_dir / "a.md").write_text("# a.md\nedited\n", encoding="utf-8")
+    (notes_dir / "b.txt").unlink()
+
+    changed = list(iter_scan(notes_dir, store, statuses=CHANGE_STATUSES))
+    assert [(it.relpath, it.status) for it in changed] == [("a.md", "changed"), ("b.txt", "deleted")]
+    # unchanged notes were still fingerprinted into the state
+    assert store.get("ops/c.md").last_scanned_at == store.get("a.md").last_scanned_at
+
+
+def test_scan_records_are_slotted():
+    assert not hasattr(ScanItem("a.md", None, "new", None, None, None, None), "__dict__")
+    assert not hasattr(FileState(None, None, None, None, None), "__dict__")
+
+
+def test_fingerprint_algorithm_switch_migrates_state(tmp_path: Path):
+    notes_dir = tmp_path / "notes"
+    notes_dir.mkdir()
+    (notes_dir / "a.md").write_text("# A\n", encoding="utf-8")
+    (notes_dir / "b.md").write_text("# B\n", encoding="utf-8")
+
+    store = StateStore(tmp_path / "fingerprints.json")
+    scan(notes_dir, store)
+    store.save()
+    old_a = store.get("a.md").sha256
+
+    (notes_dir / "b.md").write_text("# B\nedited\n", encoding="utf-8")
+    store = StateStore(tmp_path / "fingerprints.json")
+    store.load()
+    items = {it.relpath: it.status for it in scan(notes_dir, store, algorithm="blake2b")}
+
+    assert items == {"a.md": "unchanged", "b.md": "changed"}
+    assert store.algorithm == "blake2b"
+    assert store.migrations == {"a.md": (old_a, store.get("a.md").sha256)}
+    assert {it.status for it in scan(notes_dir, store)} == {"unchanged"}
+
+
+def test_scoped_scan_leaves_other_notes_untouched(tmp_path: Path):
+    notes_dir = tmp_path / "notes"
+    for name in ("runbooks/db.md", "runbooks/net/dns.md", "journal/mon.md", "todo.txt"):
+        (notes_dir / name).parent.mkdir(parents=True, exist_ok=True)
+        (notes_dir / name).write_text(f"# {name}\n", encoding="utf-8")
+    store = StateStore(tmp_path / "fingerprints.json")
+    scan(notes_dir, store)
+    journal_before = store.get("journal/mon.md")
+
+    (notes_dir / "runbooks/db.md").write_text("# db\nfailover\n", encoding="utf-8")
+    (notes_dir / "journal/mon.md").unlink()
+    (notes_dir / "todo.txt").write_text("edited\n", encoding="utf-8")
+
+    scope = ScanScope.from_args(paths=["./runbooks/"])
+    items = scan(notes_dir, store, algorithm="blake2b", scope=scope)
+    assert [(it.relpath, it.status) for it in items] == [
+        ("runbooks/db.md", "changed"),
+        ("runbooks/net/dns.md", "unchanged"),
+    ]
+    # out of scope: not marked deleted / changed, and no algorithm migration
+    assert store.get("journal/mon.md") == journal_before
+    assert store.algorithm == "sha256"
+
+    glob_scope = ScanScope.from_args(globs=["*.txt"])
+    assert [(it.relpath, it.status) for it in scan(notes_dir, store, scope=glob_scope)] == [("todo.txt", "changed")]
+
+
+def test_append_only_scan_diffs_just_the_appended_bytes(tmp_path: Path):
+    from ops_notebook.core.render import RenderJob, render_job
+    from ops_notebook.core.snapshots import SnapshotStore, load_render_job, write_snapshot
+
+    notes_dir = tmp_path / "notes"
+    notes_dir.mkdir()
+    old = "# Journal\n" + "".join(f"- {i:06d} checked backups\n" for i in range(6_000))
+    (notes_dir / "journal.md").write_text(old, encoding="utf-8")
+    (notes_dir / "todo.md").write_text("# Todo\n", encoding="utf-8")
+    store = StateStore(tmp_path / "fingerprints.json")
+    scan(notes_dir, store)
+    snapshots = SnapshotStore(tmp_path / "snapshots")
+    snapshots.save_text("journal.md", old)
+
+    added = "- restored staging\n- rotated keys\n"
+    with (notes_dir / "journal.md").open("a", encoding="utf-8") as f:
+        f.write(added)
+    (notes_dir / "todo.md").write_text("# Todo (edited)\n", encoding="utf-8")
+    stats = ScanStats()
+    items = {it.relpath: it for it in iter_scan(notes_dir, store, stats=stats, append_only=True)}
+    journal = items["journal.md"]
+    assert journal.status == "changed" and journal.append_from == len(old.encode())
+    assert items["todo.md"].status == "changed" and items["todo.md"].append_from is None
+    assert stats.bytes_hashed == len((old + added).encode()) + len("# Todo (edited)\n")
+
+    job = load_render_job(journal, snapshots)
+    full = RenderJob(relpath="journal.md", status="changed", old_text=old, new_text=old + added)
+    assert render_job(job).diff == render_job(full).diff
+    assert (render_job(job).added, render_job(job).removed) == (2, 0)
+
+    write_snapshot(snapshots, journal, job)
+    assert snapshots.load_text("journal.md") == old + added
+
+
+def test_append_only_scan_catches_an_edit_in_the_middle_of_a_grown_note(tmp_path: Path):
+    from ops_notebook.core.snapshots import SnapshotStore, load_render_job, write_snapshot
+
+    notes_dir = tmp_path / "notes"
+    notes_dir.mkdir()
+    lines = ["# Journal\n"] + [f"- {i:06d} checked backups\n" for i in range(6_000)]
+    (notes_dir / "journal.md").write_text("".join(lines), encoding="utf-8")
+    store = StateStore(tmp_path / "fingerprints.json")
+    scan(notes_dir, store)
+    snapshots = SnapshotStore(tmp_path / "snapshots")
+    snapshots.save_text("journal.md", "".join(lines))
+
+    lines[3_000] = "- 002999 backups FAILED\n"
+    lines.append("- rotated keys\n")
+    edited = "".join(lines)
+    (notes_dir / "journal.md").write_text(edited, encoding="utf-8")
+    [journal] = iter_scan(notes_dir, store, append_only=True)
+    assert journal.status == "changed" and journal.append_from is None
+
+    job = load_render_job(journal, snapshots)
+    assert job.appended_text is None
+    write_snapshot(snapshots, journal, job)
+    assert snapshots.load_text("journal.md") == edited
+    # the stored digest matches the file: the next run sees it as unchanged
+    assert [it.status for it in iter_scan(notes_dir, store, append_only=True)] == ["unchanged"]
+
+
+def test_snapshot_append_keeps_the_character_limit_of_full_writes(tmp_path: Path):
+    from ops_notebook.core.snapshots import MAX_SNAPSHOT_CHARS, SnapshotStore
+
+    snapshots = SnapshotStore(tmp_path / "snapshots")
+    # 3 bytes per character: the byte size is past the limit, the text is not
+    old = "가" * (MAX_SNAPSHOT_CHARS // 2)
+    snapshots.save_text("ko.md", old)
+    assert not snapshots.append_text("ko.md", "나\n")  # not a sure fit: caller saves in full
+    snapshots.save_text("ko.md", old + "나\n")
+    assert snapshots.load_text("ko.md") == old + "나\n"
+
+    snapshots.save_text("ascii.md", "a" * (MAX_SNAPSHOT_CHARS - 2))
+    assert snapshots.append_text("ascii.md", "b\n")
+    assert not snapshots.append_text("ascii.md", "c\n")
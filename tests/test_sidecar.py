@@ -0,0 +1,39 @@
+from pathlib import Path
+
+from ops_notebook.core.local_index import LocalIndex
+from ops_notebook.core.near_dup import SignatureIndex
+from ops_notebook.core.rag_ingest import RagIngest
+from ops_notebook.core.scanner import scan
+from ops_notebook.core.sidecar import live_fingerprints
+from ops_notebook.core.state import StateStore
+
+
+def test_sidecars_only_see_changed_notes_across_a_fingerprint_switch(tmp_path: Path):
+    notes = tmp_path / "notes"
+    notes.mkdir()
+    for name in ("a", "b", "e"):
+        (notes / f"{name}.md").write_text(f"# {name}\nsome text about {name}\n", encoding="utf-8")
+    store = StateStore(tmp_path / "state.json")
+    scan(notes, store, algorithm="sha256")
+    index = LocalIndex(tmp_path / "local_index.json")
+    signatures = SignatureIndex(tmp_path / "signatures.json")
+    ingest = RagIngest(tmp_path / "rag_ingest.json")
+    assert index.sync(notes, store) == 3
+    assert signatures.sync(notes, store) == 3
+    ingest.data["pushed"] = live_fingerprints(store)
+
+    (notes / "a.md").write_text("# a\nedited\n", encoding="utf-8")
+    (notes / "b.md").unlink()
+    (notes / "c.md").write_text("# c\n", encoding="utf-8")
+    scan(notes, store, algorithm="blake2b")
+
+    live = live_fingerprints(store)
+    for sidecar in (index, signatures, ingest):
+        changed, gone = sidecar.stale(store)
+        assert changed == [("a.md", live["a.md"]), ("c.md", live["c.md"])]
+        assert gone == ["b.md"]
+    # e.md didn't change: its entries were re-keyed to the new fingerprint, not rebuilt
+    assert index.data["docs"]["e.md"]["sha"] == live["e.md"]
+    assert signatures.data["docs"]["e.md"]["sha"] == live["e.md"]
+    assert ingest.data["pushed"]["e.md"] == live["e.md"]
+    assert index.sync(notes, store) == 2
@@ -0,0 +1,22 @@
+import pytest
+
+from ops_notebook.core.throttle import IoThrottle, parse_rate
+
+
+def test_parse_rate():
+    assert parse_rate(0) == 0
+    assert parse_rate(None) == 0
+    assert parse_rate(4096) == 4096
+    assert parse_rate("512K") == 512 * 1024
+    assert parse_rate("20MB/s") == 20 * 1024 * 1024
+    with pytest.raises(ValueError):
+        parse_rate("fast")
+
+
+def test_throttle_waits_only_past_the_burst():
+    t = IoThrottle(bytes_per_s=1_000_000, burst_bytes=1_000_000)
+    t.consume(1_000_000)
+    assert t.waited_s == 0
+    t.consume(200_000)
+    assert 0.15 < t.waited_s < 0.5
+    assert t.bytes == 1_200_000
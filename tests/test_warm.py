@@ -0,0 +1,96 @@
+import json
+from pathlib import Path
+
+from ops_notebook.core.rag_client import RagClient, RagEvidence
+from ops_notebook.core.report import generate_weekly_report
+from ops_notebook.core.warm import warm_rag_cache
+
+URL = "http://rag.invalid/query"
+
+
+def test_warm_rag_fills_cache_for_report(tmp_path: Path, monkeypatch):
+    notes_dir = tmp_path / "notes"
+    notes_dir.mkdir()
+    (notes_dir / "a.md").write_text("# A\nhello\n", encoding="utf-8")
+    (notes_dir / "b.md").write_text("# B\nstable\n", encoding="utf-8")
+    state_path = tmp_path / ".ops_state" / "fingerprints.json"
+    kw = dict(
+        notes_dir=notes_dir,
+        reports_dir=tmp_path / "reports",
+        report_path=tmp_path / "reports" / "week.md",
+        template_path=tmp_path / "missing_template.md",
+        state_path=state_path,
+        rag_url=URL,
+        rag_top_k=3,
+        rag_query="",
+        markdown=False,
+    )
+    generate_weekly_report(use_rag=False, **kw)
+    (notes_dir / "a.md").write_text("# A\nhello changed\n", encoding="utf-8")
+
+    queries = []
+
+    def fake_query(self, query, top_k=3, max_chars=260, timeout_s=None):
+        queries.append(query)
+        return [RagEvidence(snippet="warm", source="kb.md", score=1.0)]
+
+    monkeypatch.setattr(RagClient, "query_topk", fake_query)
+    # only a.md changed since the last report; a second warm-up has nothing to do
+    assert warm_rag_cache(notes_dir, state_path, URL, 3) == 1
+    assert warm_rag_cache(notes_dir, state_path, URL, 3) == 0
+    assert len(queries) == 1
+
+    def down(self, *args, **kwargs):
+        raise TimeoutError("server down")
+
+    monkeypatch.setattr(RagClient, "query_topk", down)
+    generate_weekly_report(use_rag=True, **kw)
+
+    data = json.loads((tmp_path / "reports" / "week.json").read_text(encoding="utf-8"))
+    [item] = data["items"]
+    assert item["relpath"] == "a.md"
+    assert item["rag"]["skipped"] is None
+    assert item["rag"]["evidences"][0]["snippet"] == "warm"
+
+
+def test_warm_rag_pushes_pending_ingest_before_lookups(tmp_path: Path, monkeypatch):
+    notes_dir = tmp_path / "notes"
+    notes_dir.mkdir()
+    (notes_dir / "a.md").write_text("# A\nhello\n", encoding="utf-8")
+    state_path = tmp_path / ".ops_state" / "fingerprints.json"
+    generate_weekly_report(
+        notes_dir,
+        tmp_path / "reports",
+        tmp_path / "reports" / "week.md",
+        tmp_path / "missing_template.md",
+        state_path,
+        rag_url=URL,
+        rag_top_k=3,
+        rag_query="",
+        markdown=False,
+        use_rag=False,
+    )
+    (notes_dir / "a.md").write_text("# A\nhello changed\n", encoding="utf-8")
+
+    calls = []
+    fail = [True]
+
+    def fake_ingest(self, upserts, deletes, timeout_s=None):
+        if fail[0]:
+            raise TimeoutError("index down")
+        calls.append(("ingest", [u["doc"] for u in upserts]))
+
+    def fake_query(self, query, top_k=3, max_chars=260, timeout_s=None):
+        calls.append(("query", query))
+        return [RagEvidence(snippet="warm", source="kb.md", score=1.0)]
+
+    monkeypatch.setattr(RagClient, "ingest", fake_ingest)
+    monkeypatch.setattr(RagClient, "query_topk", fake_query)
+    ingest_url = "http://rag.invalid/ingest"
+    # push failed: nothing is queried and a.md is retried on the next warm-up
+    assert warm_rag_cache(notes_dir, state_path, URL, 3, ingest_url=ingest_url) == 0
+    assert calls == []
+    fail[0] = False
+    assert warm_rag_cache(notes_dir, state_path, URL, 3, ingest_url=ingest_url) == 1
+    assert [c[0] for c in calls] == ["ingest", "query"]
+    assert calls[0][1] == ["a.md"]